@@ -0,0 +1,285 @@
+"""Engine dịch bất đồng bộ: 1 HTTP session keep-alive dùng chung, hàng trăm request song song.
+
+Cần cài thêm aiohttp (pip install aiohttp).
+"""
+import asyncio
+import html
+import re
+import time
+
+import cache_manager
+from metrics import METRICS
+from rate_limiter import get_limiter
+from translator import (BATCH_MAX_CHARS, BATCH_SEPARATOR, _BATCH_SPLIT_RE, split_batches,
+                        read_cues, write_subtitle_file, _cue_indices, _build_results,
+                        _output_path, _subtitle_type, open_fingerprint,
+                        TranslationCancelled, _check_stopped)
+from subtitles import output_encoding_for
+from fingerprint import file_hash
+
+GOOGLE_URL = "https://translate.google.com/m"
+MAX_CONCURRENCY = 100  # số request đang bay tối đa
+_RESULT_RE = re.compile(r'<div class="result-container">(.*?)</div>', re.S)
+_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+
+
+class AsyncTranslateError(Exception):
+    def __init__(self, status, message="", retry_after=None):
+        super().__init__(f"HTTP {status} {message}".strip())
+        self.status = status
+        self.retry_after = retry_after
+
+
+async def _sleep_async(seconds, stop_event=None):
+    """Ngủ tối đa seconds giây, thức dậy sớm khi job bị dừng"""
+    deadline = time.monotonic() + seconds
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or (stop_event and stop_event()):
+            return
+        await asyncio.sleep(min(remaining, 0.2))
+
+
+class AsyncTranslator:
+    """Client dịch dùng chung 1 aiohttp.ClientSession, giới hạn bằng semaphore"""
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, base_url=GOOGLE_URL,
+                 retries=4, timeout=15, source="auto", rate=None):
+        self.limiter = get_limiter("google", rate)
+        self.max_concurrency = max_concurrency
+        self.base_url = base_url
+        self.retries = retries
+        self.timeout = timeout
+        self.source = source
+        self.requests = 0
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        import aiohttp  # chỉ cần khi dùng engine async
+
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=30)
+        self._session = aiohttp.ClientSession(
+            connector=connector, headers=_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    async def _request(self, text, dest_lang, stop_event=None):
+        params = {"sl": self.source, "tl": dest_lang, "q": text}
+        waited = time.monotonic()
+        await self.limiter.acquire_async(stop_event)
+        METRICS.incr("sleep_seconds_total", time.monotonic() - waited, reason="rate_limit")
+        _check_stopped(stop_event)
+        async with self._semaphore:
+            _check_stopped(stop_event)
+            METRICS.incr("provider_bytes_sent_total", len(text.encode("utf-8")),
+                         provider="google")
+            self.requests += 1
+            started = time.monotonic()
+            async with self._session.get(self.base_url, params=params) as resp:
+                body = await resp.text()
+                latency = time.monotonic() - started
+                METRICS.observe("provider_request_seconds", latency, provider="google")
+                METRICS.incr("provider_requests_total", provider="google",
+                             outcome="ok" if resp.status == 200 else "error")
+                if resp.status != 200:
+                    raise AsyncTranslateError(resp.status,
+                                              retry_after=resp.headers.get("Retry-After"))
+        self.limiter.on_success(latency)
+        m = _RESULT_RE.search(body)
+        if not m:
+            raise AsyncTranslateError(200, "không tìm thấy kết quả")
+        return html.unescape(m.group(1))
+
+    async def translate(self, text, dest_lang, stop_event=None):
+        """Dịch 1 text, thất bại hết số lần thử thì trả về None (không lưu vào cache).
+
+        Bị dừng giữa chừng thì ném TranslationCancelled (không trả về bản gốc để khỏi lưu vào cache).
+        """
+        for attempt in range(self.retries):
+            _check_stopped(stop_event)
+            try:
+                return await self._request(text, dest_lang, stop_event)
+            except TranslationCancelled:
+                raise
+            except Exception as e:
+                retry_after = self.limiter.on_error(e)
+                if attempt + 1 < self.retries:
+                    METRICS.incr("retries_total", provider="google")
+                    delay = self.limiter.backoff(attempt, retry_after)
+                    METRICS.incr("sleep_seconds_total", delay, reason="backoff")
+                    await _sleep_async(delay, stop_event)
+        METRICS.incr("translation_failed_total")
+        return None
+
+    async def translate_batch(self, texts, dest_lang, stop_event=None):
+        """Dịch nhiều dòng trong 1 request, lệch số dòng thì dịch lại từng dòng"""
+        if len(texts) == 1:
+            return [await self.translate(texts[0], dest_lang, stop_event)]
+        translated = await self.translate(BATCH_SEPARATOR.join(texts), dest_lang, stop_event)
+        parts = _BATCH_SPLIT_RE.split(translated.strip()) if translated else []
+        if len(parts) == len(texts):
+            return parts
+        return await asyncio.gather(*(self.translate(t, dest_lang, stop_event) for t in texts))
+
+
+async def translate_texts_async(client, texts, dest_lang, cache, stop_event=None,
+                                pause_event=None, progress_callback=None, batch=True,
+                                max_chars=BATCH_MAX_CHARS):
+    """Dịch danh sách text song song, trả về {text: bản dịch}.
+
+    Bị dừng thì hủy các nhóm chưa xong, chỉ trả về những text đã dịch.
+    """
+    resolved, owned, waiting = cache.reserve(dest_lang, texts)
+    groups = split_batches(owned, max_chars) if batch else [[t] for t in owned]
+    total = len(groups)
+    done = 0
+
+    async def run(group):
+        nonlocal done
+        while pause_event and pause_event.is_set():
+            await asyncio.sleep(0.2)
+        try:
+            translated_group = await client.translate_batch(group, dest_lang, stop_event)
+        except TranslationCancelled:
+            return
+        for text, translated in zip(group, translated_group):
+            if translated is None:
+                continue  # dịch không được: giữ dòng gốc, không lưu vào cache
+            cache.set(dest_lang, text, translated)
+            resolved[text] = translated
+        done += 1
+        if progress_callback:
+            progress_callback(done, total, client.limiter.snapshot())
+
+    tasks = [asyncio.ensure_future(run(g)) for g in groups]
+    try:
+        pending = set(tasks)
+        while pending and not (stop_event and stop_event()):
+            finished, pending = await asyncio.wait(pending, timeout=0.2)
+            for task in finished:
+                task.result()  # lỗi ngoài dự kiến thì ném ra như gather
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        cache.release(dest_lang, owned)
+
+    # các text đang được luồng/coroutine khác dịch, bỏ chờ khi bị dừng
+    orphaned = []
+    for text, future in waiting.items():
+        while not future.done() and not (stop_event and stop_event()):
+            await asyncio.sleep(0.2)
+        translated = future.result() if future.done() else None
+        if translated is not None:
+            resolved[text] = translated
+        elif not (stop_event and stop_event()):
+            orphaned.append(text)  # bên giữ text bỏ dở (vd job khác bị dừng): tự dịch
+    if orphaned:
+        resolved.update(await translate_texts_async(
+            client, orphaned, dest_lang, cache, stop_event, pause_event, None, batch,
+            max_chars))
+    return resolved
+
+
+async def translate_srt_file_async(path, cache, dest_lang="vi", output_mode="bilingual",
+                                   stop_event=None, pause_event=None, progress_callback=None,
+                                   encoding="auto", save_choice=1, output_folder=None,
+                                   retries=4, batch=True, client=None, rate=None,
+                                   max_concurrency=MAX_CONCURRENCY, base_url=GOOGLE_URL,
+                                   provider="google", output_encoding=None,
+                                   incremental=False):
+    if provider != "google":
+        raise ValueError("Engine async hiện chỉ hỗ trợ provider google")
+    output_path = _output_path(path, _subtitle_type(path), output_mode, save_choice,
+                               output_folder)
+    out_encoding = output_encoding_for(encoding, output_encoding)
+    fingerprint = source_hash = None
+    if incremental:
+        fingerprint = open_fingerprint(path, output_path, dest_lang, output_mode, provider,
+                                       out_encoding)
+        source_hash = file_hash(path)
+        if fingerprint.unchanged(source_hash, output_path):
+            return output_path
+
+    cues, ftype = read_cues(path, encoding=encoding)
+    indices = _cue_indices(cues)
+    if not indices:
+        return None
+
+    all_texts = list(dict.fromkeys(cues[i].text for i in indices))
+    known = fingerprint.lookup(all_texts) if fingerprint else {}
+    texts = [t for t in all_texts if t not in known]
+    translations = {}
+    if texts and client is None:
+        async with AsyncTranslator(max_concurrency, base_url, retries, rate=rate) as client:
+            translations = await translate_texts_async(
+                client, texts, dest_lang, cache, stop_event, pause_event,
+                progress_callback, batch)
+    elif texts:
+        translations = await translate_texts_async(
+            client, texts, dest_lang, cache, stop_event, pause_event,
+            progress_callback, batch)
+    translations.update(known)
+
+    results_map = _build_results(cues, indices, translations, output_mode)
+    write_subtitle_file(output_path, cues, results_map, encoding=out_encoding)
+    if fingerprint:
+        complete = len(results_map) == len(indices) and not (stop_event and stop_event())
+        fingerprint.save(source_hash if complete else None, output_path, all_texts,
+                         translations)
+    cache_manager.save_cache(cache)
+    return output_path
+
+
+def translate_srt_file(path, cache, dest_lang="vi", output_mode="bilingual",
+                       chunk_size=10, max_workers=3, rate=None,
+                       stop_event=None, pause_event=None,
+                       progress_callback=None, encoding="auto",
+                       save_choice=1, output_folder=None, retries=4,
+                       batch=True, max_concurrency=MAX_CONCURRENCY, base_url=GOOGLE_URL,
+                       provider="google", output_encoding=None, incremental=False):
+    """Dịch 1 file SRT/VTT bằng engine async (cùng chữ ký với translator.translate_srt_file).
+
+    chunk_size, max_workers không dùng: số request song song do
+    max_concurrency và rate limiter quyết định.
+    """
+    return asyncio.run(translate_srt_file_async(
+        path, cache, dest_lang=dest_lang, output_mode=output_mode,
+        stop_event=stop_event, pause_event=pause_event,
+        progress_callback=progress_callback, encoding=encoding,
+        save_choice=save_choice, output_folder=output_folder, retries=retries,
+        batch=batch, rate=rate, max_concurrency=max_concurrency, base_url=base_url,
+        provider=provider, output_encoding=output_encoding, incremental=incremental))
+
+
+async def _translate_files_async(files, max_concurrency=MAX_CONCURRENCY, base_url=GOOGLE_URL,
+                                 retries=4, rate=None, file_callback=None, **kwargs):
+    # 1 session dùng chung cho mọi file
+    stop_event = kwargs.get("stop_event")
+    async with AsyncTranslator(max_concurrency, base_url, retries, rate=rate) as client:
+        outputs = []
+        for f in files:
+            if stop_event and stop_event():
+                break
+            try:
+                outp = await translate_srt_file_async(f, client=client, retries=retries,
+                                                      **kwargs)
+            except Exception as e:
+                if file_callback is None:
+                    raise
+                file_callback(f, None, e)
+                continue
+            if outp:
+                outputs.append(outp)
+            if file_callback:
+                file_callback(f, outp, None)
+        return outputs
+
+
+def translate_srt_files(files, chunk_size=None, max_workers=None, **kwargs):
+    return asyncio.run(_translate_files_async(files, **kwargs))
@@ -0,0 +1,388 @@
+"""Benchmark dịch với provider giả lập: không tốn quota, kết quả lặp lại được.
+
+Ví dụ:
+    python benchmark.py --cues 2000 --repetition 0.3 --chunk-sizes 10,20 --workers 4,8
+    python benchmark.py --quick --save bench.json
+    python benchmark.py --quick --baseline bench.json   # exit 1 nếu chậm hơn quá --tolerance
+    python benchmark.py --startup-only --baseline bench.json   # chỉ đo thời gian khởi động
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+import cache_manager
+import translator
+from mock_provider import MockTranslateServer, mock_factory
+from rate_limiter import reset_limiters
+from subtitles import detect_encoding
+
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+
+_WORDS = ("the a you I we they it what where when why how not never always just "
+          "go come see know want need think tell take give find look call feel "
+          "time day night home way man woman friend door car money life world "
+          "here there now again today tomorrow right wrong good bad sorry please "
+          "really maybe okay yes no love hate work run stop wait listen").split()
+
+
+def _sentence(rng):
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(3, 10))]
+    text = " ".join(words).capitalize() + rng.choice(".?!")
+    if rng.random() < 0.1:
+        text = f"<i>{text}</i>"
+    if rng.random() < 0.2:
+        text += "\n" + " ".join(rng.choice(_WORDS) for _ in range(rng.randint(2, 6))) + "."
+    return text
+
+def _timestamp(seconds, sep):
+    ms = int(seconds * 1000)
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{sep}{ms:03d}"
+
+def generate_corpus(path, cues=1000, repetition=0.0, seed=0):
+    """Sinh file SRT/VTT (theo đuôi file) gồm `cues` cue.
+
+    repetition: tỉ lệ cue lấy lại từ 1 nhóm nhỏ câu hay lặp (tiếng thở, "Yes.", ...).
+    """
+    rng = random.Random(seed)
+    vtt = path.lower().endswith(".vtt")
+    sep = "." if vtt else ","
+    pool = [_sentence(rng) for _ in range(max(1, cues // 50))]
+    with open(path, "w", encoding="utf-8") as f:
+        if vtt:
+            f.write("WEBVTT\n\n")
+        t = 1.0
+        for i in range(1, cues + 1):
+            text = rng.choice(pool) if rng.random() < repetition else _sentence(rng)
+            start, t = t, t + rng.uniform(1.0, 4.0)
+            if not vtt:
+                f.write(f"{i}\n")
+            f.write(f"{_timestamp(start, sep)} --> {_timestamp(t, sep)}\n{text}\n\n")
+            t += 0.2
+    return path
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+def _measure(fn, memory=True):
+    """Chạy fn(), trả về (kết quả, giây, peak bộ nhớ Python tính bằng byte)"""
+    if memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = fn()
+    finally:
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if memory else None
+        if memory:
+            tracemalloc.stop()
+    return result, elapsed, peak
+
+def install_mock_providers(url, latencies):
+    """Thay google/mymemory bằng client tới server giả lập, limiter bắt đầu lại từ đầu"""
+    reset_limiters()
+    translator.register_provider(translator.Provider(
+        "google", mock_factory(url, latencies), max_concurrency=8))
+    translator.register_provider(translator.Provider(
+        "mymemory", mock_factory(url, latencies), max_concurrency=2, max_chars=480))
+
+
+def run_case(workdir, corpus, cues, server, mode="file", chunk_size=10, max_workers=4,
+             rate=20.0, cache_state="cold", memory=True):
+    """Dịch corpus 1 lần với cấu hình cho trước, trả về dict kết quả"""
+    latencies = []
+    install_mock_providers(server.url, latencies)
+    name = f"{mode} c={chunk_size} w={max_workers} {cache_state}"
+    db = os.path.join(workdir, f"bench_{abs(hash(name))}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db + suffix):
+            os.remove(db + suffix)
+    cache = cache_manager.TranslationCache(path=db)
+    options = dict(cache=cache, dest_lang="vi", output_mode="dest_only", rate=rate,
+                   save_choice=2, output_folder=os.path.join(workdir, "out"))
+
+    def translate():
+        if mode == "async":
+            import async_engine
+            return async_engine.translate_srt_file(
+                corpus, base_url=server.url, max_concurrency=max_workers * 8, **options)
+        return translator.translate_srt_file(
+            corpus, chunk_size=chunk_size, max_workers=max_workers,
+            streaming=(mode == "stream"), **options)
+
+    try:
+        if cache_state == "warm":
+            translate()
+            install_mock_providers(server.url, latencies)
+            latencies.clear()
+        requests_before = server.requests
+        _, elapsed, peak = _measure(translate, memory)
+    finally:
+        cache.close()
+    requests = server.requests - requests_before
+    return {
+        "name": name,
+        "mode": mode,
+        "chunk_size": chunk_size,
+        "max_workers": max_workers,
+        "cache": cache_state,
+        "cues": cues,
+        "seconds": round(elapsed, 3),
+        "cues_per_sec": round(cues / elapsed, 1) if elapsed else None,
+        "requests": requests,
+        "requests_per_cue": round(requests / cues, 4),
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "peak_mb": round(peak / 1048576, 2) if peak is not None else None,
+    }
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def bench_cache_io(workdir, entries=20000, lookups=2000, memory=True):
+    """Thời gian ghi (commit) và mở + tra cứu cache SQLite với `entries` bản dịch"""
+    rng = random.Random(1)
+    texts = [f"{_sentence(rng)} #{i}" for i in range(entries)]
+    db = os.path.join(workdir, "cache_io.db")
+
+    cache = cache_manager.TranslationCache(path=db, flush_size=entries + 1)
+    for text in texts:
+        cache.set("vi", text, text.upper())
+    _, save_s, save_peak = _measure(lambda: cache_manager.save_cache(cache), memory)
+    cache.close()
+
+    def load():
+        c = cache_manager.TranslationCache(path=db)
+        c.get("vi", texts[0])
+        return c
+    cache, load_s, load_peak = _measure(load, memory)
+    sample = rng.sample(texts, min(lookups, entries))
+    started = time.perf_counter()
+    for text in sample:
+        cache.get("vi", text)
+    lookup_s = time.perf_counter() - started
+    cache.close()
+    return {
+        "name": f"cache {entries} entries",
+        "entries": entries,
+        "save_ms": _ms(save_s),
+        "load_ms": _ms(load_s),
+        "lookup_us": round(lookup_s / len(sample) * 1e6, 1),
+        "db_kb": round(os.path.getsize(db) / 1024, 1),
+        "peak_mb": round(max(save_peak, load_peak) / 1048576, 2) if memory else None,
+    }
+
+
+_ENCODING_SAMPLES = (
+    ("utf-8", "Xin chào, hôm nay trời đẹp quá."),
+    ("utf-8-sig", "Bonjour, ça va ? Très bien."),
+    ("utf-16", "Hello there, general Kenobi."),
+    ("cp1252", "Café crème, naïve “quotes” – déjà vu…"),
+    ("shift_jis", "こんにちは、世界。今日はいい天気ですね。"),
+    ("gb18030", "你好，世界。今天天气很好，我们去公园散步吧。"),
+)
+
+def bench_encoding(workdir, repeat=200):
+    """Thời gian nhận diện encoding của từng loại file và kết quả có đúng không"""
+    results = []
+    for encoding, line in _ENCODING_SAMPLES:
+        path = os.path.join(workdir, f"enc_{encoding}.srt")
+        body = "".join(f"{i}\n00:00:0{i % 10},000 --> 00:00:0{i % 10},500\n{line}\n\n"
+                       for i in range(1, 300))
+        with open(path, "w", encoding=encoding) as f:
+            f.write(body)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            detected = detect_encoding(path)
+        elapsed = (time.perf_counter() - started) / repeat
+        ok = detected == encoding or (encoding == "utf-16" and detected.startswith("utf-16"))
+        results.append({"name": f"detect {encoding}", "detected": detected, "correct": ok,
+                        "ms": _ms(elapsed)})
+    return results
+
+
+STARTUP_MODULES = ("gui", "cli", "translator", "cache_manager")
+# thư viện chỉ được nạp khi dịch lần đầu, không được có mặt lúc khởi động
+LAZY_MODULES = ("deep_translator", "requests", "bs4", "aiohttp", "http.client")
+STARTUP_SLACK_MS = 25.0  # import vài chục ms dao động nhiều, cho phép thêm chừng này
+_IMPORT_CODE = """
+import sys, time, json
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "lazy": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+def _run_python(args):
+    here = os.path.dirname(os.path.abspath(__file__))
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, *args], cwd=here, capture_output=True, text=True)
+    return proc, time.perf_counter() - started
+
+def bench_startup(repeat=5):
+    """Thời gian import các module đầu vào trong process mới (lấy min của repeat lần).
+
+    lazy_loaded liệt kê các thư viện provider bị nạp ngay lúc import (phải là "-").
+    gui cần ttkbootstrap, thiếu thì ghi lỗi thay vì số đo.
+    """
+    results = []
+    for module in STARTUP_MODULES:
+        code = _IMPORT_CODE.format(module=module, lazy=LAZY_MODULES)
+        times, lazy, error = [], [], None
+        for _ in range(repeat):
+            proc, _ = _run_python(["-c", code])
+            if proc.returncode != 0:
+                error = (proc.stderr.strip().splitlines() or ["lỗi"])[-1]
+                break
+            data = json.loads(proc.stdout.strip().splitlines()[-1])
+            times.append(data["seconds"])
+            lazy = data["lazy"]
+        results.append({"name": f"import {module}", "ms": _ms(min(times)) if times else None,
+                        "lazy_loaded": ",".join(lazy) or "-", "error": error})
+    # cả process: khởi động interpreter + parse tham số, thoát ngay
+    times = [_run_python(["cli.py", "--help"])[1] for _ in range(repeat)]
+    results.append({"name": "process cli.py --help", "ms": _ms(min(times)),
+                    "lazy_loaded": "-", "error": None})
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Các case chậm hơn baseline quá tolerance (tỉ lệ): [(tên, cũ, mới, đơn vị)]"""
+    old = {r["name"]: r for r in baseline.get("translation", [])}
+    regressions = []
+    for r in results:
+        prev = old.get(r["name"])
+        if prev and prev.get("cues_per_sec") and r["cues_per_sec"] is not None:
+            if r["cues_per_sec"] < prev["cues_per_sec"] * (1 - tolerance):
+                regressions.append((r["name"], prev["cues_per_sec"], r["cues_per_sec"], "cue/s"))
+    return regressions
+
+def compare_startup(results, baseline, tolerance):
+    """Module khởi động chậm hơn baseline, hoặc nạp sẵn thư viện provider"""
+    old = {r["name"]: r for r in baseline.get("startup", [])}
+    regressions = []
+    for r in results:
+        if r["lazy_loaded"] != "-":
+            regressions.append((r["name"], "-", r["lazy_loaded"], "(nạp sẵn)"))
+        prev = old.get(r["name"])
+        if prev and prev.get("ms") and r["ms"] is not None:
+            if r["ms"] > max(prev["ms"] * (1 + tolerance), prev["ms"] + STARTUP_SLACK_MS):
+                regressions.append((r["name"], prev["ms"], r["ms"], "ms"))
+    return regressions
+
+def _print_table(rows, columns):
+    widths = [max(len(c), *(len(str(r.get(c))) for r in rows)) for c in columns]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in rows:
+        print("  ".join(str(r.get(c)).ljust(w) for c, w in zip(columns, widths)))
+    print()
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+def build_parser():
+    p = argparse.ArgumentParser(prog="benchmark", description="Benchmark dịch với provider giả lập")
+    p.add_argument("--cues", type=int, default=1000, help="số cue mỗi file")
+    p.add_argument("--repetition", type=float, default=0.3, help="tỉ lệ cue lặp lại (0-1)")
+    p.add_argument("--format", default="srt", choices=["srt", "vtt"])
+    p.add_argument("--modes", default="file,stream",
+                   help="file, stream, async (async cần aiohttp), phân cách bằng dấu phẩy")
+    p.add_argument("--chunk-sizes", type=_int_list, default=[10, 20])
+    p.add_argument("--workers", type=_int_list, default=[4, 8])
+    p.add_argument("--cache-states", default="cold,warm")
+    p.add_argument("--rate", type=float, default=20.0, help="tốc độ ban đầu của rate limiter (req/s)")
+    p.add_argument("--latency", type=float, nargs=2, default=[0.02, 0.06], metavar=("MIN", "MAX"),
+                   help="độ trễ giả lập mỗi request (giây)")
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--rate-limit", type=int, help="server trả 429 khi vượt số req/s này")
+    p.add_argument("--cache-entries", type=int, default=20000)
+    p.add_argument("--no-memory", action="store_true", help="không đo bộ nhớ (tracemalloc làm chậm)")
+    p.add_argument("--quick", action="store_true", help="cấu hình nhỏ để chạy nhanh trước khi release")
+    p.add_argument("--save", help="lưu kết quả JSON để làm baseline")
+    p.add_argument("--baseline", help="so sánh với file JSON đã lưu")
+    p.add_argument("--tolerance", type=float, default=0.2, help="mức chậm hơn baseline cho phép")
+    p.add_argument("--startup-repeat", type=int, default=5,
+                   help="số lần chạy mỗi phép đo khởi động (lấy nhanh nhất)")
+    p.add_argument("--startup-only", action="store_true",
+                   help="chỉ đo thời gian khởi động / import")
+    p.add_argument("--json", action="store_true", help="in kết quả dạng JSON")
+    return p
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.quick:
+        args.cues, args.cache_entries = min(args.cues, 300), min(args.cache_entries, 5000)
+        args.chunk_sizes, args.workers = args.chunk_sizes[:1], args.workers[:1]
+        args.startup_repeat = min(args.startup_repeat, 3)
+    memory = not args.no_memory
+    report = {"config": {k: v for k, v in vars(args).items()
+                         if k not in ("save", "baseline", "json")}}
+    report["startup"] = bench_startup(args.startup_repeat)
+    report["translation"] = report["cache"] = report["encoding"] = []
+
+    if not args.startup_only:
+        with tempfile.TemporaryDirectory(prefix="srt_bench_") as workdir, \
+                MockTranslateServer(latency=tuple(args.latency), error_rate=args.error_rate,
+                                    rate_limit=args.rate_limit) as server:
+            corpus = generate_corpus(os.path.join(workdir, f"corpus.{args.format}"),
+                                     args.cues, args.repetition)
+            translation = []
+            for mode in args.modes.split(","):
+                for chunk_size in args.chunk_sizes:
+                    for workers in args.workers:
+                        for state in args.cache_states.split(","):
+                            translation.append(run_case(
+                                workdir, corpus, args.cues, server, mode, chunk_size, workers,
+                                args.rate, state, memory))
+            report["translation"] = translation
+            report["cache"] = [bench_cache_io(workdir, args.cache_entries, memory=memory)]
+            report["encoding"] = bench_encoding(workdir)
+
+    regressions = compare_startup(report["startup"], {}, args.tolerance)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report["translation"], baseline, args.tolerance) + \
+            compare_startup(report["startup"], baseline, args.tolerance)
+    if regressions:
+        report["regressions"] = [{"name": n, "baseline": b, "current": c, "unit": u}
+                                 for n, b, c, u in regressions]
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        _print_table(report["startup"], ["name", "ms", "lazy_loaded", "error"])
+        if not args.startup_only:
+            _print_table(report["translation"], ["name", "cues_per_sec", "requests_per_cue",
+                                                 "p50_ms", "p95_ms", "peak_mb", "seconds"])
+            _print_table(report["cache"], ["name", "save_ms", "load_ms", "lookup_us",
+                                           "db_kb", "peak_mb"])
+            _print_table(report["encoding"], ["name", "detected", "correct", "ms"])
+        for name, before, now, unit in regressions:
+            print(f"❌ {name}: {before} → {now} {unit}", file=sys.stderr)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return EXIT_REGRESSION if regressions else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,16 @@
 import os
+import gzip
 import json
+import time
+import sqlite3
+import hashlib
 import platform
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+import translation_memory as tm
+from metrics import METRICS
 
 # 🔥 xác định thư mục cache chuẩn theo hệ điều hành
 def get_cache_dir():
@@ -13,53 +23,710 @@ def get_cache_dir():
     return os.path.join(base, "srt_translator")
 
 CACHE_DIR = get_cache_dir()
-CACHE_FILE = os.path.join(CACHE_DIR, "translation_cache.json")
+CACHE_FILE = os.path.join(CACHE_DIR, "translation_cache.json")  # cache JSON cũ
+CACHE_DB = os.path.join(CACHE_DIR, "translation_cache.db")
 MAX_CACHE_SIZE_MB = 50  # giới hạn cache tối đa
+EVICT_TARGET_RATIO = 0.9  # khi vượt giới hạn, xóa bớt tới 90%
+FLUSH_INTERVAL = 2.0  # giây giữa 2 lần ghi nền
+FLUSH_SIZE = 200  # ghi ngay khi có đủ số bản dịch mới
+
+DEFAULT_SOURCE = "auto"
+DEFAULT_PROVIDER = "google"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    text TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    norm_hash TEXT,
+    PRIMARY KEY (source, target, provider, text_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations(last_used);
+"""
+_NORM_INDEX = ("CREATE INDEX IF NOT EXISTS idx_translations_norm "
+               "ON translations(source, target, provider, norm_hash)")
+MAX_SUGGESTIONS = 1000  # số gợi ý fuzzy giữ lại để xem lại
+SHARED_CACHE_ENV = "SRT_TRANSLATOR_SHARED_CACHE"  # đường dẫn cache chung mặc định
+EXPORT_FORMAT = "srt_translator-cache"
+EXPORT_VERSION = 1
+MERGE_POLICIES = ("newer", "keep", "replace")
+# PRAGMA user_version của db cache, tăng khi đổi cách tính text_hash hoặc
+# tm.KEY_VERSION; db cũ hơn được tính lại khóa khi mở (3: text_hash giữ xuống dòng)
+DB_VERSION = 3
+_IMPORT_BATCH = 1000
+
+# gộp bản ghi nhập vào với bản có sẵn; hits lấy max để nhập lại cùng file không đổi gì
+_MERGE_SQL = {
+    "newer": "DO UPDATE SET "
+             "translation=CASE WHEN excluded.last_used > last_used "
+             "THEN excluded.translation ELSE translation END, "
+             "size=CASE WHEN excluded.last_used > last_used THEN excluded.size ELSE size END, "
+             "last_used=MAX(last_used, excluded.last_used), hits=MAX(hits, excluded.hits)",
+    "keep": "DO NOTHING",
+    "replace": "DO UPDATE SET translation=excluded.translation, size=excluded.size, "
+               "last_used=MAX(last_used, excluded.last_used), hits=MAX(hits, excluded.hits)",
+}
 
 def ensure_cache_dir():
     if not os.path.exists(CACHE_DIR):
         os.makedirs(CACHE_DIR, exist_ok=True)
 
-def load_cache():
-    ensure_cache_dir()
-    if not os.path.exists(CACHE_FILE):
-        return {}
-    try:
-        with open(CACHE_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+def normalize_text(text):
+    """Chuẩn hóa khoảng trắng trong từng dòng trước khi băm, giữ nguyên xuống dòng.
 
-def save_cache(cache):
-    ensure_cache_dir()
+    "Hello\nWorld" và "Hello World" là 2 khóa khác nhau; so khớp không phân
+    biệt khoảng trắng/tag/hoa thường là việc của tầng chuẩn hóa (translation_memory).
+    """
+    return "\n".join(" ".join(line.split()) for line in text.strip().splitlines())
+
+def text_hash(text):
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """Cache dịch lưu trong SQLite (WAL), tra cứu theo từng dòng, xóa dần theo LRU.
+
+    An toàn khi dùng chung giữa nhiều worker: mỗi text chưa có trong cache chỉ
+    được 1 luồng dịch (single-flight), bản dịch mới được gom lại và ghi xuống
+    đĩa ở luồng nền khi đủ flush_size hoặc sau flush_interval giây.
+
+    Không thấy bản khớp chính xác thì tra tiếp theo khóa chuẩn hóa (memory=True,
+    xem translation_memory) rồi theo câu gần giống: fuzzy="reuse" dùng luôn bản
+    dịch, fuzzy="suggest" chỉ ghi gợi ý vào self.suggestions để xem lại.
+
+    shared: file SQLite chung của cả nhóm (vd trên ổ mạng, tạo bằng snapshot()),
+    mở chỉ đọc và được tra trước cache cục bộ; tra theo chỉ mục trên đĩa nên
+    không phải nạp cả cache chung vào RAM. Bản dịch mới chỉ ghi vào cache cục bộ.
+    """
+
+    def __init__(self, path=CACHE_DB, max_size_mb=MAX_CACHE_SIZE_MB,
+                 source=DEFAULT_SOURCE, provider=DEFAULT_PROVIDER,
+                 flush_interval=FLUSH_INTERVAL, flush_size=FLUSH_SIZE,
+                 memory=True, fuzzy=None, fuzzy_threshold=tm.FUZZY_THRESHOLD, shared=None):
+        if fuzzy not in (None, "suggest", "reuse"):
+            raise ValueError(f"fuzzy không hợp lệ: {fuzzy!r}")
+        self.path = path
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.source = source
+        self.provider = provider
+        self.flush_size = flush_size
+        self._lock = threading.RLock()
+        self._touched = {}  # key -> số lần hit chưa ghi xuống db
+        self._pending = {}  # key -> (text, translation) chưa ghi xuống db
+        self._inflight = {}  # key -> Future của luồng đang dịch
+        self._pending_norm = {}  # khóa chuẩn hóa -> key trong _pending
+        self._inflight_norm = {}  # khóa chuẩn hóa -> (text, Future) đang dịch
+        self.memory = memory
+        self.fuzzy = fuzzy
+        self.fuzzy_threshold = fuzzy_threshold
+        self._fuzzy_index = {}  # (source, target, provider) -> MinHashIndex
+        self.suggestions = deque(maxlen=MAX_SUGGESTIONS)
+        self.hits = 0  # tổng số hit (chính xác + chuẩn hóa + gần giống)
+        self.normalized_hits = 0
+        self.fuzzy_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate_keys()
+        self.shared_path = shared
+        self._shared_norm = False
+        self._shared_exact = False
+        self._shared = self._open_shared(shared)
+
+        self._flush_wakeup = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, args=(flush_interval,),
+                                         name="cache-flusher", daemon=True)
+        self._flusher.start()
+        METRICS.add_collector("cache", self._gauges)  # cache mở gần nhất
+
+    def _key(self, dest_lang, text, source, provider):
+        return (source or self.source, dest_lang, provider or self.provider, text_hash(text))
+
+    @staticmethod
+    def _norm_key(key, text):
+        nh = tm.norm_hash(text)
+        return key[:3] + (nh,) if nh else None
+
+    def _migrate_keys(self):
+        """DB cũ chưa có cột norm_hash hoặc tính khóa theo cách cũ: tính lại text_hash và
+        norm_hash cho các dòng có sẵn (text_hash mới không trùng khóa cũ nào khác vì chỉ
+        đổi với text nhiều dòng)"""
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(translations)")]
+        if "norm_hash" not in columns:
+            self._conn.execute("ALTER TABLE translations ADD COLUMN norm_hash TEXT")
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < DB_VERSION:
+            rows = self._conn.execute(
+                "SELECT source, target, provider, text_hash, text FROM translations").fetchall()
+            self._conn.executemany(
+                "UPDATE OR IGNORE translations SET text_hash=?, norm_hash=? "
+                "WHERE source=? AND target=? AND provider=? AND text_hash=?",
+                [(text_hash(text), tm.norm_hash(text), *key) for *key, text in rows])
+            self._conn.execute(f"PRAGMA user_version={DB_VERSION}")
+        self._conn.execute(_NORM_INDEX)
+        self._conn.commit()
+
+    def _open_shared(self, path):
+        """Mở cache chung chỉ đọc; không mở được (vd mất mạng) thì chạy tiếp không có tầng này"""
+        if not path:
+            return None
+        import urllib.request  # kéo theo http.client, chỉ nạp khi có cache chung
+        try:
+            uri = "file:" + urllib.request.pathname2url(os.path.abspath(path)) \
+                + "?mode=ro&immutable=1"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(translations)")]
+        except sqlite3.Error as e:
+            print(f"[WARN] Không mở được cache chung {path}: {e}")
+            return None
+        if "translation" not in columns:
+            conn.close()
+            print(f"[WARN] {path} không phải file cache")
+            return None
+        # khóa tính theo cách cũ: không tra chuẩn hóa, khớp chính xác phải so lại text
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        self._shared_norm = "norm_hash" in columns and version >= tm.KEY_VERSION
+        self._shared_exact = version >= DB_VERSION
+        return conn
+
+    def _lookup_shared(self, key, text):
+        row = self._shared.execute(
+            "SELECT text, translation FROM translations "
+            "WHERE source=? AND target=? AND provider=? AND text_hash=?", key).fetchone()
+        if row is None:
+            return None
+        if not self._shared_exact and normalize_text(row[0]) != normalize_text(text):
+            return None  # "A\nB" và "A B" chung khóa cũ
+        return row[1]
+
+    def _source_of(self, key):
+        """(text gốc, bản dịch) của 1 key, None nếu không có"""
+        if key in self._pending:
+            return self._pending[key]
+        return self._conn.execute(
+            "SELECT text, translation FROM translations "
+            "WHERE source=? AND target=? AND provider=? AND text_hash=?", key).fetchone()
+
+    def _lookup_normalized(self, key, text):
+        nkey = self._norm_key(key, text)
+        if nkey is None:
+            return None
+        if self._shared is not None and self._shared_norm:
+            row = self._shared.execute(
+                "SELECT text, translation FROM translations "
+                "WHERE source=? AND target=? AND provider=? AND norm_hash=? LIMIT 1",
+                nkey).fetchone()
+            if row is not None:
+                return tm.adapt(row[0], row[1], text)
+        match_key = self._pending_norm.get(nkey)
+        if match_key is not None:
+            source_text, translation = self._pending[match_key]
+        else:
+            row = self._conn.execute(
+                "SELECT text_hash, text, translation FROM translations "
+                "WHERE source=? AND target=? AND provider=? AND norm_hash=? LIMIT 1",
+                nkey).fetchone()
+            if row is None:
+                return None
+            match_key = key[:3] + (row[0],)
+            source_text, translation = row[1], row[2]
+        self._touched[match_key] = self._touched.get(match_key, 0) + 1
+        return tm.adapt(source_text, translation, text)
+
+    def _index_for(self, namespace):
+        index = self._fuzzy_index.get(namespace)
+        if index is None:
+            index = self._fuzzy_index[namespace] = tm.MinHashIndex(self.fuzzy_threshold)
+            for th, text in self._conn.execute(
+                    "SELECT text_hash, text FROM translations "
+                    "WHERE source=? AND target=? AND provider=?", namespace):
+                index.add(th, text)
+            for key, (text, _) in self._pending.items():
+                if key[:3] == namespace:
+                    index.add(key[3], text)
+        return index
+
+    def _lookup_fuzzy(self, key, text):
+        match = self._index_for(key[:3]).query(text)
+        if match is None:
+            return None
+        match_key = key[:3] + (match[0],)
+        row = self._source_of(match_key)
+        if row is None:
+            return None  # đã bị xóa khỏi cache
+        source_text, translation = row
+        if self.fuzzy == "suggest":
+            self.suggestions.append({"text": text, "match": source_text,
+                                     "translation": translation,
+                                     "similarity": round(match[1], 3)})
+            return None
+        self._touched[match_key] = self._touched.get(match_key, 0) + 1
+        return tm.adapt(source_text, translation, text)
+
+    def _resolve(self, key, text):
+        """Tra lần lượt: chính xác (cache chung trước), chuẩn hóa, gần giống. Trả về (bản dịch, loại)"""
+        if self._shared is not None:
+            translation = self._lookup_shared(key, text)
+            if translation is not None:
+                return translation, "shared"
+        translation = self._lookup(key)
+        if translation is not None:
+            return translation, "exact"
+        if self.memory:
+            translation = self._lookup_normalized(key, text)
+            if translation is not None:
+                return translation, "normalized"
+        if self.fuzzy:
+            translation = self._lookup_fuzzy(key, text)
+            if translation is not None:
+                return translation, "fuzzy"
+        return None, None
+
+    def _count_hit(self, kind):
+        self.hits += 1
+        if kind == "normalized":
+            self.normalized_hits += 1
+        elif kind == "fuzzy":
+            self.fuzzy_hits += 1
+        elif kind == "shared":
+            self.shared_hits += 1
+
+    def _derived_future(self, owner, owner_text, text):
+        # text chỉ khác cách viết với text đang được dịch: chờ rồi chuyển bản dịch
+        derived = Future()
+
+        def done(f):
+            translation = f.result()
+            derived.set_result(None if translation is None
+                               else tm.adapt(owner_text, translation, text))
+        owner.add_done_callback(done)
+        return derived
+
+    def _drop_inflight(self, key, text):
+        future = self._inflight.pop(key, None)
+        nkey = self._norm_key(key, text) if self.memory else None
+        if future is not None and nkey and self._inflight_norm.get(nkey, (None, None))[1] is future:
+            del self._inflight_norm[nkey]
+        return future
+
+    def _lookup(self, key):
+        if key in self._pending:
+            translation = self._pending[key][1]
+        else:
+            row = self._conn.execute(
+                "SELECT translation FROM translations "
+                "WHERE source=? AND target=? AND provider=? AND text_hash=?", key).fetchone()
+            if row is None:
+                return None
+            translation = row[0]
+        self._touched[key] = self._touched.get(key, 0) + 1
+        return translation
+
+    def get(self, dest_lang, text, source=None, provider=None):
+        key = self._key(dest_lang, text, source, provider)
+        with self._lock:
+            return self._resolve(key, text)[0]
+
+    def set(self, dest_lang, text, translation, source=None, provider=None):
+        key = self._key(dest_lang, text, source, provider)
+        with self._lock:
+            self._pending[key] = (text, translation)
+            nkey = self._norm_key(key, text)
+            if nkey:
+                self._pending_norm[nkey] = key
+            index = self._fuzzy_index.get(key[:3])
+            if index is not None:
+                index.add(key[3], text)
+            future = self._drop_inflight(key, text)
+            if len(self._pending) >= self.flush_size:
+                self._flush_wakeup.set()
+        if future is not None:
+            future.set_result(translation)
+
+    # ---------- single-flight ----------
+    def reserve(self, dest_lang, texts, source=None, provider=None):
+        """Chia texts thành (resolved, owned, waiting).
+
+        resolved: {text: bản dịch} đã có trong cache
+        owned: các text luồng gọi phải tự dịch rồi set()/release()
+        waiting: {text: Future} đang được luồng khác dịch
+        """
+        resolved, owned, waiting = {}, [], {}
+        with METRICS.timer("cache_lookup_seconds"), self._lock:
+            for text in dict.fromkeys(texts):
+                key = self._key(dest_lang, text, source, provider)
+                translation, kind = self._resolve(key, text)
+                if translation is not None:
+                    self._count_hit(kind)
+                    resolved[text] = translation
+                    continue
+                if key in self._inflight:
+                    self.coalesced += 1
+                    waiting[text] = self._inflight[key]
+                    continue
+                nkey = self._norm_key(key, text) if self.memory else None
+                if nkey in self._inflight_norm:
+                    owner_text, owner = self._inflight_norm[nkey]
+                    self.coalesced += 1
+                    waiting[text] = self._derived_future(owner, owner_text, text)
+                    continue
+                self.misses += 1
+                self._inflight[key] = Future()
+                if nkey:
+                    self._inflight_norm[nkey] = (text, self._inflight[key])
+                owned.append(text)
+        return resolved, owned, waiting
+
+    def release(self, dest_lang, texts, source=None, provider=None):
+        """Bỏ giữ các text chưa dịch xong (bị dừng/lỗi), luồng chờ nhận None.
+
+        None không có nghĩa job của luồng chờ bị dừng: luồng chờ chưa bị dừng
+        thì reserve() lại các text đó và tự dịch.
+        """
+        futures = []
+        with self._lock:
+            for text in texts:
+                future = self._drop_inflight(self._key(dest_lang, text, source, provider), text)
+                if future is not None:
+                    futures.append(future)
+        for future in futures:
+            future.set_result(None)
+
+    def get_or_translate(self, dest_lang, text, translate_fn, source=None, provider=None):
+        """Tra cache, chưa có thì chỉ 1 luồng gọi translate_fn(text), luồng khác chờ.
+
+        translate_fn trả về None (dịch không được) thì không lưu gì, luồng chờ nhận None.
+        Luồng đang dịch bỏ dở (vd job của nó bị dừng) thì luồng chờ giữ lại text
+        và tự dịch; translate_fn tự kiểm tra job của luồng gọi có bị dừng không.
+        """
+        while True:
+            resolved, owned, waiting = self.reserve(dest_lang, [text], source, provider)
+            if owned:
+                try:
+                    translation = translate_fn(text)
+                    if translation is not None:
+                        self.set(dest_lang, text, translation, source, provider)
+                    return translation
+                finally:
+                    self.release(dest_lang, owned, source, provider)
+            if not waiting:
+                return resolved[text]
+            translation = waiting[text].result()
+            if translation is not None:
+                return translation
+
+    def _gauges(self):
+        stats = self.stats()
+        return [("cache_hit_ratio", {}, round(stats["hit_ratio"], 4)),
+                ("cache_lookups", {"result": "exact"}, stats["exact_hits"]),
+                ("cache_lookups", {"result": "normalized"}, stats["normalized_hits"]),
+                ("cache_lookups", {"result": "fuzzy"}, stats["fuzzy_hits"]),
+                ("cache_lookups", {"result": "shared"}, stats["shared_hits"]),
+                ("cache_lookups", {"result": "coalesced"}, stats["coalesced"]),
+                ("cache_lookups", {"result": "miss"}, stats["misses"]),
+                ("cache_pending", {}, stats["pending"])]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            exact = self.hits - self.normalized_hits - self.fuzzy_hits - self.shared_hits
+            ratio = lambda n: n / lookups if lookups else 0.0
+            return {
+                "hits": self.hits,
+                "exact_hits": exact,
+                "normalized_hits": self.normalized_hits,
+                "fuzzy_hits": self.fuzzy_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": ratio(self.hits + self.coalesced),
+                "exact_ratio": ratio(exact),
+                "normalized_ratio": ratio(self.normalized_hits),
+                "fuzzy_ratio": ratio(self.fuzzy_hits),
+                "shared_ratio": ratio(self.shared_hits),
+                "suggestions": len(self.suggestions),
+                "pending": len(self._pending),
+            }
+
+    # ---------- ghi xuống đĩa ----------
+    def _flush_loop(self, interval):
+        while not self._closed:
+            self._flush_wakeup.wait(interval)
+            self._flush_wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[WARN] Không ghi được cache: {e}")
+
+    def flush(self):
+        """Ghi các bản dịch mới và thời điểm dùng gần nhất xuống đĩa"""
+        with METRICS.timer("cache_flush_seconds"), self._lock:
+            if self._closed:
+                return
+            if self._pending:
+                now = time.time()
+                self._conn.executemany(
+                    "INSERT INTO translations "
+                    "(source, target, provider, text_hash, text, translation, size, last_used, "
+                    "norm_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(source, target, provider, text_hash) DO UPDATE SET "
+                    "translation=excluded.translation, size=excluded.size, "
+                    "last_used=excluded.last_used",
+                    [(*key, text, translation,
+                      len(text.encode("utf-8")) + len(translation.encode("utf-8")), now,
+                      tm.norm_hash(text))
+                     for key, (text, translation) in self._pending.items()])
+                self._pending.clear()
+                self._pending_norm.clear()
+            if self._touched:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE translations SET last_used=?, hits=hits+? "
+                    "WHERE source=? AND target=? AND provider=? AND text_hash=?",
+                    [(now, n, *key) for key, n in self._touched.items()])
+                self._touched.clear()
+            self._conn.commit()
+
+    def commit(self):
+        """Ghi các thay đổi xuống đĩa và xóa bớt nếu vượt giới hạn"""
+        with self._lock:
+            self.flush()
+            self.evict()
+
+    def data_size(self):
+        with self._lock:
+            self.flush()
+            return self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM translations").fetchone()[0]
+
+    def evict(self):
+        """Xóa các bản dịch ít dùng gần đây nhất cho tới khi dưới giới hạn"""
+        with self._lock:
+            total = self.data_size()
+            if total <= self.max_bytes:
+                return 0
+            to_free = total - int(self.max_bytes * EVICT_TARGET_RATIO)
+            victims, freed = [], 0
+            rows = self._conn.execute(
+                "SELECT source, target, provider, text_hash, size FROM translations "
+                "ORDER BY last_used")
+            for *key, size in rows:
+                victims.append(key)
+                freed += size
+                if freed >= to_free:
+                    break
+            self._conn.executemany(
+                "DELETE FROM translations "
+                "WHERE source=? AND target=? AND provider=? AND text_hash=?", victims)
+            self._conn.commit()
+            return len(victims)
+
+    # ---------- xuất / nhập ----------
+    def iter_records(self):
+        """Duyệt mọi bản dịch trong cache cục bộ (đọc qua kết nối riêng, không giữ lock)"""
+        with self._lock:
+            self.flush()
+        conn = sqlite3.connect(self.path)
+        try:
+            for source, target, provider, text, translation, last_used, hits in conn.execute(
+                    "SELECT source, target, provider, text, translation, last_used, hits "
+                    "FROM translations"):
+                yield {"s": source, "t": target, "p": provider, "x": text,
+                       "r": translation, "u": round(last_used, 3), "h": hits}
+        finally:
+            conn.close()
+
+    def merge_records(self, records, policy="newer"):
+        """Gộp các bản ghi (dạng iter_records) vào cache, trả về {"records", "added"}.
+
+        policy khi trùng khóa: "newer" giữ bản dùng gần đây hơn, "keep" giữ bản
+        có sẵn, "replace" lấy bản nhập vào.
+        """
+        if policy not in MERGE_POLICIES:
+            raise ValueError(f"policy không hợp lệ: {policy!r}")
+        sql = ("INSERT INTO translations "
+               "(source, target, provider, text_hash, text, translation, size, last_used, "
+               "hits, norm_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+               "ON CONFLICT(source, target, provider, text_hash) " + _MERGE_SQL[policy])
+        with self._lock:
+            self.flush()
+            before = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            count, batch = 0, []
+            for r in records:
+                text, translation = r["x"], r["r"]
+                batch.append((r.get("s", self.source), r["t"], r.get("p", self.provider),
+                              text_hash(text), text, translation,
+                              len(text.encode("utf-8")) + len(translation.encode("utf-8")),
+                              r.get("u", 0.0), r.get("h", 0), tm.norm_hash(text)))
+                if len(batch) >= _IMPORT_BATCH:
+                    self._conn.executemany(sql, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                self._conn.executemany(sql, batch)
+                count += len(batch)
+            self._conn.commit()
+            self._fuzzy_index.clear()  # dựng lại khi cần
+            after = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        return {"records": count, "added": after - before}
+
+    def snapshot(self, path):
+        """Ghi bản chụp gọn của cache (SQLite) để đặt lên thư mục chung làm cache shared"""
+        tmp = path + ".tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        with self._lock:
+            self.flush()
+            self._conn.execute("VACUUM INTO ?", (tmp,))
+        conn = sqlite3.connect(tmp)
+        conn.execute("PRAGMA journal_mode=DELETE")  # file đơn, đọc được qua ổ mạng
+        conn.close()
+        os.replace(tmp, path)
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._pending.clear()
+            self._pending_norm.clear()
+            self._fuzzy_index.clear()
+            self.suggestions.clear()
+            self._conn.execute("DELETE FROM translations")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+
+    def close(self):
+        with self._lock:
+            self.commit()
+            self._closed = True
+            self._conn.close()
+            if self._shared is not None:
+                self._shared.close()
+        self._flush_wakeup.set()
+
+    def __len__(self):
+        with self._lock:
+            self.flush()
+            return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+
+def migrate_json_cache(cache, json_path=CACHE_FILE):
+    """Chuyển cache JSON cũ ({lang: {text: trans}}) sang SQLite, chạy 1 lần"""
+    if not os.path.exists(json_path):
+        return 0
     try:
-        with open(CACHE_FILE, "w", encoding="utf-8") as f:
-            json.dump(cache, f, ensure_ascii=False, indent=2)
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
     except Exception:
-        return
-    
-    # kiểm tra size
+        return 0
+    count = 0
+    for dest_lang, entries in data.items():
+        if not isinstance(entries, dict):
+            continue
+        for text, translation in entries.items():
+            if isinstance(text, str) and isinstance(translation, str):
+                cache.set(dest_lang, text, translation)
+                count += 1
+    cache.commit()
     try:
-        size_mb = os.path.getsize(CACHE_FILE) / (1024 * 1024)
-        if size_mb > MAX_CACHE_SIZE_MB:
-            clear_cache()
-            print(f"[INFO] Cache quá lớn ({size_mb:.2f}MB), đã xóa.")
+        os.replace(json_path, json_path + ".migrated")
     except Exception:
         pass
+    return count
 
-def clear_cache():
+def load_cache(**options):
+    """Mở cache mặc định; options (memory, fuzzy, shared, ...) truyền cho TranslationCache.
+
+    shared mặc định lấy từ biến môi trường SRT_TRANSLATOR_SHARED_CACHE.
+    """
     ensure_cache_dir()
+    options.setdefault("shared", os.getenv(SHARED_CACHE_ENV) or None)
+    cache = TranslationCache(**options)
+    migrate_json_cache(cache)
+    return cache
+
+def _open_export(path):
+    with open(path, "rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"
+    if compressed:
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+def export_cache(cache, path):
+    """Xuất cache ra JSON lines nén gzip, trả về số bản dịch đã xuất.
+
+    Dòng đầu là header {"format", "version", "exported"}, mỗi dòng sau là 1 bản
+    dịch {"s": nguồn, "t": đích, "p": provider, "x": text, "r": bản dịch,
+    "u": lần dùng cuối, "h": số hit}.
+    """
+    tmp = path + ".tmp"
+    count = 0
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"format": EXPORT_FORMAT, "version": EXPORT_VERSION,
+                            "exported": round(time.time(), 3)}) + "\n")
+        for record in cache.iter_records():
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    os.replace(tmp, path)
+    return count
+
+def import_cache(cache, path, policy="newer"):
+    """Nhập file từ export_cache (nén hoặc không) vào cache, xem merge_records"""
+    with _open_export(path) as f:
+        try:
+            header = json.loads(f.readline() or "{}")
+        except ValueError:
+            header = {}
+        if header.get("format") != EXPORT_FORMAT:
+            raise ValueError(f"{path} không phải file cache xuất từ srt_translator")
+        if header.get("version", 0) > EXPORT_VERSION:
+            raise ValueError(f"File cache phiên bản {header['version']} mới hơn bản "
+                             f"được hỗ trợ ({EXPORT_VERSION})")
+
+        def records():
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # dòng cuối bị ghi dở
+                if isinstance(record.get("x"), str) and isinstance(record.get("r"), str) \
+                        and record.get("t"):
+                    yield record
+
+        return cache.merge_records(records(), policy)
+
+def save_cache(cache):
     try:
-        if os.path.exists(CACHE_FILE):
-            os.remove(CACHE_FILE)
-    except Exception:
-        pass
+        cache.commit()
+    except Exception as e:
+        print(f"[WARN] Không lưu được cache: {e}")
+
+def clear_cache():
+    ensure_cache_dir()
+    for path in (CACHE_FILE, CACHE_DB, CACHE_DB + "-wal", CACHE_DB + "-shm"):
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception:
+            pass
 
 def cache_size_bytes():
     ensure_cache_dir()
-    try:
-        if os.path.exists(CACHE_FILE):
-            return os.path.getsize(CACHE_FILE) / 1024.0  # KB
-    except Exception:
-        pass
-    return 0.0
+    size = 0
+    for path in (CACHE_DB, CACHE_DB + "-wal"):
+        try:
+            if os.path.exists(path):
+                size += os.path.getsize(path)
+        except Exception:
+            pass
+    return size / 1024.0  # KB
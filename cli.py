@@ -0,0 +1,290 @@
+"""Dịch SRT/VTT từ dòng lệnh (không cần Tk).
+
+Ví dụ:
+    python cli.py -r subs/ --lang vi --mode dest_only --workers 8 --json
+    python cli.py --import-cache team.jsonl.gz --export-cache mine.jsonl.gz
+    python cli.py --import-cache a.jsonl.gz --import-cache b.jsonl.gz --publish-cache //nas/shared.db
+"""
+import os
+import sys
+import glob
+import json
+import time
+import signal
+import sqlite3
+import argparse
+
+EXIT_OK = 0
+EXIT_FAILED = 1  # có file dịch lỗi
+EXIT_USAGE = 2  # tham số sai / không tìm thấy file
+EXIT_PARTIAL = 3  # có cue dịch không được (file vẫn được ghi, giữ dòng gốc)
+EXIT_INTERRUPTED = 130
+
+SUBTITLE_EXTS = (".srt", ".vtt")
+
+
+def collect_files(inputs, recursive=False):
+    """Mở rộng file, thư mục và glob thành danh sách file phụ đề"""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            if recursive:
+                for root, _, fnames in os.walk(item):
+                    files.extend(os.path.join(root, fn) for fn in fnames
+                                 if fn.lower().endswith(SUBTITLE_EXTS))
+            else:
+                files.extend(os.path.join(item, fn) for fn in os.listdir(item)
+                             if fn.lower().endswith(SUBTITLE_EXTS))
+        elif glob.has_magic(item):
+            files.extend(f for f in glob.glob(item, recursive=recursive)
+                         if f.lower().endswith(SUBTITLE_EXTS))
+        elif os.path.isfile(item):
+            files.append(item)
+    return sorted(dict.fromkeys(files))
+
+
+def build_parser():
+    p = argparse.ArgumentParser(prog="srt-translate", description="Dịch file phụ đề SRT/VTT")
+    p.add_argument("inputs", nargs="*",
+                   help="file, thư mục hoặc glob (vd: 'subs/**/*.srt'); bỏ trống khi chỉ xuất/nhập cache")
+    p.add_argument("-r", "--recursive", action="store_true", help="quét thư mục con")
+    p.add_argument("-l", "--lang", default="vi",
+                   help="ngôn ngữ đích, nhiều ngôn ngữ thì phân cách bằng dấu phẩy (vd: vi,fr,de)")
+    p.add_argument("--multitrack", action="store_true",
+                   help="nhiều ngôn ngữ: ghi 1 file VTT chứa mọi ngôn ngữ thay vì mỗi ngôn ngữ 1 file")
+    p.add_argument("-m", "--mode", default="bilingual", choices=["bilingual", "dest_only"])
+    p.add_argument("-o", "--output-dir", help="thư mục lưu (mặc định: cạnh file gốc)")
+    p.add_argument("--encoding", default="auto",
+                   help='encoding file nguồn (mặc định: "auto" - tự nhận diện)')
+    p.add_argument("--output-encoding", help="encoding file đầu ra (mặc định: utf-8 khi auto)")
+    p.add_argument("--provider", default="google",
+                   help='provider, nối bằng "+" để chia tải (vd: google+mymemory)')
+    p.add_argument("--engine", default="threads", choices=["threads", "async"])
+    p.add_argument("-w", "--workers", type=int, default=4, help="số worker (engine threads)")
+    p.add_argument("--concurrency", type=int, default=100, help="số request song song (engine async)")
+    p.add_argument("-c", "--chunk-size", type=int, default=20)
+    p.add_argument("--rate", type=float, default=5.0, help="tốc độ ban đầu (req/s)")
+    p.add_argument("--retries", type=int, default=4)
+    p.add_argument("--no-batch", action="store_true", help="gửi từng cue 1 request")
+    p.add_argument("--plan", action="store_true",
+                   help="quét trước toàn bộ file, mỗi text chỉ dịch 1 lần")
+    p.add_argument("--resume", action="store_true", help="tiếp tục job bị dừng")
+    p.add_argument("--incremental", action="store_true",
+                   help="chỉ dịch các cue mới/đã sửa so với lần dịch trước (file không đổi thì bỏ qua)")
+    p.add_argument("--stream", action="store_true",
+                   help="đọc/ghi dần từng đoạn, bộ nhớ cố định cho file rất lớn")
+    p.add_argument("--cache-db", help="đường dẫn file cache SQLite")
+    p.add_argument("--shared-cache", metavar="PATH",
+                   help="cache chung chỉ đọc (vd trên ổ mạng), tra trước cache cục bộ "
+                        "(mặc định: biến môi trường SRT_TRANSLATOR_SHARED_CACHE)")
+    p.add_argument("--import-cache", metavar="PATH", action="append", default=[],
+                   help="nhập file cache đã xuất trước khi dịch (dùng nhiều lần được)")
+    p.add_argument("--merge", default="newer", choices=["newer", "keep", "replace"],
+                   help="khi nhập trùng bản dịch: giữ bản dùng gần đây hơn / bản có sẵn / bản nhập")
+    p.add_argument("--export-cache", metavar="PATH",
+                   help="xuất cache (JSON lines nén gzip) sau khi dịch xong")
+    p.add_argument("--publish-cache", metavar="PATH",
+                   help="ghi bản chụp SQLite của cache để dùng làm --shared-cache")
+    p.add_argument("--fuzzy", choices=["suggest", "reuse"],
+                   help="tra cả câu gần giống trong cache: chỉ gợi ý hoặc dùng luôn bản dịch")
+    p.add_argument("--json", action="store_true", help="in tiến độ dạng JSON lines ra stdout")
+    p.add_argument("--metrics-jsonl", metavar="PATH",
+                   help="ghi trace từng request và số liệu tổng kết (JSON lines)")
+    p.add_argument("--metrics-prom", metavar="PATH",
+                   help="ghi số liệu dạng text Prometheus (cập nhật mỗi 10 giây)")
+    p.add_argument("-q", "--quiet", action="store_true")
+    return p
+
+
+PROM_INTERVAL = 10.0  # giây giữa 2 lần ghi file Prometheus
+
+
+class Reporter:
+    def __init__(self, as_json=False, quiet=False, prom_path=None):
+        self.as_json = as_json
+        self.quiet = quiet
+        self.prom_path = prom_path
+        self._prom_written = 0.0
+
+    def emit(self, event, message=None, **data):
+        if self.as_json:
+            print(json.dumps({"event": event, **data}, ensure_ascii=False), flush=True)
+        elif message and not self.quiet:
+            print(message, file=sys.stderr, flush=True)
+
+    def progress(self, path, done, total, stats=None):
+        data = {"file": path, "done": done, "total": total}
+        if stats:
+            data.update(rate=stats.get("rate"), throttled=stats.get("throttled"))
+        self.emit("progress", None, **data)
+        if self.prom_path and time.monotonic() - self._prom_written >= PROM_INTERVAL:
+            self.write_metrics()
+
+    def write_metrics(self):
+        from metrics import METRICS
+        try:
+            METRICS.write_prometheus(self.prom_path)
+        except OSError as e:
+            self.emit("error", f"⚠️ Không ghi được metrics: {e}", error=str(e))
+        self._prom_written = time.monotonic()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report = Reporter(args.json, args.quiet, args.metrics_prom)
+
+    cache_ops = args.import_cache or args.export_cache or args.publish_cache
+    files = collect_files(args.inputs, args.recursive)
+    if not files and (args.inputs or not cache_ops):
+        report.emit("error", "Không tìm thấy file .srt/.vtt", error="no input files")
+        return EXIT_USAGE
+
+    # import nặng chỉ khi thật sự dịch
+    import cache_manager
+    import translator
+    from metrics import METRICS, JsonLinesSink
+
+    try:
+        translator.get_router(args.provider)
+    except ValueError as e:
+        report.emit("error", str(e), error=str(e))
+        return EXIT_USAGE
+    langs = [lang.strip() for lang in args.lang.split(",") if lang.strip()] or ["vi"]
+    multi = len(langs) > 1 or args.multitrack
+    if multi and args.engine == "async":
+        report.emit("error", "Engine async chưa hỗ trợ nhiều ngôn ngữ", error="async multi-target")
+        return EXIT_USAGE
+    if args.resume and args.engine == "async":
+        report.emit("error", "Engine async chưa hỗ trợ --resume", error="async resume")
+        return EXIT_USAGE
+    if args.stream and multi:
+        report.emit("error", "--stream chưa hỗ trợ nhiều ngôn ngữ", error="stream multi-target")
+        return EXIT_USAGE
+    if args.plan and (multi or args.engine == "async" or args.stream):
+        report.emit("error", "--plan không dùng chung được với nhiều ngôn ngữ, engine async "
+                             "hay --stream", error="plan combination")
+        return EXIT_USAGE
+
+    sink = METRICS.add_sink(JsonLinesSink(args.metrics_jsonl)) if args.metrics_jsonl else None
+    stopped = {"flag": False}
+
+    def on_sigint(signum, frame):
+        stopped["flag"] = True
+        report.emit("interrupt", "⛔ Đang dừng...")
+
+    signal.signal(signal.SIGINT, on_sigint)
+
+    shared = args.shared_cache or os.getenv(cache_manager.SHARED_CACHE_ENV) or None
+    if args.cache_db:
+        cache = cache_manager.TranslationCache(path=args.cache_db, fuzzy=args.fuzzy,
+                                               shared=shared)
+    else:
+        cache = cache_manager.load_cache(fuzzy=args.fuzzy, shared=shared)
+    for path in args.import_cache:
+        try:
+            result = cache_manager.import_cache(cache, path, policy=args.merge)
+        except (OSError, ValueError) as e:
+            report.emit("error", f"❌ Không nhập được cache {path}: {e}", error=str(e))
+            cache.close()
+            if sink:
+                METRICS.remove_sink(sink)
+                sink.close()
+            return EXIT_USAGE
+        report.emit("cache_import", f"📥 {path}: {result['records']} bản dịch, "
+                                    f"{result['added']} mới", path=path, **result)
+
+    options = dict(
+        cache=cache, dest_lang=langs[0], output_mode=args.mode, encoding=args.encoding,
+        output_encoding=args.output_encoding,
+        save_choice=2 if args.output_dir else 1, output_folder=args.output_dir,
+        stop_event=lambda: stopped["flag"], retries=args.retries, batch=not args.no_batch,
+        rate=args.rate, provider=args.provider, incremental=args.incremental,
+    )
+    if args.engine == "async":
+        options.update(engine="async", max_concurrency=args.concurrency)
+    else:
+        options.update(chunk_size=max(1, args.chunk_size), max_workers=max(1, args.workers))
+        if args.stream:
+            options["streaming"] = True
+    if multi:
+        options.update(dest_langs=langs, multitrack=args.multitrack)
+
+    if files:
+        report.emit("start", f"🔄 {len(files)} file → {args.lang}", files=len(files))
+    failed = []
+    outputs = []
+    journals = []
+    failed_before = METRICS.total("translation_failed_total")
+    if args.engine != "async":
+        journals = [translator.open_job_journal(files, lang, args.mode, args.provider,
+                                                resume=args.resume) for lang in langs]
+        options["journal"] = dict(zip(langs, journals)) if multi else journals[0]
+
+    def on_file(path, output, error):
+        if error is not None:
+            failed.append(path)
+            report.emit("file_error", f"❌ {path}: {error}", file=path, error=str(error))
+        elif output:
+            report.emit("file_done", f"✅ {output}", file=path, output=output, outputs=[output])
+        else:
+            report.emit("file_skipped", f"⚠️ Không có cue: {path}", file=path)
+
+    if args.plan:
+        def on_plan(plan):
+            report.emit("plan", plan.summary(), total=plan.total, unique=len(plan.unique),
+                        cached=len(plan.cached), residue=len(plan.residue),
+                        unique_ratio=round(plan.unique_ratio, 4))
+        options.update(plan=True, plan_callback=on_plan,
+                       progress_callback=lambda d, t, s=None: report.progress(None, d, t, s))
+    else:
+        # 1 lượt cho mọi file: pool chung, file nào xong báo ngay qua on_file
+        options.update(pipeline="streaming" not in options,
+                       progress_callback=lambda d, t, s=None: report.progress(
+                           s.get("file") if s else None, d, t, s))
+    try:
+        outputs = translator.translate_srt_files(files, file_callback=on_file, **options)
+    except Exception as e:
+        report.emit("error", f"❌ {e}", error=str(e))
+        failed.extend(f for f in files if f not in failed)
+
+    untranslated = int(METRICS.total("translation_failed_total") - failed_before)
+    if untranslated:
+        report.emit("untranslated", f"⚠️ {untranslated} đoạn dịch không được, giữ nguyên bản gốc "
+                                    f"(chạy lại với --resume để dịch nốt)", count=untranslated)
+    for journal in journals:
+        journal.close(remove=not stopped["flag"] and not failed and not untranslated)
+    cache_manager.save_cache(cache)
+    try:
+        if args.export_cache:
+            count = cache_manager.export_cache(cache, args.export_cache)
+            report.emit("cache_export", f"📤 Đã xuất {count} bản dịch: {args.export_cache}",
+                        path=args.export_cache, records=count)
+        if args.publish_cache:
+            cache.snapshot(args.publish_cache)
+            report.emit("cache_publish", f"🌐 Đã ghi cache chung: {args.publish_cache}",
+                        path=args.publish_cache)
+    except (OSError, sqlite3.Error) as e:
+        report.emit("error", f"❌ Không ghi được cache: {e}", error=str(e))
+        failed.append(args.export_cache or args.publish_cache)
+    if sink:
+        METRICS.remove_sink(sink)
+        sink.close()
+        METRICS.write_json(args.metrics_jsonl)
+    if args.metrics_prom:
+        report.write_metrics()
+    report.emit("summary", f"🎉 Xong {len(outputs)}/{len(files)} file, lỗi {len(failed)}",
+                files=len(files), outputs=len(outputs), failed=len(failed),
+                untranslated=untranslated,
+                interrupted=stopped["flag"], cache=cache.stats(),
+                suggestions=list(cache.suggestions), metrics=METRICS.summary(),
+                providers=translator.get_router(args.provider).snapshot()["providers"])
+
+    if stopped["flag"]:
+        return EXIT_INTERRUPTED
+    if failed:
+        return EXIT_FAILED
+    return EXIT_PARTIAL if untranslated else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
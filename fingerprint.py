@@ -0,0 +1,105 @@
+"""Dấu vết (fingerprint) của lần dịch trước, dùng để dịch lại tăng dần.
+
+Mỗi file đầu ra có 1 fingerprint: hash nội dung file nguồn, kích thước/mtime
+file đầu ra và bản dịch của từng cue (theo hash text). Chạy lại với
+incremental: file nguồn không đổi thì giữ nguyên file đầu ra; chỉ đổi timing
+hay sửa vài dòng thì cue nào text không đổi lấy lại bản dịch cũ, chỉ cue
+mới/đã sửa được gửi đi dịch.
+"""
+import os
+import json
+import hashlib
+
+import cache_manager
+
+FINGERPRINTS_DIR = os.path.join(cache_manager.CACHE_DIR, "fingerprints")
+VERSION = 1
+
+
+def cue_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def clear_fingerprints():
+    """Xóa mọi fingerprint (vd khi xóa cache: lần sau dịch lại toàn bộ), trả về số file đã xóa"""
+    if not os.path.isdir(FINGERPRINTS_DIR):
+        return 0
+    removed = 0
+    for name in os.listdir(FINGERPRINTS_DIR):
+        if name.endswith((".json", ".json.tmp")):
+            os.remove(os.path.join(FINGERPRINTS_DIR, name))
+            removed += 1
+    return removed
+
+def _output_stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class Fingerprint:
+    """Fingerprint của 1 file đầu ra (JSON, ghi đè nguyên file mỗi lần lưu)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.source_hash = None  # None: lần trước chưa dịch xong
+        self.output = None  # [kích thước, mtime_ns] của file đầu ra lúc ghi
+        self.cues = {}  # hash text -> bản dịch
+        self._load()
+
+    @classmethod
+    def for_output(cls, source, output_path, **params):
+        os.makedirs(FINGERPRINTS_DIR, exist_ok=True)
+        key = json.dumps({"source": os.path.abspath(source),
+                          "output": os.path.abspath(output_path), **params},
+                         sort_keys=True, ensure_ascii=False)
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        return cls(os.path.join(FINGERPRINTS_DIR, name + ".json"))
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != VERSION:
+            return
+        self.source_hash = data.get("source")
+        self.output = data.get("output")
+        self.cues = data.get("cues", {})
+
+    def unchanged(self, source_hash, output_path):
+        """File nguồn giống lần trước và file đầu ra chưa bị sửa/xóa"""
+        return (self.source_hash is not None and self.source_hash == source_hash
+                and self.output == _output_stat(output_path))
+
+    def lookup(self, texts):
+        """Bản dịch lần trước của các text không đổi: {text: bản dịch}"""
+        found = {}
+        for text in texts:
+            translated = self.cues.get(cue_hash(text))
+            if translated is not None:
+                found[text] = translated
+        return found
+
+    def save(self, source_hash, output_path, texts, translations):
+        """Lưu lại sau khi ghi file đầu ra; chỉ giữ bản dịch các cue của file hiện tại.
+
+        source_hash=None khi job chưa dịch xong, lần sau vẫn dịch nốt phần thiếu.
+        """
+        self.source_hash = source_hash
+        self.output = _output_stat(output_path)
+        self.cues = {cue_hash(t): translations[t] for t in texts if t in translations}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "source": self.source_hash, "output": self.output,
+                       "cues": self.cues}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
@@ -1,12 +1,19 @@
 import os
+import queue
 import threading
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
-from tkinter import filedialog, StringVar, IntVar, messagebox
+from tkinter import filedialog, StringVar, IntVar, DoubleVar, BooleanVar, Menu, messagebox
 from tkinter import scrolledtext
 
-from cache_manager import load_cache, save_cache, clear_cache, cache_size_bytes
-from translator import translate_srt_files
+from metrics import METRICS
+# translator/cache_manager nạp ở luồng nền sau khi cửa sổ đã hiện (xem _load_backend)
+
+
+POLL_MS = 100  # chu kỳ GUI lấy sự kiện từ luồng dịch
+
+LANGUAGES = [("vi", "Vietnamese"), ("en", "English"), ("fr", "French"),
+             ("es", "Spanish"), ("de", "German"), ("pt", "Portuguese")]
 
 
 class TranslatorGUI(tb.Window):
@@ -22,25 +29,29 @@ class TranslatorGUI(tb.Window):
         # state
         self.files = []
         self.output_folder = None
-        self.cache = load_cache()
+        self.cache = None  # mở ở luồng nền
 
-        # control flags
-        self._stop_flag = False
-        self._pause_event = threading.Event()
+        # điều khiển job + hàng đợi sự kiện từ luồng dịch (chỉ luồng Tk đụng tới widget)
+        self._control = None
+        self._events = queue.Queue()
 
         # UI vars
-        self.encoding_var = StringVar(value="utf-8")
-        self.dest_lang = StringVar(value="vi — Vietnamese (vi)")
+        self.encoding_var = StringVar(value="auto")
+        self.lang_vars = {code: BooleanVar(value=(code == "vi")) for code, _ in LANGUAGES}
+        self.multitrack_var = BooleanVar(value=False)
         self.output_mode = StringVar(value="bilingual")
         self.service_var = StringVar(value="google")
 
         self.chunk_size = IntVar(value=20)
         self.max_workers = IntVar(value=4)
-        self.sleep_min = IntVar(value=1)
-        self.sleep_max = IntVar(value=3)
+        self.rate = DoubleVar(value=5.0)
+        self.resume_var = BooleanVar(value=True)
+        self.incremental_var = BooleanVar(value=True)
 
         self._build_ui()
-        self._update_cache_label()
+        self.after(POLL_MS, self._poll_events)
+        self.after_idle(lambda: threading.Thread(target=self._load_backend, name="backend-loader",
+                                                 daemon=True).start())
 
     # ---------------- UI ----------------
     def _build_ui(self):
@@ -64,17 +75,18 @@ class TranslatorGUI(tb.Window):
         out_frame.columnconfigure(1, weight=1)
 
         tb.Label(out_frame, text="Dịch sang:").grid(row=0, column=0, sticky=W, padx=6, pady=6)
-        tb.Combobox(out_frame, textvariable=self.dest_lang,
-                    values=[
-                        "vi — Vietnamese (vi)", "en — English (en)",
-                        "fr — French (fr)", "es — Spanish (es)",
-                        "de — German (de)", "pt — Portuguese (pt)"
-                    ],
-                    width=32, state="readonly").grid(row=0, column=1, padx=6, pady=6, sticky="w")
+        # chọn nhiều ngôn ngữ: dịch 1 lượt, mỗi ngôn ngữ 1 file
+        self.lang_button = tb.Menubutton(out_frame, text="vi", width=30, bootstyle="secondary-outline")
+        lang_menu = Menu(self.lang_button, tearoff=False)
+        for code, name in LANGUAGES:
+            lang_menu.add_checkbutton(label=f"{code} — {name}", variable=self.lang_vars[code],
+                                      command=self._update_lang_button)
+        self.lang_button.configure(menu=lang_menu)
+        self.lang_button.grid(row=0, column=1, padx=6, pady=6, sticky="w")
 
         tb.Label(out_frame, text="Encoding:").grid(row=0, column=2, sticky=W, padx=6, pady=6)
         tb.Combobox(out_frame, textvariable=self.encoding_var,
-                    values=["utf-8", "utf-16", "utf-8-sig"],
+                    values=["auto", "utf-8", "utf-8-sig", "utf-16", "cp1252", "shift_jis", "gb18030"],
                     width=14, state="readonly").grid(row=0, column=3, padx=6, pady=6, sticky="w")
 
         tb.Label(out_frame, text="Output mode:").grid(row=1, column=0, sticky=W, padx=6, pady=4)
@@ -82,10 +94,12 @@ class TranslatorGUI(tb.Window):
                        value="bilingual").grid(row=1, column=1, sticky=W, padx=6)
         tb.Radiobutton(out_frame, text="Destination only", variable=self.output_mode,
                        value="dest_only").grid(row=1, column=2, sticky=W, padx=6)
+        tb.Checkbutton(out_frame, text="1 file VTT chứa mọi ngôn ngữ", variable=self.multitrack_var,
+                       bootstyle="round-toggle").grid(row=1, column=3, sticky=W, padx=6)
 
         tb.Label(out_frame, text="Dịch vụ:").grid(row=2, column=0, sticky=W, padx=6, pady=4)
         tb.Combobox(out_frame, textvariable=self.service_var,
-                    values=["google", "mymemory"],
+                    values=["google", "mymemory", "google+mymemory"],
                     width=20, state="readonly").grid(row=2, column=1, padx=6, pady=6, sticky="w")
 
         # 3) Performance
@@ -97,10 +111,13 @@ class TranslatorGUI(tb.Window):
         tb.Label(perf_frame, text="Max workers:").grid(row=0, column=2, sticky=W, padx=6, pady=3)
         tb.Entry(perf_frame, textvariable=self.max_workers, width=8).grid(row=0, column=3, padx=6, pady=3)
 
-        tb.Label(perf_frame, text="Sleep min (s):").grid(row=1, column=0, sticky=W, padx=6, pady=3)
-        tb.Entry(perf_frame, textvariable=self.sleep_min, width=8).grid(row=1, column=1, padx=6, pady=3)
-        tb.Label(perf_frame, text="Sleep max (s):").grid(row=1, column=2, sticky=W, padx=6, pady=3)
-        tb.Entry(perf_frame, textvariable=self.sleep_max, width=8).grid(row=1, column=3, padx=6, pady=3)
+        tb.Label(perf_frame, text="Rate ban đầu (req/s):").grid(row=1, column=0, sticky=W, padx=6, pady=3)
+        tb.Entry(perf_frame, textvariable=self.rate, width=8).grid(row=1, column=1, padx=6, pady=3)
+        tb.Checkbutton(perf_frame, text="Tiếp tục job dở (resume)", variable=self.resume_var,
+                       bootstyle="round-toggle").grid(row=1, column=2, columnspan=2, sticky=W, padx=6, pady=3)
+        tb.Checkbutton(perf_frame, text="Chỉ dịch cue mới/đã sửa (incremental)",
+                       variable=self.incremental_var,
+                       bootstyle="round-toggle").grid(row=1, column=4, sticky=W, padx=6, pady=3)
 
         # 4) Buttons
         btn_frame = tb.Frame(self)
@@ -108,7 +125,8 @@ class TranslatorGUI(tb.Window):
         btn_frame.columnconfigure(4, weight=1)
 
         self.start_btn = tb.Button(btn_frame, text="▶ Bắt đầu", bootstyle="success",
-                                   command=self.start_translation)
+                                   command=self.start_translation,
+                                   state="disabled")  # bật khi cache đã mở xong
         self.start_btn.grid(row=0, column=0, padx=4, pady=2, sticky="w")
 
         self.pause_btn = tb.Button(btn_frame, text="⏸ Pause", bootstyle="warning-outline",
@@ -122,14 +140,20 @@ class TranslatorGUI(tb.Window):
         tb.Button(btn_frame, text="💾 Chọn thư mục lưu...", bootstyle="info",
                   command=self.choose_output_folder).grid(row=0, column=3, padx=8, pady=2, sticky="w")
 
+        tb.Button(btn_frame, text="📤 Xuất cache", bootstyle="secondary-outline",
+                  command=self._export_cache).grid(row=0, column=5, padx=4, pady=2, sticky="e")
+        tb.Button(btn_frame, text="📥 Nhập cache", bootstyle="secondary-outline",
+                  command=self._import_cache).grid(row=0, column=6, padx=4, pady=2, sticky="e")
+        tb.Button(btn_frame, text="📊 Xuất metrics", bootstyle="secondary-outline",
+                  command=self._export_metrics).grid(row=0, column=7, padx=4, pady=2, sticky="e")
         tb.Button(btn_frame, text="🧹 Clear Cache", bootstyle="danger-outline",
-                  command=self._clear_cache).grid(row=0, column=5, padx=4, pady=2, sticky="e")
+                  command=self._clear_cache).grid(row=0, column=8, padx=4, pady=2, sticky="e")
 
         # 5) Progress + Log
         prog_frame = tb.Labelframe(self, text="Progress", padding=8)
         prog_frame.grid(row=4, column=0, sticky="nsew", padx=PADX, pady=(4, 6))
         prog_frame.columnconfigure(0, weight=1)
-        prog_frame.rowconfigure(5, weight=1)
+        prog_frame.rowconfigure(6, weight=1)
 
         self.current_file_label = tb.Label(prog_frame, text="File hiện tại: —")
         self.current_file_label.grid(row=0, column=0, sticky="w", padx=4, pady=(2, 6))
@@ -143,9 +167,13 @@ class TranslatorGUI(tb.Window):
         self.total_progress = tb.Progressbar(prog_frame, maximum=100, bootstyle="success-striped")
         self.total_progress.grid(row=3, column=0, sticky="ew", padx=4, pady=3)
 
-        tb.Label(prog_frame, text="Log:").grid(row=4, column=0, sticky="nw", padx=4, pady=(6, 2))
+        self.metrics_label = tb.Label(prog_frame, text="Metrics: —", font=("Consolas", 9),
+                                      bootstyle="secondary", justify="left")
+        self.metrics_label.grid(row=4, column=0, sticky="w", padx=4, pady=(6, 2))
+
+        tb.Label(prog_frame, text="Log:").grid(row=5, column=0, sticky="nw", padx=4, pady=(6, 2))
         self.log_box = scrolledtext.ScrolledText(prog_frame, height=10, wrap="word", font=("Consolas", 9))
-        self.log_box.grid(row=5, column=0, sticky="nsew", padx=4, pady=(2, 4))
+        self.log_box.grid(row=6, column=0, sticky="nsew", padx=4, pady=(2, 4))
 
         # 6) Footer
         footer_frame = tb.Frame(self)
@@ -157,25 +185,103 @@ class TranslatorGUI(tb.Window):
                  anchor=CENTER,
                  bootstyle="secondary").pack(fill="x")
 
-        self.cache_label = tb.Label(footer_frame, text="Cache size: 0.00 MB",
+        self.cache_label = tb.Label(footer_frame, text="Cache: đang mở...",
                                     font=("Segoe UI", 9), bootstyle="secondary")
         self.cache_label.pack(fill="x")
 
         self._log("Ứng dụng sẵn sàng. Chọn file hoặc folder để bắt đầu.")
 
+    def _selected_langs(self):
+        return [code for code, _ in LANGUAGES if self.lang_vars[code].get()]
+
+    def _update_lang_button(self):
+        self.lang_button.configure(text=", ".join(self._selected_langs()) or "(chưa chọn)")
+
     # ---------------- Cache ----------------
+    def _load_backend(self):
+        """Luồng nền: nạp translator (và các thư viện của nó) rồi mở cache"""
+        try:
+            import translator  # noqa: F401 - nạp sẵn để lần bấm Bắt đầu đầu tiên không phải chờ
+            from cache_manager import load_cache
+            self._events.put(("backend", load_cache()))
+        except Exception as e:
+            self._events.put(("log", f"❌ Không mở được cache: {e}"))
+
+    def _on_backend_ready(self, cache):
+        self.cache = cache
+        self.start_btn.configure(state="normal")
+        self._update_cache_label()
+        if cache.shared_path:
+            self._append_log(f"🌐 Cache chung (chỉ đọc): {cache.shared_path}")
+
+    def _cache_ready(self):
+        if self.cache is None:
+            self._log("⏳ Cache đang được mở, thử lại sau giây lát.")
+            return False
+        return True
+
     def _update_cache_label(self):
+        from cache_manager import cache_size_bytes
         size_mb = cache_size_bytes() / 1024.0
         self.cache_label.configure(text=f"Cache size: {size_mb:.2f} MB")
 
     def _clear_cache(self):
-        if messagebox.askyesno("Xóa cache", "Bạn có chắc muốn xóa toàn bộ cache dịch?"):
-            clear_cache()
-            self.cache = {}
-            save_cache(self.cache)
-            self._log("🧹 Cache đã được xóa.")
+        if not self._cache_ready():
+            return
+        if str(self.start_btn.cget("state")) == "disabled":
+            self._log("⏳ Đang dịch, hãy dừng job trước khi xóa cache.")
+            return
+        if messagebox.askyesno("Xóa cache", "Bạn có chắc muốn xóa toàn bộ cache dịch?\n"
+                               "Fingerprint (dịch tăng dần) và journal (resume) cũng bị xóa, "
+                               "lần chạy sau dịch lại toàn bộ."):
+            from fingerprint import clear_fingerprints
+            from journal import clear_journals
+            self.cache.clear()
+            # không xóa thì incremental/resume dùng lại bản dịch cũ, 0 request
+            clear_fingerprints()
+            clear_journals()
+            self._log("🧹 Cache, fingerprint và journal đã được xóa.")
             self._update_cache_label()
 
+    def _export_cache(self):
+        if not self._cache_ready():
+            return
+        path = filedialog.asksaveasfilename(
+            title="Xuất cache", defaultextension=".jsonl.gz",
+            filetypes=[("Cache nén (JSON lines)", "*.jsonl.gz")])
+        if not path:
+            return
+
+        def run():
+            from cache_manager import export_cache
+            try:
+                count = export_cache(self.cache, path)
+                self._log(f"📤 Đã xuất {count} bản dịch: {path}")
+            except Exception as e:
+                self._log(f"❌ Không xuất được cache: {e}")
+        threading.Thread(target=run, daemon=True).start()
+
+    def _import_cache(self):
+        if not self._cache_ready():
+            return
+        paths = filedialog.askopenfilenames(
+            title="Nhập cache", filetypes=[("Cache đã xuất", "*.jsonl.gz *.jsonl"),
+                                           ("All files", "*.*")])
+        if not paths:
+            return
+
+        def run():
+            from cache_manager import import_cache
+            for path in paths:
+                try:
+                    result = import_cache(self.cache, path)
+                    self._log(f"📥 {os.path.basename(path)}: {result['records']} bản dịch, "
+                              f"{result['added']} mới")
+                except Exception as e:
+                    self._log(f"❌ Không nhập được {path}: {e}")
+            self._events.put(("cache_changed", None))
+        threading.Thread(target=run, daemon=True).start()
+
     # ---------------- File handlers ----------------
     def choose_files(self):
         files = filedialog.askopenfilenames(
@@ -210,120 +316,223 @@ class TranslatorGUI(tb.Window):
         if not self.files:
             messagebox.showwarning("Chưa chọn file", "Bạn chưa chọn file hoặc folder chứa file .srt/.vtt")
             return
+        if not self._selected_langs():
+            messagebox.showwarning("Chưa chọn ngôn ngữ", "Hãy chọn ít nhất 1 ngôn ngữ đích")
+            return
         self.start_btn.configure(state="disabled")
         self.pause_btn.configure(state="normal", text="⏸ Pause")
         self.stop_btn.configure(state="normal")
-        self._stop_flag = False
-        self._pause_event.clear()
-        threading.Thread(target=self._run_translation, daemon=True).start()
+        from translator import JobControl  # đã nạp sẵn ở luồng nền
+        self._control = JobControl()
+        # đọc biến Tk ở luồng chính, luồng dịch chỉ nhận giá trị thường
+        settings = dict(
+            files=list(self.files),
+            output_folder=self.output_folder,
+            langs=self._selected_langs(),
+            multitrack=self.multitrack_var.get(),
+            encoding=self.encoding_var.get(),
+            output_mode=self.output_mode.get(),
+            service=self.service_var.get(),
+            chunk_size=max(1, int(self.chunk_size.get())),
+            max_workers=max(1, int(self.max_workers.get())),
+            rate=max(0.1, float(self.rate.get())),
+            resume=self.resume_var.get(),
+            incremental=self.incremental_var.get(),
+        )
+        threading.Thread(target=self._run_translation, args=(self._control, settings),
+                         daemon=True).start()
+        self.after(1000, self._refresh_metrics)
 
     def pause_resume(self):
-        if self._pause_event.is_set():
-            self._pause_event.clear()
+        if self._control.is_set():
+            self._control.resume()
             self.pause_btn.configure(text="⏸ Pause")
             self._log("▶ Resume")
         else:
-            self._pause_event.set()
+            self._control.pause()
             self.pause_btn.configure(text="▶ Resume")
-            self._log("⏸ Paused — sẽ tạm dừng sau chunk hiện tại...")
+            self._log("⏸ Paused — các worker dừng trước request kế tiếp.")
 
     def stop_translation(self):
-        self._stop_flag = True
-        self._pause_event.clear()
-        self._log("⛔ Stop requested — sẽ dừng sau chunk hiện tại...")
-
-    def _run_translation(self):
-        total_files = len(self.files)
+        self._control.stop()
+        self.pause_btn.configure(state="disabled")
+        self.stop_btn.configure(state="disabled")
+        self._log("⛔ Stop requested — hủy các chunk đang chờ, ghi phần đã dịch...")
+
+    def _run_translation(self, control, settings):
+        from cache_manager import save_cache
+        from translator import translate_srt_files, get_router, open_job_journal
+
+        files = settings["files"]
+        langs = settings["langs"]
+        multitrack = settings["multitrack"]
+        total_files = len(files) * (1 if multitrack else len(langs))
+        output_mode = settings["output_mode"]
+        service = settings["service"]
+        max_workers = settings["max_workers"]
+        journals = {lang: open_job_journal(files, lang, output_mode, service,
+                                           resume=settings["resume"]) for lang in langs}
+        for lang, journal in journals.items():
+            if journal.done or journal.translations:
+                self._log(f"↩ Resume [{lang}]: {len(journal.done)} file đã xong, "
+                          f"{len(journal.translations)} cue đã dịch trong journal.")
+
+        self._log(f"🔄 Bắt đầu dịch {len(files)} file → {', '.join(langs)} "
+                  f"(pipeline, {max_workers} worker chung).")
         done_files = 0
-        dest_lang_code = self.dest_lang.get().split(" — ")[0]
-        encoding = self.encoding_var.get()
-        output_mode = self.output_mode.get()
-        service = self.service_var.get()
-        chunk_size = max(1, int(self.chunk_size.get()))
-        max_workers = max(1, int(self.max_workers.get()))
-        min_sleep = float(self.sleep_min.get())
-        max_sleep = float(self.sleep_max.get())
-
-        for fpath in self.files:
-            if self._stop_flag:
-                self._log("⛔ Đã dừng bởi user.")
-                break
-
-            filename = os.path.basename(fpath)
-            self._set_current_file(filename)
-            self._update_file_progress(0, 0, 1, filename)
-            self._log(f"🔄 Bắt đầu dịch: {fpath}")
-
-            try:
-                outputs = translate_srt_files(
-                    files=[fpath],
-                    cache=self.cache,
-                    dest_lang=dest_lang_code,
-                    output_mode=output_mode,
-                    save_choice=(2 if self.output_folder else 1),
-                    output_folder=self.output_folder,
-                    stop_event=lambda: self._stop_flag,
-                    pause_event=self._pause_event,
-                    progress_callback=lambda cur, tot, fname=filename: self._on_chunk_progress(cur, tot, fname),
-                    chunk_size=chunk_size,
-                    max_workers=max_workers,
-                    min_sleep=min_sleep,
-                    max_sleep=max_sleep,
-                    encoding=encoding,
-                    retries=4,
-                )
-                if outputs and not self._stop_flag:
-                    self._on_chunk_progress(1, 1, filename)
-                    self._log(f"✅ Hoàn thành: {outputs[0]}")
-                elif self._stop_flag:
-                    self._log("⛔ Đã dừng khi đang xử lý file.")
-                else:
-                    self._log("⚠️ Không có file đầu ra.")
-            except Exception as e:
-                self._log(f"❌ Lỗi khi dịch {fpath}: {e}")
+        failed = []
 
+        def on_file_done(fpath, output_path, error):
+            nonlocal done_files
             done_files += 1
+            if error is not None:
+                failed.append(fpath)
+                self._log(f"❌ Lỗi khi dịch {fpath}: {error}")
+            elif output_path:
+                self._log(f"✅ Hoàn thành: {output_path}")
+            else:
+                self._log(f"⚠️ Không có cue để dịch: {fpath}")
             self._update_total_progress(done_files, total_files)
 
+        def on_progress(cur, tot, stats=None):
+            if stats and "file" in stats:
+                filename = f"{os.path.basename(stats['file'])} [{stats['lang']}]"
+                self._on_chunk_progress(stats["file_done"], stats["file_total"], filename, stats)
+            elif stats:
+                self._on_chunk_progress(cur, tot, ", ".join(langs), stats)
+            else:
+                self._on_chunk_progress(cur, tot, "")
+
+        try:
+            translate_srt_files(
+                files=files,
+                pipeline=True,
+                cache=self.cache,
+                dest_langs=langs,
+                multitrack=multitrack,
+                output_mode=output_mode,
+                save_choice=(2 if settings["output_folder"] else 1),
+                output_folder=settings["output_folder"],
+                stop_event=control,
+                pause_event=control,
+                progress_callback=on_progress,
+                file_callback=on_file_done,
+                chunk_size=settings["chunk_size"],
+                max_workers=max_workers,
+                rate=settings["rate"],
+                provider=service,
+                journal=journals if len(langs) > 1 or multitrack else journals[langs[0]],
+                encoding=settings["encoding"],
+                incremental=settings["incremental"],
+                retries=4,
+            )
+        except Exception as e:
+            self._log(f"❌ Lỗi: {e}")
+
+        for name, st in get_router(service).snapshot()["providers"].items():
+            self._log(f"🔀 {name}: {st['routed']} request, {st['failures']} lỗi, "
+                      f"{st['throttled']} lần bị giới hạn, mạch {st['state']}")
+        for journal in journals.values():
+            journal.close(remove=not control.stopped and not failed)
         save_cache(self.cache)
+        stats = self.cache.stats()
+        self._log(f"📦 Cache: {stats['hits']} hit ({stats['exact_hits']} chính xác, "
+                  f"{stats['shared_hits']} từ cache chung, "
+                  f"{stats['normalized_hits']} chuẩn hóa, {stats['fuzzy_hits']} gần giống), "
+                  f"{stats['misses']} miss, {stats['coalesced']} gộp "
+                  f"({stats['hit_ratio'] * 100:.1f}%)")
+        self._events.put(("finished", control.stopped))
+
+    # ---------------- UI updates ----------------
+    def _poll_events(self):
+        """Lấy sự kiện từ luồng dịch theo lô: log ghi 1 lần, tiến độ chỉ giữ bản mới nhất"""
+        logs, latest, finished = [], {}, None
+        try:
+            while True:
+                kind, payload = self._events.get_nowait()
+                if kind == "log":
+                    logs.append(payload)
+                elif kind == "finished":
+                    finished = payload
+                else:
+                    latest[kind] = payload
+        except queue.Empty:
+            pass
+        if logs:
+            self._append_log("\n".join(logs))
+        if "file_progress" in latest:
+            self._update_file_progress(*latest["file_progress"])
+        if "total_progress" in latest:
+            done, total, percent = latest["total_progress"]
+            self.total_progress.configure(value=percent)
+            self.total_label.configure(text=f"Tổng tiến độ: {done}/{total} file ({percent:.1f}%)")
+        if "backend" in latest:
+            self._on_backend_ready(latest["backend"])
+        if "cache_changed" in latest:
+            self._update_cache_label()
+        if finished is not None:
+            self._on_finished(finished)
+        self.after(POLL_MS, self._poll_events)
+
+    def _on_finished(self, stopped):
         self._update_cache_label()
         self.start_btn.configure(state="normal")
         self.pause_btn.configure(state="disabled", text="⏸ Pause")
         self.stop_btn.configure(state="disabled")
-        if not self._stop_flag:
-            self._log("🎉 Hoàn thành tất cả file.")
-        else:
-            self._log("⛔ Đã dừng.")
+        self._refresh_metrics()
+        self._append_log("⛔ Đã dừng." if stopped else "🎉 Hoàn thành tất cả file.")
 
-    # ---------------- UI updates ----------------
-    def _on_chunk_progress(self, current, total, filename):
+    def _on_chunk_progress(self, current, total, filename, stats=None):
         percent = (current / total) * 100 if total else 0
-        self.after(0, self._update_file_progress, percent, current, total, filename)
+        self._events.put(("file_progress", (percent, current, total, filename, stats)))
 
-    def _update_file_progress(self, percent, current, total, filename):
+    def _update_file_progress(self, percent, current, total, filename, stats=None):
         self.file_progress.configure(value=percent)
-        self.current_file_label.configure(
-            text=f"File hiện tại: {filename} — {current}/{total} chunk ({percent:.1f}%)")
-        self.update_idletasks()
+        text = f"File hiện tại: {filename} — {current}/{total} chunk ({percent:.1f}%)"
+        if stats:
+            text += f" — {stats['rate']:.1f} req/s, {stats['throttled']} lần bị giới hạn"
+        self.current_file_label.configure(text=text)
 
     def _update_total_progress(self, done, total):
         percent = (done / total) * 100 if total else 0
-        self.after(0, lambda: (
-            self.total_progress.configure(value=percent),
-            self.total_label.configure(
-                text=f"Tổng tiến độ: {done}/{total} file ({percent:.1f}%)"),
-            self.update_idletasks()
-        ))
-
-    def _set_current_file(self, filename):
-        self.after(0, lambda: self.current_file_label.configure(text=f"File hiện tại: {filename}"))
+        self._events.put(("total_progress", (done, total, percent)))
+
+    def _refresh_metrics(self):
+        m = METRICS.summary()
+        self.metrics_label.configure(text=(
+            f"Request: {m['requests']} ({m['errors']} lỗi, TB {m['avg_latency'] * 1000:.0f} ms)"
+            f" — retry {m['retries']}, fallback {m['fallbacks']}, giữ nguyên {m['failed']}"
+            f" — gửi {m['bytes_sent'] / 1024:.1f} KB\n"
+            f"Thời gian (thread-giây): làm việc {m['working']:.1f}s, chờ {m['sleeping']:.1f}s"
+            f" (rate limit {m['rate_limit_sleep']:.1f}s, backoff {m['backoff_sleep']:.1f}s,"
+            f" pause {m['pause_sleep']:.1f}s), cache {m['cache_time']:.2f}s"
+            f" — cache hit {m['cache_hit_ratio'] * 100:.1f}%"))
+        if str(self.start_btn.cget("state")) == "disabled":
+            self.after(1000, self._refresh_metrics)  # cập nhật liên tục khi đang dịch
+
+    def _export_metrics(self):
+        path = filedialog.asksaveasfilename(
+            title="Xuất metrics", defaultextension=".prom",
+            filetypes=[("Prometheus text", "*.prom"), ("JSON lines", "*.jsonl")])
+        if not path:
+            return
+        try:
+            if path.endswith(".jsonl"):
+                METRICS.write_json(path)
+            else:
+                METRICS.write_prometheus(path)
+            self._log(f"📊 Đã xuất metrics: {path}")
+        except Exception as e:
+            self._log(f"❌ Không xuất được metrics: {e}")
 
     def _log(self, text):
-        self.after(0, self._append_log, text)
+        """Gọi được từ mọi luồng: dòng log được GUI lấy ra ở lần poll kế tiếp"""
+        self._events.put(("log", text))
 
     def _append_log(self, text):
         self.log_box.insert("end", text + "\n")
         self.log_box.see("end")
         # giữ log không quá dài
-        if int(self.log_box.index("end-1c").split(".")[0]) > 500:
-            self.log_box.delete("1.0", "2.0")
+        extra = int(self.log_box.index("end-1c").split(".")[0]) - 500
+        if extra > 0:
+            self.log_box.delete("1.0", f"{extra + 1}.0")
@@ -0,0 +1,101 @@
+import os
+import json
+import hashlib
+import threading
+
+import cache_manager
+
+JOBS_DIR = os.path.join(cache_manager.CACHE_DIR, "jobs")
+
+
+def job_id(files, **params):
+    """Id ổn định cho 1 job: cùng danh sách file + tham số thì cùng journal"""
+    key = json.dumps({"files": sorted(os.path.abspath(f) for f in files), **params},
+                     sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def clear_journals():
+    """Xóa journal của mọi job (vd khi xóa cache), trả về số file đã xóa"""
+    if not os.path.isdir(JOBS_DIR):
+        return 0
+    removed = 0
+    for name in os.listdir(JOBS_DIR):
+        if name.endswith(".jsonl"):
+            os.remove(os.path.join(JOBS_DIR, name))
+            removed += 1
+    return removed
+
+
+class JobJournal:
+    """Journal ghi nối (JSON lines) các bản dịch đã xong và các file đã ghi xong.
+
+    Mỗi dòng là {"t": text gốc, "r": bản dịch} hoặc {"done": file nguồn, "out": file đích}.
+    Job bị dừng/crash có thể chạy lại với resume để bỏ qua phần đã làm.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.translations = {}
+        self.done = {}  # file nguồn -> file đích
+        self._lock = threading.Lock()
+        self._file = None
+        self._load()
+
+    @classmethod
+    def for_job(cls, files, **params):
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        return cls(os.path.join(JOBS_DIR, job_id(files, **params) + ".jsonl"))
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # dòng cuối bị ghi dở khi crash
+                if "done" in record:
+                    self.done[record["done"]] = record.get("out")
+                elif "t" in record:
+                    self.translations[record["t"]] = record["r"]
+
+    def _write(self, records):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            for record in records:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def record(self, translations):
+        """Ghi các bản dịch vừa xong"""
+        new = {t: r for t, r in translations.items() if self.translations.get(t) != r}
+        if not new:
+            return
+        self.translations.update(new)
+        self._write({"t": t, "r": r} for t, r in new.items())
+
+    def mark_done(self, path, output_path):
+        self.done[path] = output_path
+        self._write([{"done": path, "out": output_path}])
+
+    def is_done(self, path, output_path):
+        return self.done.get(path) == output_path and os.path.exists(output_path)
+
+    def reset(self):
+        """Bỏ journal cũ, bắt đầu job mới"""
+        self.close()
+        self.translations.clear()
+        self.done.clear()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def close(self, remove=False):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,6 +1,13 @@
-from gui import TranslatorGUI
+import sys
+
 
 def main():
+    # có tham số dòng lệnh thì chạy chế độ CLI, không tải Tk
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        sys.exit(cli_main())
+
+    from gui import TranslatorGUI
     app = TranslatorGUI()
     app.mainloop()
 
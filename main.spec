@@ -1,4 +1,6 @@
 # -*- mode: python ; coding: utf-8 -*-
+# Build dạng thư mục (onedir) và không nén UPX: file .exe mở nhanh vì không
+# phải giải nén toàn bộ thư viện ra thư mục tạm mỗi lần chạy như bản onefile.
 
 
 a = Analysis(
@@ -10,7 +12,8 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # chỉ dùng khi đo hiệu năng, không cần trong bản phát hành
+    excludes=['benchmark', 'mock_provider'],
     noarchive=False,
     optimize=0,
 )
@@ -19,16 +22,13 @@ pyz = PYZ(a.pure)
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='main',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -36,3 +36,12 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='main',
+)
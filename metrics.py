@@ -0,0 +1,243 @@
+"""Số liệu trên đường dịch: thời gian request, retry/fallback, cache, thời gian chờ.
+
+Mọi số liệu gom vào METRICS (dùng chung trong process). Xuất ra JSON lines
+(JsonLinesSink nhận từng sự kiện để trace) hoặc file text kiểu Prometheus.
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# ngưỡng histogram độ trễ (giây)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = "srt_translator_"
+
+_HELP = {
+    "provider_requests_total": "Số request gửi tới provider, theo kết quả",
+    "provider_request_seconds": "Độ trễ mỗi request tới provider",
+    "provider_bytes_sent_total": "Số byte text gửi đi",
+    "retries_total": "Số lần thử lại sau lỗi",
+    "fallbacks_total": "Số request chuyển sang provider dự phòng",
+    "batch_split_fallbacks_total": "Số batch lệch số dòng phải dịch lại từng dòng",
+    "translation_failed_total": "Số text hỏng hết provider, giữ nguyên bản gốc",
+    "sleep_seconds_total": "Thời gian chờ (rate limit, backoff, pause)",
+    "chunk_seconds": "Thời gian xử lý mỗi chunk",
+    "cache_lookup_seconds": "Thời gian tra cache mỗi lần",
+    "cache_flush_seconds": "Thời gian ghi cache xuống đĩa",
+}
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in key) + "}"
+
+
+class JsonLinesSink:
+    """Ghi mỗi sự kiện thành 1 dòng JSON (dùng với Metrics.add_sink)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __call__(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line)
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class Metrics:
+    """Counter + histogram có nhãn, an toàn giữa nhiều luồng.
+
+    Collector (name -> hàm trả về [(tên, {nhãn}, giá trị)]) cung cấp các gauge
+    đọc tại thời điểm xuất, vd hit ratio của cache hay tốc độ của rate limiter.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # (tên, nhãn) -> giá trị
+        self._histograms = {}  # (tên, nhãn) -> [count, sum, [đếm theo bucket]]
+        self._collectors = {}
+        self._sinks = []
+        self.started = time.time()
+
+    # ---------- ghi ----------
+    def incr(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [0, 0.0, [0] * len(LATENCY_BUCKETS)]
+            hist[0] += 1
+            hist[1] += seconds
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    hist[2][i] += 1
+                    break
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started, **labels)
+
+    def event(self, kind, **data):
+        """Gửi 1 sự kiện trace tới các sink (không làm gì nếu chưa có sink)"""
+        if not self._sinks:
+            return
+        record = {"ts": round(time.time(), 3), "event": kind, **data}
+        for sink in list(self._sinks):
+            try:
+                sink(record)
+            except Exception:
+                pass
+
+    @property
+    def tracing(self):
+        return bool(self._sinks)
+
+    def add_sink(self, sink):
+        self._sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        if sink in self._sinks:
+            self._sinks.remove(sink)
+
+    def add_collector(self, name, fn):
+        self._collectors[name] = fn
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started = time.time()
+
+    # ---------- đọc ----------
+    def _gauges(self):
+        gauges = []
+        for fn in list(self._collectors.values()):
+            try:
+                gauges.extend(fn())
+            except Exception:
+                pass
+        return gauges
+
+    def snapshot(self):
+        """Toàn bộ số liệu dạng dict (để ghi JSON)"""
+        with self._lock:
+            counters = [{"name": n, "labels": dict(k), "value": v}
+                        for (n, k), v in self._counters.items()]
+            histograms = [{"name": n, "labels": dict(k), "count": h[0], "sum": round(h[1], 6),
+                           "buckets": dict(zip(LATENCY_BUCKETS, h[2]))}
+                          for (n, k), h in self._histograms.items()]
+        gauges = [{"name": n, "labels": labels, "value": v} for n, labels, v in self._gauges()]
+        return {"ts": round(time.time(), 3), "uptime": round(time.time() - self.started, 3),
+                "counters": counters, "histograms": histograms, "gauges": gauges}
+
+    def total(self, name, **match):
+        """Tổng counter (hoặc sum của histogram) theo tên, lọc theo nhãn"""
+        with self._lock:
+            total = 0
+            for (n, key), value in self._counters.items():
+                if n == name and all(dict(key).get(k) == v for k, v in match.items()):
+                    total += value
+            for (n, key), hist in self._histograms.items():
+                if n == name and all(dict(key).get(k) == v for k, v in match.items()):
+                    total += hist[1]
+            return total
+
+    def count(self, name, **match):
+        with self._lock:
+            return sum(h[0] for (n, key), h in self._histograms.items()
+                       if n == name and all(dict(key).get(k) == v for k, v in match.items()))
+
+    def summary(self):
+        """Các số chính cho bảng tóm tắt trên GUI"""
+        requests = self.count("provider_request_seconds")
+        request_time = self.total("provider_request_seconds")
+        sleeping = self.total("sleep_seconds_total")
+        gauges = {(n, _label_key(labels)): v for n, labels, v in self._gauges()}
+        return {
+            "requests": requests,
+            "errors": self.total("provider_requests_total", outcome="error"),
+            "avg_latency": request_time / requests if requests else 0.0,
+            "retries": self.total("retries_total"),
+            "fallbacks": self.total("fallbacks_total"),
+            "failed": self.total("translation_failed_total"),
+            "bytes_sent": self.total("provider_bytes_sent_total"),
+            "working": self.total("chunk_seconds") - sleeping,
+            "sleeping": sleeping,
+            "rate_limit_sleep": self.total("sleep_seconds_total", reason="rate_limit"),
+            "backoff_sleep": self.total("sleep_seconds_total", reason="backoff"),
+            "pause_sleep": self.total("sleep_seconds_total", reason="pause"),
+            "cache_time": self.total("cache_lookup_seconds") + self.total("cache_flush_seconds"),
+            "cache_hit_ratio": gauges.get(("cache_hit_ratio", ()), 0.0),
+        }
+
+    # ---------- xuất ----------
+    def to_prometheus(self):
+        lines = []
+        described = set()
+
+        def header(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in _HELP:
+                    lines.append(f"# HELP {PREFIX}{name} {_HELP[name]}")
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        for (name, key), value in counters:
+            header(name, "counter")
+            lines.append(f"{PREFIX}{name}{_format_labels(key)} {value}")
+        for (name, key), (count, total, buckets) in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, buckets):
+                cumulative += n
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(key + (('le', bound),))} "
+                             f"{cumulative}")
+            lines.append(f"{PREFIX}{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {count}")
+            lines.append(f"{PREFIX}{name}_sum{_format_labels(key)} {total:.6f}")
+            lines.append(f"{PREFIX}{name}_count{_format_labels(key)} {count}")
+        for name, labels, value in sorted(self._gauges(), key=lambda g: g[0]):
+            header(name, "gauge")
+            lines.append(f"{PREFIX}{name}{_format_labels(_label_key(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Ghi file text (vd cho textfile collector của node_exporter), thay file cũ 1 lần"""
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+    def write_json(self, path):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"event": "snapshot", **self.snapshot()}, ensure_ascii=False) + "\n")
+
+
+METRICS = Metrics()
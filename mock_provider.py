@@ -0,0 +1,168 @@
+"""Server dịch giả lập (giống endpoint translate.google.com/m) để thử nghiệm không tốn quota"""
+import html
+import re
+import random
+import threading
+import time
+import http.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+_RESULT_RE = re.compile(r'<div class="result-container">(.*?)</div>', re.S)
+
+
+def _default_transform(text, dest_lang):
+    return text.upper()
+
+
+class MockTranslateServer:
+    """Chạy server giả lập ở 127.0.0.1 trong luồng nền.
+
+    latency: (min, max) giây trễ mỗi request
+    error_rate: tỉ lệ trả về 500
+    rate_limit: số request tối đa mỗi giây, vượt thì trả về 429 + Retry-After
+    """
+
+    def __init__(self, latency=(0.0, 0.0), error_rate=0.0, rate_limit=None,
+                 transform=_default_transform, port=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.transform = transform
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/m"
+
+    def _admit(self):
+        """Trả về mã lỗi nếu request bị chặn, None nếu được phục vụ"""
+        with self._lock:
+            self.requests += 1
+            if self.rate_limit:
+                now = time.monotonic()
+                if now - self._window_start >= 1.0:
+                    self._window_start, self._window_count = now, 0
+                self._window_count += 1
+                if self._window_count > self.rate_limit:
+                    self.throttled += 1
+                    return 429
+            if self.error_rate and random.random() < self.error_rate:
+                self.errors += 1
+                return 500
+        return None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # giữ kết nối keep-alive
+
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                text = query.get("q", [""])[0]
+                dest_lang = query.get("tl", [""])[0]
+                if server.latency[1]:
+                    time.sleep(random.uniform(*server.latency))
+
+                status = server._admit()
+                if status is None:
+                    translated = html.escape(server.transform(text, dest_lang))
+                    body = f'<html><div class="result-container">{translated}</div></html>'
+                    status = 200
+                else:
+                    body = "error"
+                data = body.encode("utf-8")
+                self.send_response(status)
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class MockHTTPError(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class MockTranslator:
+    """Client đồng bộ cho MockTranslateServer, cùng giao diện .translate(text) với deep_translator.
+
+    Mỗi luồng giữ 1 kết nối keep-alive; latencies (list) nhận độ trễ mỗi request.
+    """
+
+    _local = threading.local()
+
+    def __init__(self, url, source="auto", target="vi", latencies=None, timeout=15):
+        self.url = urlparse(url)
+        self.source = source
+        self.target = target
+        self.latencies = latencies
+        self.timeout = timeout
+
+    def _connection(self, fresh=False):
+        conns = self._local.__dict__.setdefault("conns", {})
+        key = self.url.netloc
+        if fresh or key not in conns:
+            if key in conns:
+                conns[key].close()
+            conns[key] = http.client.HTTPConnection(self.url.netloc, timeout=self.timeout)
+        return conns[key]
+
+    def translate(self, text):
+        path = self.url.path + "?" + urlencode({"sl": self.source, "tl": self.target, "q": text})
+        started = time.monotonic()
+        for attempt in range(2):
+            conn = self._connection(fresh=attempt > 0)
+            try:
+                conn.request("GET", path)
+                resp = conn.getresponse()
+                body = resp.read().decode("utf-8")
+                break
+            except (ConnectionError, http.client.HTTPException):
+                if attempt:
+                    raise  # server đóng kết nối keep-alive: mở lại 1 lần
+        if self.latencies is not None:
+            self.latencies.append(time.monotonic() - started)
+        if resp.status != 200:
+            raise MockHTTPError(resp.status, resp.getheader("Retry-After"))
+        m = _RESULT_RE.search(body)
+        return html.unescape(m.group(1)) if m else None
+
+
+def mock_factory(url, latencies=None):
+    """Factory (source, target) -> MockTranslator, dùng cho translator.Provider"""
+    return lambda source, target: MockTranslator(url, source, target, latencies)
@@ -0,0 +1,184 @@
+import time
+import random
+import threading
+
+DEFAULT_RATE = 5.0  # request/giây lúc bắt đầu
+MIN_RATE = 0.2
+MAX_RATE = 50.0
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+DECREASE_INTERVAL = 1.0  # mỗi giây chỉ giảm tốc độ 1 lần (nhiều 429 cùng đợt tính là 1)
+
+
+def classify_error(exc):
+    """Trả về (loại lỗi, retry_after): "throttle" (429), "server" (5xx) hoặc "other" """
+    status = getattr(exc, "status", None)
+    retry_after = getattr(exc, "retry_after", None)
+    response = getattr(exc, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+        headers = getattr(response, "headers", None) or {}
+        retry_after = retry_after or headers.get("Retry-After")
+    if status is None and type(exc).__name__ == "TooManyRequests":
+        status = 429  # deep_translator không gắn status code
+
+    try:
+        retry_after = float(retry_after) if retry_after is not None else None
+    except (TypeError, ValueError):
+        retry_after = None
+
+    if status == 429:
+        return "throttle", retry_after
+    if status is not None and 500 <= status < 600:
+        return "server", retry_after
+    return "other", retry_after
+
+
+class AdaptiveRateLimiter:
+    """Token bucket tự điều chỉnh tốc độ (AIMD).
+
+    Mỗi request thành công tăng tốc độ thêm `increase` req/s (giảm nhẹ nếu độ
+    trễ vượt latency_target), 429 thì chia đôi tốc độ và tạm dừng theo
+    Retry-After, lỗi 5xx thì giảm 25%.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, min_rate=MIN_RATE, max_rate=MAX_RATE,
+                 increase=0.1, latency_target=3.0):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.latency_target = latency_target
+        self._lock = threading.Lock()
+        self.reset(rate)
+
+    def reset(self, rate=DEFAULT_RATE):
+        """Về trạng thái ban đầu: tốc độ, thống kê, token và Retry-After đang chờ"""
+        with self._lock:
+            self.rate = float(rate)
+            self.initial_rate = None  # rate đã đặt qua get_limiter
+            self.requests = 0
+            self.throttled = 0
+            self.errors = 0
+            self._tokens = 1.0
+            self._last = time.monotonic()
+            self._blocked_until = 0.0
+            self._last_decrease = 0.0
+
+    def _try_acquire(self):
+        """Lấy 1 token nếu được (trả về 0), không thì trả về số giây nên chờ rồi thử lại.
+
+        Không giữ chỗ trước: mỗi lần thử lại đều tính theo tốc độ và Retry-After
+        hiện tại, 429 hay giảm tốc xảy ra lúc đang chờ vẫn có hiệu lực.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._blocked_until > now:
+                # không tích token trong lúc bị chặn, hết chặn không gửi dồn 1 loạt
+                self._tokens = min(self._tokens, 0.0)
+                self._last = now
+                return self._blocked_until - now
+            capacity = max(1.0, self.rate)
+            self._tokens = min(capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens < 1.0:
+                return (1.0 - self._tokens) / self.rate
+            self._tokens -= 1.0
+            self.requests += 1
+            return 0.0
+
+    def acquire(self, stop_event=None):
+        while True:
+            # ngủ từng đoạn ngắn để Stop có hiệu lực ngay
+            if stop_event and stop_event():
+                return
+            wait = self._try_acquire()
+            if wait <= 0:
+                return
+            time.sleep(min(wait, 0.2))
+
+    async def acquire_async(self, stop_event=None):
+        import asyncio  # chỉ engine async cần, tránh import khi khởi động
+
+        while True:
+            if stop_event and stop_event():
+                return
+            wait = self._try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait, 0.2))
+
+    def _decrease(self, factor):
+        now = time.monotonic()
+        if now - self._last_decrease >= DECREASE_INTERVAL:
+            self.rate = max(self.min_rate, self.rate * factor)
+            self._last_decrease = now
+
+    def on_success(self, latency=None):
+        with self._lock:
+            if latency is not None and latency > self.latency_target:
+                self._decrease(0.9)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_error(self, exc):
+        """Cập nhật tốc độ theo lỗi, trả về retry_after (nếu server gửi)"""
+        kind, retry_after = classify_error(exc)
+        with self._lock:
+            if kind == "throttle":
+                self.throttled += 1
+                self._decrease(0.5)
+                pause = retry_after if retry_after is not None else 1.0 / self.rate
+                self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+            elif kind == "server":
+                self.errors += 1
+                self._decrease(0.75)
+            else:
+                self.errors += 1
+        return retry_after
+
+    @staticmethod
+    def backoff(attempt, retry_after=None):
+        """Exponential backoff có jitter, ưu tiên Retry-After của server"""
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "rate": round(self.rate, 2),
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "errors": self.errors,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(name, rate=None):
+    """Limiter dùng chung theo provider.
+
+    rate là tốc độ ban đầu: chỉ áp dụng khi khác lần đặt trước (vd đổi --rate),
+    gọi lại với cùng rate cho mỗi file không xóa tốc độ đã học được.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = _limiters[name] = AdaptiveRateLimiter(rate or DEFAULT_RATE)
+            limiter.initial_rate = float(rate) if rate else None
+        elif rate and limiter.initial_rate != float(rate):
+            with limiter._lock:
+                limiter.rate = float(rate)
+            limiter.initial_rate = float(rate)
+        return limiter
+
+def reset_limiters():
+    """Đưa mọi limiter về trạng thái ban đầu (benchmark/test cần mỗi lần chạy bắt đầu lại từ đầu).
+
+    Reset tại chỗ, không tạo limiter mới: Provider giữ limiter lấy lúc đăng ký,
+    limiter mới sẽ không được provider nào dùng và rate truyền vào mất tác dụng.
+    """
+    with _limiters_lock:
+        for limiter in _limiters.values():
+            limiter.reset()
@@ -0,0 +1,367 @@
+"""Lập lịch dịch: pipeline nhiều file qua 1 pool chung và chế độ streaming cho file rất lớn.
+
+Pipeline: luồng đọc parse file kế tiếp trong khi các chunk của file trước còn
+đang chờ mạng; file nào đủ chunk thì được ghi ra ngay, không đợi cả batch.
+Streaming: đọc cue dần từ file, ghi bản dịch theo đúng thứ tự qua 1 bộ đệm sắp
+xếp lại có giới hạn, bộ nhớ không tăng theo kích thước file.
+"""
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cache_manager
+from subtitles import iter_cues, open_subtitle, output_encoding_for, write_cues
+from translator import (DEFAULT_PROVIDER, BATCH_MAX_CHARS, get_router, get_limiter,
+                        translate_chunk, chunk_translations, read_cues, write_subtitle_file,
+                        _cue_indices, _build_results, _output_path, _subtitle_type, _shutdown,
+                        open_fingerprint)
+from fingerprint import file_hash
+
+
+class _FileJob:
+    __slots__ = ("path", "lang", "cues", "indices", "output_path", "translations",
+                 "total_chunks", "done_chunks", "finished", "fingerprint", "source_hash")
+
+    def __init__(self, path, lang, cues, indices, output_path, translations,
+                 fingerprint=None, source_hash=None):
+        self.path = path
+        self.lang = lang
+        self.cues = cues
+        self.indices = indices
+        self.output_path = output_path
+        self.translations = translations
+        self.total_chunks = 0
+        self.done_chunks = 0
+        self.finished = False
+        self.fingerprint = fingerprint
+        self.source_hash = source_hash
+
+
+def translate_files_pipelined(files, cache, dest_lang="vi", output_mode="bilingual",
+                              chunk_size=10, max_workers=3, rate=None,
+                              stop_event=None, pause_event=None, progress_callback=None,
+                              file_callback=None, encoding="auto", save_choice=1,
+                              output_folder=None, retries=4, batch=True,
+                              provider=DEFAULT_PROVIDER, journal=None, max_queued=None,
+                              output_encoding=None, dest_langs=None, incremental=False):
+    """Dịch nhiều file qua 1 pool chung, trả về danh sách file đầu ra.
+
+    dest_langs: dịch mỗi file sang nhiều ngôn ngữ (parse 1 lần, mỗi ngôn ngữ 1
+    file đầu ra có mã ngôn ngữ trong tên); journal khi đó là {lang: JobJournal}.
+    incremental: file không đổi từ lần dịch trước được bỏ qua, file đã sửa chỉ
+    gửi đi dịch các cue mới/đã sửa (xem translator.translate_srt_file).
+
+    max_workers giới hạn số chunk đang dịch trên toàn bộ job (rate limiter của
+    provider giới hạn tốc độ), max_queued giới hạn số chunk đã parse nhưng chưa
+    dịch để bộ nhớ không phình ra. progress_callback(done, total, stats) nhận
+    tiến độ tổng theo chunk, stats có thêm file/file_done/file_total/
+    files_done/files_total. file_callback(path, output_path, error) được gọi
+    khi 1 file xong (output_path None nếu file không có cue hoặc lỗi).
+    """
+    router = get_router(provider)
+    if rate:
+        get_limiter(router.primary[0].name, rate)
+    stopped = lambda: bool(stop_event and stop_event())
+    langs = list(dest_langs) if dest_langs else [dest_lang]
+    journals = journal if isinstance(journal, dict) else {lang: journal for lang in langs}
+    out_encoding = output_encoding_for(encoding, output_encoding)
+
+    events = queue.Queue()
+    slots = threading.Semaphore(max_queued or max_workers * 4)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def on_chunk_done(future, job, chunk):
+        slots.release()
+        events.put(("chunk", job, chunk, future))
+
+    def producer():
+        submitted = 0
+        try:
+            for path in files:
+                if stopped():
+                    break
+                pending = []
+                skipped = 0
+                source_hash = None
+                try:
+                    for lang in langs:
+                        output_path = _output_path(path, _subtitle_type(path), output_mode,
+                                                   save_choice, output_folder,
+                                                   dest_lang=lang if dest_langs else None)
+                        lang_journal = journals[lang]
+                        if lang_journal and lang_journal.is_done(path, output_path):
+                            events.put(("skip", path, output_path))
+                            skipped += 1
+                            continue
+                        fingerprint = None
+                        if incremental:
+                            source_hash = source_hash or file_hash(path)
+                            fingerprint = open_fingerprint(path, output_path, lang, output_mode,
+                                                           provider, out_encoding)
+                            if fingerprint.unchanged(source_hash, output_path):
+                                events.put(("skip", path, output_path))
+                                skipped += 1
+                                continue
+                        pending.append((lang, output_path, fingerprint))
+                    if not pending:
+                        continue
+                    cues, _ = read_cues(path, encoding=encoding)
+                except Exception as e:
+                    for _ in range(len(langs) - skipped):
+                        events.put(("error", path, e))
+                    continue
+                indices = _cue_indices(cues)
+                jobs = []
+                for lang, output_path, fingerprint in pending:
+                    texts = list(dict.fromkeys(cues[i].text for i in indices))
+                    known = fingerprint.lookup(texts) if fingerprint else {}
+                    lang_journal = journals[lang]
+                    if lang_journal:
+                        known.update((t, lang_journal.translations[t]) for t in texts
+                                     if t in lang_journal.translations)
+                    texts = [t for t in texts if t not in known]
+                    job = _FileJob(path, lang, cues, indices, output_path, known,
+                                   fingerprint, source_hash)
+                    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+                    job.total_chunks = len(chunks)
+                    events.put(("file", job))
+                    jobs.append((job, chunks))
+                for job, chunks in jobs:
+                    for chunk in chunks:
+                        while not slots.acquire(timeout=0.2):
+                            if stopped():
+                                break
+                        if stopped():
+                            break
+                        future = executor.submit(translate_chunk, chunk, job.lang, cache,
+                                                 stop_event, pause_event, retries, batch,
+                                                 BATCH_MAX_CHARS, provider)
+                        submitted += 1
+                        future.add_done_callback(
+                            lambda f, job=job, chunk=chunk: on_chunk_done(f, job, chunk))
+        finally:
+            events.put(("end", submitted))
+
+    threading.Thread(target=producer, name="subtitle-reader", daemon=True).start()
+
+    outputs = []
+    jobs = []
+    files_done = 0
+    chunks_done = 0
+    chunks_total = 0
+    submitted = None
+
+    def finish(job):
+        nonlocal files_done
+        job.finished = True
+        files_done += 1
+        if not job.indices:
+            if file_callback:
+                file_callback(job.path, None, None)
+            return
+        results_map = _build_results(job.cues, job.indices, job.translations, output_mode)
+        try:
+            write_subtitle_file(job.output_path, job.cues, results_map, encoding=out_encoding)
+        except Exception as e:
+            if file_callback:
+                file_callback(job.path, None, e)
+            return
+        complete = len(results_map) == len(job.indices) and not stopped()
+        lang_journal = journals[job.lang]
+        if lang_journal and complete:
+            lang_journal.mark_done(job.path, job.output_path)
+        if job.fingerprint:
+            job.fingerprint.save(job.source_hash if complete else None, job.output_path,
+                                 [job.cues[i].text for i in job.indices], job.translations)
+        outputs.append(job.output_path)
+        if file_callback:
+            file_callback(job.path, job.output_path, None)
+        job.cues = job.translations = None  # giải phóng bộ nhớ
+
+    try:
+        while submitted is None or chunks_done < submitted:
+            try:
+                event = events.get(timeout=0.2)
+            except queue.Empty:
+                if stopped():
+                    break  # không chờ các request đang bay
+                continue
+            kind = event[0]
+            if kind == "end":
+                submitted = event[1]
+            elif kind == "skip":
+                files_done += 1
+                outputs.append(event[2])
+                if file_callback:
+                    file_callback(event[1], event[2], None)
+            elif kind == "error":
+                files_done += 1
+                if file_callback:
+                    file_callback(event[1], None, event[2])
+            elif kind == "file":
+                job = event[1]
+                jobs.append(job)
+                chunks_total += job.total_chunks
+                if job.total_chunks == 0:
+                    finish(job)
+            elif kind == "chunk":
+                _, job, chunk, future = event
+                try:
+                    if future.cancelled():
+                        raise RuntimeError("chunk bị hủy")
+                    translated = chunk_translations(chunk, future.result())
+                    if journals[job.lang]:
+                        journals[job.lang].record(translated)
+                    job.translations.update(translated)
+                except Exception:
+                    pass  # chunk lỗi: giữ nguyên bản gốc
+                job.done_chunks += 1
+                chunks_done += 1
+                if progress_callback:
+                    stats = router.snapshot()
+                    stats.update(file=job.path, lang=job.lang, file_done=job.done_chunks,
+                                 file_total=job.total_chunks, files_done=files_done,
+                                 files_total=len(files) * len(langs))
+                    progress_callback(chunks_done, chunks_total, stats)
+                if job.done_chunks == job.total_chunks:
+                    finish(job)
+    finally:
+        _shutdown(executor, stop_event)
+
+    # bị dừng giữa chừng: ghi phần đã dịch của các file dở
+    for job in jobs:
+        if not job.finished:
+            finish(job)
+
+    cache_manager.save_cache(cache)
+    return outputs
+
+
+def _cue_windows(cues, chunk_size):
+    """Gom cue thành từng đoạn có tối đa chunk_size cue cần dịch"""
+    window, count = [], 0
+    for cue in cues:
+        window.append(cue)
+        if cue.is_cue and cue.lines:
+            count += 1
+            if count >= chunk_size:
+                yield window
+                window, count = [], 0
+    if window:
+        yield window
+
+
+def translate_srt_file_streaming(path, cache, dest_lang="vi", output_mode="bilingual",
+                                 chunk_size=10, max_workers=3, rate=None,
+                                 stop_event=None, pause_event=None, progress_callback=None,
+                                 encoding="auto", save_choice=1, output_folder=None,
+                                 retries=4, batch=True, provider=DEFAULT_PROVIDER,
+                                 journal=None, max_buffered=None, output_encoding=None):
+    """Dịch 1 file theo kiểu streaming, trả về file đầu ra.
+
+    Tối đa max_buffered đoạn (mặc định max_workers * 4) đang dịch hoặc chờ ghi
+    cùng lúc; đoạn nào xong trước thì nằm trong bộ đệm tới lượt được ghi.
+    progress_callback(done, submitted, stats) tính theo đoạn vì chưa biết tổng.
+    """
+    router = get_router(provider)
+    if rate:
+        get_limiter(router.primary[0].name, rate)
+    stopped = lambda: bool(stop_event and stop_event())
+    ftype = _subtitle_type(path)
+    output_path = _output_path(path, ftype, output_mode, save_choice, output_folder)
+    if journal and journal.is_done(path, output_path):
+        return output_path
+
+    slots = threading.Semaphore(max_buffered or max_workers * 4)
+    done_q = queue.Queue()
+    buffer = {}  # seq -> (cues, indices, bản dịch có sẵn, text cần dịch, future)
+    inflight = {}  # seq -> như buffer, các đoạn chưa dịch xong
+    state = {"next": 0, "submitted": 0, "complete": True, "any": False}
+
+    def write_ready(dst):
+        # ghi các đoạn đã xong theo đúng thứ tự
+        while state["next"] in buffer:
+            window, indices, translations, pending, future = buffer.pop(state["next"])
+            inflight.pop(state["next"], None)
+            if future is not None:
+                try:
+                    if not future.done() or future.cancelled():
+                        raise RuntimeError("đoạn bị dừng giữa chừng")
+                    translated = chunk_translations(pending, future.result())
+                except Exception:
+                    translated = {}  # đoạn lỗi: giữ nguyên bản gốc
+                if journal:
+                    journal.record(translated)
+                translations.update(translated)
+            results_map = _build_results(window, indices, translations, output_mode)
+            if len(results_map) < len(indices):
+                state["complete"] = False
+            write_cues(dst, window, results_map)
+            dst.flush()
+            state["next"] += 1
+            slots.release()
+            if progress_callback and future is not None:
+                progress_callback(state["next"], state["submitted"], router.snapshot())
+
+    def drain(dst, block=False):
+        while True:
+            try:
+                seq, *item = done_q.get(block=block, timeout=0.2 if block else None)
+            except queue.Empty:
+                return
+            buffer[seq] = item
+            write_ready(dst)
+            block = False
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    with open_subtitle(path, encoding) as src, \
+            open(output_path, "w", encoding=output_encoding_for(encoding, output_encoding),
+                 errors="ignore") as dst:
+        for window in _cue_windows(iter_cues(src, ftype), chunk_size):
+            # chờ chỗ trong bộ đệm, trong lúc chờ thì ghi các đoạn đã xong
+            while not slots.acquire(timeout=0.2):
+                drain(dst)
+                if stopped():
+                    break
+            if stopped():
+                state["complete"] = False
+                break
+            seq = state["submitted"]
+            state["submitted"] += 1
+            indices = _cue_indices(window)
+            state["any"] = state["any"] or bool(indices)
+            texts = list(dict.fromkeys(window[i].text for i in indices))
+            known = {}
+            if journal:
+                known = {t: journal.translations[t] for t in texts if t in journal.translations}
+            pending = [t for t in texts if t not in known]
+            if pending:
+                future = executor.submit(translate_chunk, pending, dest_lang, cache,
+                                         stop_event, pause_event, retries, batch,
+                                         BATCH_MAX_CHARS, provider)
+                inflight[seq] = (window, indices, known, pending, future)
+                future.add_done_callback(
+                    lambda f, item=(seq, window, indices, known, pending): done_q.put((*item, f)))
+            else:
+                done_q.put((seq, window, indices, known, pending, None))
+            drain(dst)
+
+        while state["next"] < state["submitted"]:
+            if stopped():
+                # ghi nốt các đoạn chưa xong bằng bản gốc, không chờ request đang bay
+                state["complete"] = False
+                drain(dst)
+                buffer.update(inflight)
+                write_ready(dst)
+                break
+            drain(dst, block=True)
+    _shutdown(executor, stop_event)
+
+    if journal and state["complete"] and not stopped():
+        journal.mark_done(path, output_path)
+    cache_manager.save_cache(cache)
+    if not state["any"]:
+        os.remove(output_path)
+        return None
+    return output_path
@@ -0,0 +1,258 @@
+import io
+import re
+import codecs
+import unicodedata
+
+# các block VTT không phải cue, giữ nguyên khi ghi lại
+_VTT_RAW_BLOCKS = ("WEBVTT", "NOTE", "STYLE", "REGION")
+_TIMING_RE = re.compile(r"^\s*(\S+)\s+-->\s+(\S+)\s*(.*)$")
+
+DETECT_SAMPLE_SIZE = 8192  # chỉ đọc vài KB đầu để đoán encoding
+# thứ tự BOM quan trọng: BOM utf-32-le bắt đầu bằng BOM utf-16-le
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+_FALLBACK_ENCODINGS = ("shift_jis", "gb18030", "cp1252")
+
+
+def _decode_sample(sample, encoding):
+    # decoder tăng dần: ký tự nhiều byte bị cắt ở cuối mẫu không tính là lỗi
+    try:
+        return codecs.getincrementaldecoder(encoding)("strict").decode(sample, final=False)
+    except (UnicodeDecodeError, LookupError):
+        return None
+
+# các chữ Hán thông dụng nhất: văn bản tiếng Trung thật chứa nhiều, giải mã sai thì hiếm
+_COMMON_HANZI = frozenset(
+    "的一是不了在人有我他这个们中来上大为和国地到以说时要就出会可也你对生能而子那得于着下"
+    "自之年过发后作里用道行所然家种事成方多经么去法学如都同现当没动面起看定天分还进好小部其"
+    "些主样理心她本前开但因只从想实吗呢吧啊什怎谁哪这里那里没有知道现在今天")
+
+_CP1252_C1 = frozenset(bytes(range(0x80, 0xA0)).decode("cp1252", errors="ignore"))
+
+def _plausibility(text):
+    """Điểm trung bình mỗi ký tự: chữ/kana/Hán thông dụng cộng điểm, ký tự lạ trừ điểm"""
+    text = text[:4096]
+    if not text:
+        return 0.0
+    score = 0
+    for ch in text:
+        code = ord(ch)
+        if code < 128:
+            score += 1 if (ch.isprintable() or ch in "\r\n\t") else -2
+        elif 0xFF61 <= code <= 0xFF9F or 0x80 <= code <= 0x9F:
+            score -= 1  # katakana nửa độ rộng / C1: dấu hiệu đoán sai
+        elif 0x3040 <= code <= 0x30FF or ch in _COMMON_HANZI:
+            score += 3  # kana (tiếng Nhật) / Hán thông dụng (tiếng Trung)
+        elif 0x4E00 <= code <= 0x9FFF or 0x3000 <= code <= 0x303F:
+            score += 1
+        elif ch in _CP1252_C1:
+            pass  # byte 0x80-0x9F của cp1252: hợp lệ nhưng hiếm khi đứng liền nhau
+        elif unicodedata.category(ch) in ("Cc", "Co", "Cn", "Cs"):
+            score -= 2
+        elif ch.isalpha():
+            score += 2
+        else:
+            score += 0.5
+    return score / len(text)
+
+def detect_encoding_bytes(sample):
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    if _decode_sample(sample, "utf-8") is not None:
+        return "utf-8"
+    best, best_score = "cp1252", None
+    for encoding in _FALLBACK_ENCODINGS:
+        text = _decode_sample(sample, encoding)
+        if text is None:
+            continue
+        score = _plausibility(text)
+        if best_score is None or score > best_score:
+            best, best_score = encoding, score
+    return best
+
+def detect_encoding(path, sample_size=DETECT_SAMPLE_SIZE):
+    """Đoán encoding từ BOM và vài KB đầu file"""
+    with open(path, "rb") as f:
+        return detect_encoding_bytes(f.read(sample_size))
+
+def resolve_encoding(path, encoding="auto"):
+    return detect_encoding(path) if encoding in (None, "auto") else encoding
+
+class _DecodingReader(io.RawIOBase):
+    """Đọc file từng khối, giải mã strict và trả ra byte UTF-8 (bọc bởi TextIOWrapper).
+
+    Mẫu đầu file có thể không đại diện cho cả file (vd đầu là ASCII, sau có
+    ký tự cp1252): gặp byte không giải mã được thì (nếu encoding tự nhận diện)
+    nhận diện lại trên 1 cửa sổ từ chỗ lỗi và đọc tiếp bằng encoding mới;
+    không được thì thay byte hỏng bằng U+FFFD. Cả 2 trường hợp đều cảnh báo,
+    không bỏ ký tự trong im lặng.
+    """
+
+    def __init__(self, path, encoding, redetect=False, block_size=1 << 16):
+        self.path = path
+        self.encoding = encoding
+        self._redetect = redetect
+        self._block_size = block_size
+        self._file = open(path, "rb")
+        self._decoder = codecs.getincrementaldecoder(encoding)("strict")
+        self._read = 0  # số byte đã đọc từ file
+        self._out = b""
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._out and not self._eof:
+            data = self._file.read(self._block_size)
+            self._eof = not data
+            self._read += len(data)
+            self._out = self._decode(data, self._eof).encode("utf-8")
+        n = min(len(b), len(self._out))
+        b[:n] = self._out[:n]
+        self._out = self._out[n:]
+        return n
+
+    def _decode(self, data, final):
+        pending = self._decoder.getstate()[0]
+        try:
+            return self._decoder.decode(data, final=final)
+        except UnicodeDecodeError as e:
+            buf = pending + data
+            position = self._read - len(buf) + e.start
+            text = codecs.getincrementaldecoder(self.encoding)().decode(buf[:e.start], final=True)
+            rest = buf[e.start:]
+        if self._redetect:
+            self._redetect = False
+            window = rest + self._file.read(DETECT_SAMPLE_SIZE)
+            self._read += len(window) - len(rest)
+            detected = detect_encoding_bytes(window)
+            if detected != self.encoding and _decode_sample(window, detected) is not None:
+                print(f"[WARN] {self.path}: byte {position} không phải {self.encoding}, "
+                      f"đọc tiếp bằng {detected}")
+                self.encoding = detected
+                self._decoder = codecs.getincrementaldecoder(detected)("strict")
+                return text + self._decode(window, final)
+            rest = window
+        print(f"[WARN] {self.path}: byte {position} không giải mã được bằng {self.encoding}, "
+              f"thay bằng ký tự \ufffd")
+        self._decoder = codecs.getincrementaldecoder(self.encoding)("replace")
+        return text + self._decoder.decode(rest, final=final)
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+def open_subtitle(path, encoding="auto"):
+    """Mở file phụ đề để đọc text, encoding="auto" thì tự nhận diện (xem _DecodingReader)"""
+    reader = _DecodingReader(path, resolve_encoding(path, encoding),
+                             redetect=encoding in (None, "auto"))
+    return io.TextIOWrapper(io.BufferedReader(reader), encoding="utf-8")
+
+def output_encoding_for(encoding, output_encoding=None):
+    """Encoding ghi file: mặc định utf-8 khi tự nhận diện, ngược lại giữ như đầu vào"""
+    if output_encoding:
+        return output_encoding
+    return "utf-8" if encoding in (None, "auto") else encoding
+
+
+class Cue:
+    """1 cue phụ đề (hoặc block giữ nguyên nếu start là None)"""
+    __slots__ = ("index", "start", "end", "settings", "lines")
+
+    def __init__(self, index, start, end, settings, lines):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.settings = settings
+        self.lines = lines
+
+    @property
+    def is_cue(self):
+        return self.start is not None
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+    def __repr__(self):
+        return f"Cue({self.index!r}, {self.start!r}, {self.end!r}, {self.lines!r})"
+
+
+def _parse_block(block, ftype):
+    first = block[0].strip()
+    if ftype == "vtt" and first.split(" ", 1)[0].split("\t", 1)[0] in _VTT_RAW_BLOCKS:
+        return Cue(None, None, None, None, block)
+
+    # dòng timing nằm ở dòng 1 (không có id) hoặc dòng 2 (có index/id)
+    for pos in range(min(2, len(block))):
+        m = _TIMING_RE.match(block[pos])
+        if m:
+            index = block[0].strip() if pos == 1 else None
+            return Cue(index, m.group(1), m.group(2), m.group(3) or None, block[pos + 1:])
+    return Cue(None, None, None, None, block)
+
+
+def iter_cues(lines, ftype="srt"):
+    """Đọc dần từng cue từ iterable các dòng (file object, list...).
+
+    Cue thiếu dòng trống phân cách: gặp dòng timing thứ 2 trong 1 block thì
+    tách block mới từ đó (kèm dòng index ngay trước nếu có), không để cue sau
+    bị nuốt vào phần text của cue trước.
+    """
+    block = []
+    timing_at = None  # vị trí dòng timing của block hiện tại
+    first = True
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if first:
+            line = line.lstrip("\ufeff")
+            first = False
+        if not line.strip():
+            if block:
+                yield _parse_block(block, ftype)
+                block, timing_at = [], None
+            continue
+        if _TIMING_RE.match(line):
+            if timing_at is not None:
+                carry = 1 if len(block) > timing_at + 1 and block[-1].strip().isdigit() else 0
+                yield _parse_block(block[:len(block) - carry], ftype)
+                block = block[len(block) - carry:]
+            if len(block) < 2:
+                timing_at = len(block)
+        block.append(line)
+    if block:
+        yield _parse_block(block, ftype)
+
+
+def format_cue(cue, lines=None):
+    """Trả về block text của cue, thay nội dung bằng lines nếu có"""
+    if not cue.is_cue:
+        return "\n".join(cue.lines) + "\n\n"
+    out = []
+    if cue.index is not None:
+        out.append(cue.index)
+    timing = f"{cue.start} --> {cue.end}"
+    if cue.settings:
+        timing += f" {cue.settings}"
+    out.append(timing)
+    out.extend(cue.lines if lines is None else lines)
+    return "\n".join(out) + "\n\n"
+
+
+def write_cues(f, cues, results_map=None):
+    """Ghi danh sách cue ra file object; results_map {vị trí cue: text mới} thay nội dung"""
+    results_map = results_map or {}
+    for idx, cue in enumerate(cues):
+        if idx in results_map:
+            # bỏ dòng trống để không làm vỡ cue
+            lines = [l for l in results_map[idx].split("\n") if l.strip()]
+            f.write(format_cue(cue, lines))
+        else:
+            f.write(format_cue(cue))
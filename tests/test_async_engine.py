@@ -0,0 +1,79 @@
+"""Chạy engine async với server dịch giả lập (mock_provider), không tốn quota.
+
+    python -m unittest discover -s tests
+"""
+import os
+import sys
+import shutil
+import tempfile
+import importlib.util
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache_manager
+from mock_provider import MockTranslateServer
+from rate_limiter import reset_limiters
+
+HAS_AIOHTTP = importlib.util.find_spec("aiohttp") is not None
+
+
+def _write_srt(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, line in enumerate(lines, 1):
+            f.write(f"{i}\n00:00:{i:02d},000 --> 00:00:{i:02d},900\n{line}\n\n")
+
+
+@unittest.skipUnless(HAS_AIOHTTP, "cần aiohttp cho engine async")
+class AsyncEngineMockServerTest(unittest.TestCase):
+
+    def setUp(self):
+        reset_limiters()
+        self.workdir = tempfile.mkdtemp()
+        self.lines = [f"line number {i}" for i in range(1, 31)]
+        self.source = os.path.join(self.workdir, "input.srt")
+        _write_srt(self.source, self.lines)
+        self.cache = cache_manager.TranslationCache(path=os.path.join(self.workdir, "cache.db"))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def _translate(self, server, **kwargs):
+        import async_engine
+
+        return async_engine.translate_srt_file(
+            self.source, self.cache, dest_lang="vi", output_mode="dest_only",
+            save_choice=2, output_folder=os.path.join(self.workdir, "out"),
+            base_url=server.url, **kwargs)
+
+    def _read(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def test_translates_file(self):
+        with MockTranslateServer() as server:
+            output = self._translate(server)
+        content = self._read(output)
+        for line in self.lines:
+            self.assertIn(line.upper(), content)
+        self.assertGreater(server.requests, 0)
+
+    def test_recovers_from_429(self):
+        # server chỉ nhận 10 req/s, limiter bắt đầu ở 40 req/s: chắc chắn bị 429
+        with MockTranslateServer(rate_limit=10) as server:
+            output = self._translate(server, batch=False, rate=40, retries=8)
+        self.assertGreater(server.throttled, 0)
+        content = self._read(output)
+        for line in self.lines:
+            self.assertIn(line.upper(), content)
+
+    def test_stop_sends_nothing(self):
+        with MockTranslateServer() as server:
+            self._translate(server, stop_event=lambda: True)
+        self.assertEqual(server.requests, 0)
+        self.assertIsNone(self.cache.get("vi", self.lines[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
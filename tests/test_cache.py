@@ -0,0 +1,111 @@
+"""Cache dịch SQLite: khóa chính xác, lưu xuống đĩa, xóa theo LRU."""
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_manager import TranslationCache, text_hash
+
+
+class CacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.workdir, "cache.db")
+        self.cache = self.open()
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def open(self, **options):
+        options.setdefault("memory", False)
+        return TranslationCache(path=self.path, **options)
+
+    def reopen(self, **options):
+        self.cache.close()
+        self.cache = self.open(**options)
+
+
+class ExactKeyTest(CacheTestCase):
+
+    def test_whitespace_inside_line_is_ignored(self):
+        self.assertEqual(text_hash("  Hello   World \n"), text_hash("Hello World"))
+        self.assertEqual(text_hash("Hello\r\nWorld"), text_hash("Hello \nWorld"))
+
+    def test_line_breaks_are_part_of_key(self):
+        self.assertNotEqual(text_hash("Hello\nWorld"), text_hash("Hello World"))
+        self.cache.set("vi", "Hello\nWorld", "Xin chào\nthế giới")
+        self.cache.set("vi", "Hello World", "Xin chào thế giới")
+        self.reopen()
+        self.assertEqual(self.cache.get("vi", "Hello\nWorld"), "Xin chào\nthế giới")
+        self.assertEqual(self.cache.get("vi", "Hello World"), "Xin chào thế giới")
+
+    def test_old_keys_are_rehashed(self):
+        self.cache.set("vi", "Hello\nWorld", "Xin chào\nthế giới")
+        self.cache.close()
+        # db tạo trước khi text_hash giữ xuống dòng
+        conn = sqlite3.connect(self.path)
+        old = hashlib.sha1(b"Hello World").hexdigest()
+        conn.execute("UPDATE translations SET text_hash=?", (old,))
+        conn.execute("PRAGMA user_version=2")
+        conn.commit()
+        conn.close()
+        self.cache = self.open()
+        self.assertIsNone(self.cache.get("vi", "Hello World"))
+        self.assertEqual(self.cache.get("vi", "Hello\nWorld"), "Xin chào\nthế giới")
+
+    def test_namespaces_are_separate(self):
+        self.cache.set("vi", "Hello", "Xin chào")
+        self.assertIsNone(self.cache.get("fr", "Hello"))
+        self.assertIsNone(self.cache.get("vi", "Hello", provider="deepl"))
+
+
+class PersistenceTest(CacheTestCase):
+
+    def test_pending_translations_survive_reopen(self):
+        self.cache.set("vi", "Hello", "Xin chào")
+        self.assertEqual(self.cache.get("vi", "Hello"), "Xin chào")  # chưa ghi xuống đĩa
+        self.reopen()
+        self.assertEqual(self.cache.get("vi", "Hello"), "Xin chào")
+        self.assertEqual(len(self.cache), 1)
+
+    def test_clear(self):
+        self.cache.set("vi", "Hello", "Xin chào")
+        self.cache.clear()
+        self.assertIsNone(self.cache.get("vi", "Hello"))
+        self.assertEqual(len(self.cache), 0)
+
+
+class EvictTest(CacheTestCase):
+
+    def _add(self, text):
+        self.cache.set("vi", text, text.upper())
+        self.cache.flush()
+        time.sleep(0.01)
+
+    def test_least_recently_used_is_evicted(self):
+        for text in ("aaaa", "bbbb", "cccc"):
+            self._add(text)
+        self.assertEqual(self.cache.get("vi", "aaaa"), "AAAA")  # dùng lại nên mới hơn bbbb
+        self.cache.flush()
+        self.cache.max_bytes = 20  # 3 bản dịch x 8 byte
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNone(self.cache.get("vi", "bbbb"))
+        self.assertEqual(self.cache.get("vi", "aaaa"), "AAAA")
+        self.assertEqual(self.cache.get("vi", "cccc"), "CCCC")
+
+    def test_under_limit_keeps_everything(self):
+        self._add("aaaa")
+        self.assertEqual(self.cache.evict(), 0)
+        self.assertEqual(self.cache.data_size(), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
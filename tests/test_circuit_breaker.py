@@ -0,0 +1,95 @@
+"""Circuit breaker và định tuyến provider (provider giả, không gửi request thật)."""
+import os
+import sys
+import tempfile
+import shutil
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache_manager
+import translator
+from translator import CircuitBreaker, Provider
+
+
+class _FlakyClient:
+    """Lỗi `failures` lần đầu rồi dịch thành chữ in hoa"""
+
+    def __init__(self, state):
+        self.state = state
+
+    def translate(self, text):
+        self.state["calls"] += 1
+        if self.state["failures"] > 0:
+            self.state["failures"] -= 1
+            raise RuntimeError("HTTP 500")
+        return text.upper()
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(consecutive_failures=3, cooldown=60)
+        for _ in range(3):
+            breaker.record(False)
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.can_try())
+        self.assertGreater(breaker.retry_in(), 0)
+
+    def test_half_open_allows_single_probe(self):
+        breaker = CircuitBreaker(consecutive_failures=1, cooldown=0)
+        breaker.record(False)
+        self.assertEqual(breaker.state, "half-open")
+        # kiểm tra không giữ lượt thăm dò
+        self.assertTrue(breaker.can_try())
+        self.assertTrue(breaker.can_try())
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.release()
+        self.assertTrue(breaker.allow())
+        breaker.record(True)
+        self.assertEqual(breaker.state, "closed")
+
+
+class RouterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = dict(translator.PROVIDERS)
+        translator.PROVIDERS.clear()
+        translator._routers.clear()
+        self.state = {"calls": 0, "failures": 0}
+        self.provider = translator.register_provider(
+            Provider("fake", lambda source, target: _FlakyClient(self.state)))
+        self.provider.limiter.rate = 1000.0
+        self.provider.breaker = CircuitBreaker(consecutive_failures=2, cooldown=0.3)
+        self.workdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        translator.PROVIDERS.clear()
+        translator.PROVIDERS.update(self.saved)
+        translator._routers.clear()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_waits_for_cooldown_instead_of_failing(self):
+        self.state["failures"] = 2  # đủ để ngắt mạch
+        started = time.monotonic()
+        result = translator.safe_translate("hello", "vi", retries=4, provider="fake")
+        self.assertEqual(result, "HELLO")
+        self.assertGreaterEqual(time.monotonic() - started, 0.25)
+
+    def test_failed_text_is_not_cached(self):
+        self.state["failures"] = 10 ** 6
+        cache = cache_manager.TranslationCache(path=os.path.join(self.workdir, "cache.db"))
+        try:
+            results = translator.translate_chunk(["hello", "world"], "vi", cache, None, None,
+                                                 retries=2, batch=False, provider="fake")
+            self.assertEqual(results, [None, None])
+            self.assertEqual(translator.chunk_translations(["hello", "world"], results), {})
+            self.assertIsNone(cache.get("vi", "hello", provider="fake"))
+        finally:
+            cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
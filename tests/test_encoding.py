@@ -0,0 +1,84 @@
+"""Nhận diện encoding và đọc file phụ đề (subtitles.open_subtitle)."""
+import io
+import os
+import sys
+import codecs
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subtitles import DETECT_SAMPLE_SIZE, detect_encoding_bytes, open_subtitle
+
+CUE = "1\n00:00:01,000 --> 00:00:02,000\n{}\n\n"
+
+
+class DetectEncodingTest(unittest.TestCase):
+
+    def test_bom(self):
+        self.assertEqual(detect_encoding_bytes(codecs.BOM_UTF8 + b"abc"), "utf-8-sig")
+        self.assertEqual(detect_encoding_bytes("abc".encode("utf-16")), "utf-16")
+
+    def test_utf8(self):
+        self.assertEqual(detect_encoding_bytes(CUE.format("Tiếng Việt").encode("utf-8")),
+                         "utf-8")
+
+    def test_utf8_sample_cut_inside_character(self):
+        sample = CUE.format("Tiếng Việt").encode("utf-8")
+        cut = sample.index("ế".encode("utf-8")) + 1
+        self.assertEqual(detect_encoding_bytes(sample[:cut]), "utf-8")
+
+    def test_legacy_encodings(self):
+        self.assertEqual(detect_encoding_bytes(
+            CUE.format("こんにちは、元気ですか").encode("shift_jis")), "shift_jis")
+        self.assertEqual(detect_encoding_bytes(
+            CUE.format("我们现在去学校吧").encode("gb18030")), "gb18030")
+        self.assertEqual(detect_encoding_bytes(
+            CUE.format("Café naïve, déjà vu").encode("cp1252")), "cp1252")
+
+
+class OpenSubtitleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def _write(self, data):
+        path = os.path.join(self.workdir, "input.srt")
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def _read(self, path, encoding="auto"):
+        out = io.StringIO()
+        with redirect_stdout(out), open_subtitle(path, encoding) as f:
+            return f.read(), out.getvalue()
+
+    def test_utf8_round_trip(self):
+        text = CUE.format("Tiếng Việt có dấu") * 5000
+        content, warnings = self._read(self._write(text.encode("utf-8")))
+        self.assertEqual(content, text)
+        self.assertEqual(warnings, "")
+
+    def test_late_legacy_bytes_are_redetected(self):
+        # phần đầu chỉ có ASCII (vượt quá mẫu nhận diện), ký tự cp1252 ở cuối file
+        head = CUE.format("Hello there") * (DETECT_SAMPLE_SIZE // 20)
+        tail = CUE.format("Café naïve")
+        content, warnings = self._read(self._write(head.encode() + tail.encode("cp1252")))
+        self.assertEqual(content, head + tail)
+        self.assertIn("cp1252", warnings)
+
+    def test_undecodable_bytes_are_replaced_with_warning(self):
+        head = CUE.format("Hello") * 10
+        path = self._write(head.encode() + CUE.format("Café").encode("cp1252"))
+        content, warnings = self._read(path, encoding="utf-8")
+        self.assertIn("Caf�", content)
+        self.assertIn("[WARN]", warnings)
+
+
+if __name__ == "__main__":
+    unittest.main()
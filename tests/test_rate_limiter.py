@@ -0,0 +1,72 @@
+"""Rate limiter AIMD và registry limiter theo provider."""
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rate_limiter
+from rate_limiter import AdaptiveRateLimiter, get_limiter, reset_limiters
+
+
+class _Throttled(Exception):
+    status = 429
+
+    def __init__(self, retry_after):
+        super().__init__("HTTP 429")
+        self.retry_after = retry_after
+
+
+class AdaptiveRateLimiterTest(unittest.TestCase):
+
+    def test_throttle_halves_rate(self):
+        limiter = AdaptiveRateLimiter(rate=8)
+        self.assertEqual(limiter.on_error(_Throttled(0.1)), 0.1)
+        self.assertEqual(limiter.rate, 4)
+        self.assertEqual(limiter.throttled, 1)
+
+    def test_retry_after_applies_to_requests_already_waiting(self):
+        limiter = AdaptiveRateLimiter(rate=50)
+        limiter.acquire()  # dùng hết token
+        sent = []
+        waiter = threading.Thread(target=lambda: (limiter.acquire(), sent.append(time.monotonic())))
+        started = time.monotonic()
+        waiter.start()
+        time.sleep(0.005)
+        limiter.on_error(_Throttled(0.5))
+        waiter.join(5)
+        self.assertGreaterEqual(sent[0] - started, 0.45)
+
+
+class RegistryTest(unittest.TestCase):
+
+    def tearDown(self):
+        rate_limiter._limiters.pop("test-provider", None)
+
+    def test_same_rate_keeps_learned_rate(self):
+        limiter = get_limiter("test-provider", 5)
+        limiter.on_success()
+        learned = limiter.rate
+        self.assertIs(get_limiter("test-provider", 5), limiter)
+        self.assertEqual(limiter.rate, learned)
+        get_limiter("test-provider", 2)
+        self.assertEqual(limiter.rate, 2)
+
+    def test_reset_keeps_limiter_objects(self):
+        limiter = get_limiter("test-provider", 5)
+        limiter.on_error(_Throttled(30))
+        reset_limiters()
+        self.assertIs(get_limiter("test-provider"), limiter)
+        self.assertEqual(limiter.rate, rate_limiter.DEFAULT_RATE)
+        self.assertEqual(limiter.throttled, 0)
+        get_limiter("test-provider", 12)
+        self.assertEqual(limiter.rate, 12)
+        started = time.monotonic()
+        limiter.acquire()
+        self.assertLess(time.monotonic() - started, 0.1)  # Retry-After cũ đã bị bỏ
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""Single-flight của cache: mỗi text chỉ 1 luồng dịch, luồng khác chờ kết quả."""
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache_manager
+import translator
+from translator import CircuitBreaker, Provider
+
+
+class _UpperClient:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def translate(self, text):
+        self.calls.append(text)
+        return text.upper()
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.cache = cache_manager.TranslationCache(path=os.path.join(self.workdir, "cache.db"))
+        self.saved = dict(translator.PROVIDERS)
+        translator.PROVIDERS.clear()
+        translator._routers.clear()
+        self.calls = []
+        provider = translator.register_provider(
+            Provider("fake", lambda source, target: _UpperClient(self.calls)))
+        provider.limiter.rate = 1000.0
+        provider.breaker = CircuitBreaker()
+
+    def tearDown(self):
+        self.cache.close()
+        translator.PROVIDERS.clear()
+        translator.PROVIDERS.update(self.saved)
+        translator._routers.clear()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_second_reserve_waits_for_owner(self):
+        _, owned, _ = self.cache.reserve("vi", ["hello"])
+        self.assertEqual(owned, ["hello"])
+        resolved, owned2, waiting = self.cache.reserve("vi", ["hello"])
+        self.assertEqual((resolved, owned2), ({}, []))
+        self.cache.set("vi", "hello", "xin chào")
+        self.assertEqual(waiting["hello"].result(timeout=1), "xin chào")
+        self.assertEqual(self.cache.coalesced, 1)
+
+    def test_release_wakes_waiters_with_none(self):
+        _, owned, _ = self.cache.reserve("vi", ["hello"])
+        _, _, waiting = self.cache.reserve("vi", ["hello"])
+        self.cache.release("vi", owned)
+        self.assertIsNone(waiting["hello"].result(timeout=1))
+        self.assertIsNone(self.cache.get("vi", "hello"))
+
+    def _orphaned_by_stopped_owner(self, batch):
+        # job khác (đã bị dừng) đang giữ "hello"; job này chưa bị dừng
+        _, owned, _ = self.cache.reserve("vi", ["hello"], provider="fake")
+        result = {}
+        worker = threading.Thread(target=lambda: result.update(out=translator.translate_chunk(
+            ["hello", "world"], "vi", self.cache, lambda: False, None, retries=2,
+            batch=batch, provider="fake")))
+        worker.start()
+        worker.join(0.3)
+        self.assertTrue(worker.is_alive())  # đang chờ job kia
+        self.cache.release("vi", owned, provider="fake")
+        worker.join(5)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(result["out"], ["HELLO", "WORLD"])
+        self.assertEqual(self.cache.get("vi", "hello", provider="fake"), "HELLO")
+
+    def test_waiter_translates_text_dropped_by_stopped_owner_batch(self):
+        self._orphaned_by_stopped_owner(batch=True)
+
+    def test_waiter_translates_text_dropped_by_stopped_owner_single(self):
+        self._orphaned_by_stopped_owner(batch=False)
+
+    def test_stopped_waiter_gives_up(self):
+        _, owned, _ = self.cache.reserve("vi", ["hello"], provider="fake")
+        stopped = threading.Event()
+        result = {}
+        worker = threading.Thread(target=lambda: result.update(out=translator.translate_chunk(
+            ["hello"], "vi", self.cache, stopped.is_set, None, batch=True, provider="fake")))
+        worker.start()
+        stopped.set()
+        self.cache.release("vi", owned, provider="fake")
+        worker.join(5)
+        self.assertEqual(result["out"], [None])
+        self.assertEqual(self.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
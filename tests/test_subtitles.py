@@ -0,0 +1,67 @@
+"""Đọc/ghi cue SRT/VTT (subtitles.iter_cues, write_cues)."""
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subtitles import iter_cues, write_cues
+
+
+def _cues(text, ftype="srt"):
+    return list(iter_cues(io.StringIO(text), ftype))
+
+
+class IterCuesTest(unittest.TestCase):
+
+    def test_srt(self):
+        cues = _cues("\ufeff1\r\n00:00:01,000 --> 00:00:02,500\r\nHello\r\nthere\r\n\r\n"
+                     "2\n00:00:03,000 --> 00:00:04,000\nWorld\n")
+        self.assertEqual([c.index for c in cues], ["1", "2"])
+        self.assertEqual(cues[0].start, "00:00:01,000")
+        self.assertEqual(cues[0].end, "00:00:02,500")
+        self.assertEqual(cues[0].text, "Hello\nthere")
+        self.assertEqual(cues[1].lines, ["World"])
+
+    def test_missing_blank_line_between_cues(self):
+        cues = _cues("1\n00:00:01,000 --> 00:00:02,000\nHello\n"
+                     "2\n00:00:03,000 --> 00:00:04,000\nWorld\n")
+        self.assertEqual(len(cues), 2)
+        self.assertEqual((cues[0].index, cues[0].lines), ("1", ["Hello"]))
+        self.assertEqual((cues[1].index, cues[1].start, cues[1].lines),
+                         ("2", "00:00:03,000", ["World"]))
+
+    def test_missing_blank_line_without_index(self):
+        cues = _cues("00:00:01,000 --> 00:00:02,000\nHello\n"
+                     "00:00:03,000 --> 00:00:04,000\nWorld\n")
+        self.assertEqual([c.lines for c in cues], [["Hello"], ["World"]])
+
+    def test_vtt_keeps_header_and_notes(self):
+        cues = _cues("WEBVTT\n\nNOTE ghi chú\n\nintro\n00:01.000 --> 00:02.000 align:start\n"
+                     "<i>Hi</i>\n", "vtt")
+        self.assertFalse(cues[0].is_cue)
+        self.assertFalse(cues[1].is_cue)
+        self.assertEqual(cues[2].index, "intro")
+        self.assertEqual(cues[2].settings, "align:start")
+        self.assertEqual(cues[2].text, "<i>Hi</i>")
+
+    def test_unparseable_block_is_kept_as_is(self):
+        cues = _cues("not a cue\nat all\n")
+        self.assertFalse(cues[0].is_cue)
+        self.assertEqual(cues[0].lines, ["not a cue", "at all"])
+
+
+class WriteCuesTest(unittest.TestCase):
+
+    def test_replaces_only_translated_cues(self):
+        cues = _cues("1\n00:00:01,000 --> 00:00:02,000\nHello\n\n"
+                     "2\n00:00:03,000 --> 00:00:04,000\nWorld\n")
+        out = io.StringIO()
+        write_cues(out, cues, {0: "Xin chào\n\n"})
+        self.assertEqual(out.getvalue(), "1\n00:00:01,000 --> 00:00:02,000\nXin chào\n\n"
+                                         "2\n00:00:03,000 --> 00:00:04,000\nWorld\n\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
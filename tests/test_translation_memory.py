@@ -0,0 +1,119 @@
+"""Translation memory: khóa chuẩn hóa, chuyển bản dịch, câu gần giống, xuất/nhập cache."""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import translation_memory as tm
+from cache_manager import TranslationCache, export_cache, import_cache
+
+
+class NormalizedKeyTest(unittest.TestCase):
+
+    def test_same_key(self):
+        key = tm.norm_hash("Hello!")
+        for text in (" hello! ", "<i>Hello!</i>", "{\\an8}HELLO!", "Hello！"):
+            self.assertEqual(tm.norm_hash(text), key, text)
+
+    def test_terminal_punctuation_is_kept(self):
+        self.assertNotEqual(tm.norm_hash("Hello?"), tm.norm_hash("Hello!"))
+        self.assertNotEqual(tm.norm_hash("Hello."), tm.norm_hash("Hello"))
+
+    def test_line_breaks_are_kept(self):
+        self.assertNotEqual(tm.norm_hash("Hello\nWorld"), tm.norm_hash("Hello World"))
+
+    def test_punctuation_only_has_no_key(self):
+        self.assertIsNone(tm.norm_hash("..."))
+        self.assertIsNone(tm.norm_hash("<i>♪</i>"))
+
+    def test_adapt(self):
+        self.assertEqual(tm.adapt("Hello!", "Xin chào!", "<i>Hello!</i>"), "<i>Xin chào!</i>")
+        self.assertEqual(tm.adapt("hello", "xin chào", "HELLO"), "XIN CHÀO")
+        self.assertEqual(tm.adapt("Hello", "Xin chào", "- hello..."), "- xin chào...")
+
+
+class MinHashIndexTest(unittest.TestCase):
+
+    def test_finds_near_duplicate(self):
+        index = tm.MinHashIndex(threshold=0.6)
+        index.add("a", "I don't know what you're talking about.")
+        index.add("b", "Where are you going tonight?")
+        key, score = index.query("I don't know what you are talking about.")
+        self.assertEqual(key, "a")
+        self.assertGreaterEqual(score, 0.6)
+        self.assertIsNone(index.query("The weather is nice today."))
+
+
+class CacheMemoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.caches = []
+
+    def tearDown(self):
+        for cache in self.caches:
+            cache.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def open(self, name="cache.db", **options):
+        cache = TranslationCache(path=os.path.join(self.workdir, name), **options)
+        self.caches.append(cache)
+        return cache
+
+    def test_normalized_lookup(self):
+        cache = self.open()
+        cache.set("vi", "Hello!", "Xin chào!")
+        self.assertEqual(cache.get("vi", "<i>hello!</i>"), "<i>xin chào!</i>")
+        self.assertIsNone(cache.get("vi", "Hello?"))
+        cache.flush()  # tra trên db, không chỉ bản chưa ghi
+        self.assertEqual(cache.get("vi", " HELLO! "), "XIN CHÀO!")
+
+    def test_memory_off(self):
+        cache = self.open(memory=False)
+        cache.set("vi", "Hello!", "Xin chào!")
+        self.assertIsNone(cache.get("vi", "<i>Hello!</i>"))
+
+    def test_fuzzy_reuse_and_suggest(self):
+        source = "I don't know what you're talking about."
+        query = "I don't know what you are talking about."
+        reuse = self.open("reuse.db", fuzzy="reuse", fuzzy_threshold=0.6)
+        reuse.set("vi", source, "Tôi không biết bạn đang nói gì.")
+        self.assertEqual(reuse.get("vi", query), "Tôi không biết bạn đang nói gì.")
+
+        suggest = self.open("suggest.db", fuzzy="suggest", fuzzy_threshold=0.6)
+        suggest.set("vi", source, "Tôi không biết bạn đang nói gì.")
+        self.assertIsNone(suggest.get("vi", query))
+        self.assertEqual(suggest.suggestions[-1]["match"], source)
+
+    def test_invalid_fuzzy_mode(self):
+        with self.assertRaises(ValueError):
+            TranslationCache(path=os.path.join(self.workdir, "x.db"), fuzzy="always")
+
+    def test_export_import_round_trip(self):
+        cache = self.open()
+        cache.set("vi", "Hello\nWorld", "Xin chào\nthế giới")
+        cache.set("fr", "Hello", "Bonjour", provider="deepl")
+        path = os.path.join(self.workdir, "export.jsonl.gz")
+        self.assertEqual(export_cache(cache, path), 2)
+
+        other = self.open("other.db")
+        other.set("vi", "Hello\nWorld", "Chào\nthế giới")
+        self.assertEqual(import_cache(other, path, policy="keep"), {"records": 2, "added": 1})
+        self.assertEqual(other.get("vi", "Hello\nWorld"), "Chào\nthế giới")
+        self.assertEqual(other.get("fr", "Hello", provider="deepl"), "Bonjour")
+        import_cache(other, path, policy="replace")
+        self.assertEqual(other.get("vi", "Hello\nWorld"), "Xin chào\nthế giới")
+
+    def test_import_rejects_other_files(self):
+        path = os.path.join(self.workdir, "other.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"format": "something-else"}\n')
+        with self.assertRaises(ValueError):
+            import_cache(self.open(), path)
+
+
+if __name__ == "__main__":
+    unittest.main()
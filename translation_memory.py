@@ -0,0 +1,190 @@
+"""Translation memory: tra cache theo dạng chuẩn hóa và tìm câu gần giống.
+
+"Hello!", " hello! " và "<i>Hello!</i>" có chung 1 khóa chuẩn hóa: bỏ tag
+inline (SRT/HTML, {\\an8}), không phân biệt hoa thường, bỏ dấu câu ở 2 đầu
+nhưng giữ loại dấu kết câu (?, !, .) vì "Hello?" và "Hello!" dịch khác nhau.
+Bản dịch lấy lại được gắn lại tag, dấu câu và kiểu chữ của câu đang tra.
+MinHashIndex tìm các câu gần giống (chỉ khác vài ký tự) để dùng lại hoặc
+để người dịch xem lại.
+"""
+import re
+import hashlib
+import unicodedata
+
+FUZZY_THRESHOLD = 0.85  # Jaccard tối thiểu giữa 2 câu để coi là gần giống
+SHINGLE_SIZE = 3
+NUM_BINS = 32  # số phần tử của chữ ký MinHash
+BAND_ROWS = 4  # số phần tử mỗi band LSH
+
+_LEAD_TAG_RE = re.compile(r"^\s*(<[^<>]+>|\{\\[^{}]*\})")
+_TRAIL_TAG_RE = re.compile(r"(<[^<>]+>)\s*$")
+_QUOTES = str.maketrans({"‘": "'", "’": "'", "“": '"', "”": '"', "…": "..."})
+_FULLWIDTH = str.maketrans({"？": "?", "！": "!", "。": "."})
+KEY_VERSION = 2  # tăng khi đổi cách tính khóa chuẩn hóa (kèm cache_manager.DB_VERSION)
+
+
+def split_tags(text):
+    """Tách tag đầu/cuối mỗi dòng: trả về (phần chữ, [(tag đầu, tag cuối), ...])"""
+    cores, tags = [], []
+    for line in text.split("\n"):
+        prefix = suffix = ""
+        while True:
+            m = _LEAD_TAG_RE.match(line)
+            if not m:
+                break
+            prefix += m.group(1)
+            line = line[m.end():]
+        while True:
+            m = _TRAIL_TAG_RE.search(line)
+            if not m:
+                break
+            suffix = m.group(1) + suffix
+            line = line[:m.start()]
+        cores.append(line.strip())
+        tags.append((prefix, suffix))
+    return "\n".join(cores), tags
+
+def restore_tags(core, tags):
+    """Gắn lại tag; số dòng bản dịch khác bản gốc thì bọc cả khối"""
+    lines = core.split("\n")
+    if len(lines) == len(tags):
+        return "\n".join(p + line + s for line, (p, s) in zip(lines, tags))
+    return tags[0][0] + core + tags[-1][1]
+
+def _is_edge(ch):
+    return ch.isspace() or unicodedata.category(ch)[0] == "P"
+
+def _edges(text):
+    """(dấu câu đầu, phần giữa, dấu câu cuối)"""
+    start, end = 0, len(text)
+    while start < end and _is_edge(text[start]):
+        start += 1
+    while end > start and _is_edge(text[end - 1]):
+        end -= 1
+    return text[:start], text[start:end], text[end:]
+
+def _terminal_class(trail):
+    """Loại dấu kết câu: "?" (kể cả "?!"), "!", "." (cả "..."), "" nếu không có"""
+    for mark in "?!.":
+        if mark in trail:
+            return mark
+    return ""
+
+def normalize_key(core):
+    """Khóa chuẩn hóa của phần chữ (đã bỏ tag), giữ loại dấu kết câu mỗi dòng"""
+    lines = []
+    for line in core.translate(_QUOTES).casefold().split("\n"):
+        _, middle, trail = _edges(line)
+        line = " ".join(middle.split())
+        if line:
+            lines.append(line + _terminal_class(trail.translate(_FULLWIDTH)))
+    return "\n".join(lines)
+
+def norm_hash(text):
+    """Hash của khóa chuẩn hóa, None nếu câu chỉ có dấu câu/tag (vd "..." hay "♪")"""
+    key = normalize_key(split_tags(text)[0])
+    if not any(ch.isalnum() for ch in key):
+        return None
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def _first_alpha(text):
+    return next((ch for ch in text if ch.isalpha()), "")
+
+def adapt(source_text, translation, query_text):
+    """Chuyển bản dịch của source_text sang query_text (cùng khóa chuẩn hóa).
+
+    Dấu câu 2 đầu, kiểu chữ (IN HOA / hoa chữ đầu) và tag lấy theo query_text.
+    """
+    src_core, src_tags = split_tags(source_text)
+    query_core, query_tags = split_tags(query_text)
+    tr_core = split_tags(translation)[0] if any(p or s for p, s in src_tags) else translation
+
+    src_lead, _, src_trail = _edges(src_core)
+    query_lead, _, query_trail = _edges(query_core)
+    if src_trail.strip() != query_trail.strip():
+        if src_trail.strip() and tr_core.endswith(src_trail.strip()):
+            tr_core = tr_core[:len(tr_core) - len(src_trail.strip())]
+        tr_core = tr_core.rstrip() + query_trail.strip()
+    if src_lead.strip() != query_lead.strip():
+        if src_lead.strip() and tr_core.startswith(src_lead.strip()):
+            tr_core = tr_core[len(src_lead.strip()):]
+        tr_core = query_lead.strip() + (" " if query_lead.endswith(" ") else "") + tr_core.lstrip()
+
+    letters = [ch for ch in query_core if ch.isalpha()]
+    src_first, query_first = _first_alpha(src_core), _first_alpha(query_core)
+    if len(letters) > 1 and all(ch.isupper() for ch in letters) \
+            and not all(ch.isupper() for ch in src_core if ch.isalpha()):
+        tr_core = tr_core.upper()
+    elif query_first and src_first and query_first.isupper() != src_first.isupper():
+        i = next((i for i, ch in enumerate(tr_core) if ch.isalpha()), None)
+        if i is not None:
+            ch = tr_core[i].upper() if query_first.isupper() else tr_core[i].lower()
+            tr_core = tr_core[:i] + ch + tr_core[i + 1:]
+    return restore_tags(tr_core, query_tags)
+
+
+def shingles(key, size=SHINGLE_SIZE):
+    if len(key) <= size:
+        return {key}
+    return {key[i:i + size] for i in range(len(key) - size + 1)}
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def minhash(shingle_set, num_bins=NUM_BINS):
+    """Chữ ký MinHash 1 hoán vị: mỗi shingle băm 1 lần, giữ min theo từng ngăn"""
+    bins = [None] * num_bins
+    for sh in shingle_set:
+        h = hash(sh) & 0xFFFFFFFFFFFFFFFF  # hash() chỉ cần ổn định trong 1 process
+        b = h % num_bins
+        v = h // num_bins
+        if bins[b] is None or v < bins[b]:
+            bins[b] = v
+    return bins
+
+
+class MinHashIndex:
+    """Chỉ mục LSH trong RAM: tìm các câu có Jaccard (trên 3-gram ký tự) cao.
+
+    Chỉ giữ band hash và tập shingle của mỗi câu, không giữ bản dịch; khóa
+    (vd text_hash trong cache) dùng để lấy bản dịch khi cần.
+    """
+
+    def __init__(self, threshold=FUZZY_THRESHOLD, num_bins=NUM_BINS, band_rows=BAND_ROWS):
+        self.threshold = threshold
+        self.num_bins = num_bins
+        self.band_rows = band_rows
+        self._bands = {}  # (band, giá trị) -> [khóa]
+        self._shingles = {}  # khóa -> tập shingle
+
+    def __len__(self):
+        return len(self._shingles)
+
+    def _band_keys(self, signature):
+        for start in range(0, self.num_bins, self.band_rows):
+            band = tuple(signature[start:start + self.band_rows])
+            if any(v is not None for v in band):  # câu quá ngắn để lấp đầy band
+                yield start, band
+
+    def add(self, key, text):
+        if key in self._shingles:
+            return
+        sh = shingles(normalize_key(split_tags(text)[0]))
+        self._shingles[key] = sh
+        for band in self._band_keys(minhash(sh, self.num_bins)):
+            self._bands.setdefault(band, []).append(key)
+
+    def query(self, text):
+        """Trả về (khóa, độ giống) của câu giống nhất đạt ngưỡng, hoặc None"""
+        sh = shingles(normalize_key(split_tags(text)[0]))
+        best, best_score = None, self.threshold
+        seen = set()
+        for band in self._band_keys(minhash(sh, self.num_bins)):
+            for key in self._bands.get(band, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                score = jaccard(sh, self._shingles[key])
+                if score >= best_score:
+                    best, best_score = key, score
+        return (best, best_score) if best is not None else None
@@ -1,135 +1,755 @@
 import os
+import re
 import time
-import random
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from deep_translator import GoogleTranslator, MyMemoryTranslator
+import threading
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FuturesTimeout
 
 import cache_manager
+from metrics import METRICS
+from rate_limiter import get_limiter
+from subtitles import (Cue, iter_cues, format_cue, write_cues, open_subtitle,
+                       output_encoding_for)
+from journal import JobJournal
+from fingerprint import Fingerprint, file_hash
 
+# ghép nhiều dòng vào 1 request, phân cách bằng marker mà Google giữ nguyên
+BATCH_SEPARATOR = "\n@@@\n"
+BATCH_MAX_CHARS = 4500  # Google giới hạn ~5000 ký tự / request
+_BATCH_SPLIT_RE = re.compile(r"\s*@@@\s*")
 
 def bilingual_format(orig, trans):
     """Định dạng song ngữ"""
     return f"<i><font color='#B0B0B0'>{orig}</font></i>\n<b><font color='#FFFFFF'>{trans}</font></b>"
 
-def safe_translate(text, dest_lang, retries=3):
-    """Google chính, fallback MyMemory"""
-    last_err = None
-    for attempt in range(retries):
-        try:
-            return GoogleTranslator(source="auto", target=dest_lang).translate(text)
-        except Exception as e:
-            last_err = e
-            time.sleep(1.2 * (attempt + 1))
-    # fallback MyMemory
+# ---------------- Điều khiển job ----------------
+class TranslationCancelled(Exception):
+    """Job bị dừng giữa chừng: không dịch tiếp, không ghi gì vào cache"""
+
+
+class JobControl:
+    """Dừng/tạm dừng job từ luồng khác (vd GUI).
+
+    Dùng được ở cả 2 chỗ stop_event (gọi control() -> đã dừng chưa) và
+    pause_event (control.is_set() -> đang pause). Worker bị pause chờ trên
+    Event thay vì ngủ-thức liên tục, Stop đánh thức ngay mọi chỗ đang chờ.
+    """
+
+    def __init__(self):
+        self._running = threading.Event()
+        self._running.set()
+        self._stopped = threading.Event()
+
+    def __call__(self):
+        return self._stopped.is_set()
+
+    @property
+    def stopped(self):
+        return self._stopped.is_set()
+
+    def is_set(self):
+        return not self._running.is_set()
+
+    def stop(self):
+        self._stopped.set()
+        self._running.set()  # đánh thức các worker đang pause
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def wait_resumed(self):
+        self._running.wait()
+
+    def sleep(self, seconds):
+        """Ngủ tối đa seconds giây, thức dậy ngay khi bị dừng"""
+        self._stopped.wait(seconds)
+
+
+def _sleep(seconds, stop_event=None):
+    if isinstance(stop_event, JobControl):
+        stop_event.sleep(seconds)
+        return
+    deadline = time.monotonic() + seconds
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or (stop_event and stop_event()):
+            return
+        time.sleep(min(remaining, 0.2))
+
+def _check_stopped(stop_event):
+    if stop_event and stop_event():
+        raise TranslationCancelled()
+
+def _shutdown(executor, stop_event=None):
+    """Bị dừng thì hủy các chunk chưa chạy và không chờ request đang bay"""
+    stopped = bool(stop_event and stop_event())
+    executor.shutdown(wait=not stopped, cancel_futures=stopped)
+
+def _iter_completed(futures, stop_event=None, poll=0.2):
+    """Như as_completed nhưng thoát ngay khi stop_event bật, không chờ request đang chạy"""
+    pending = set(futures)
+    while pending:
+        if stop_event and stop_event():
+            return
+        done, pending = wait(pending, timeout=poll, return_when=FIRST_COMPLETED)
+        yield from done
+
+
+# ---------------- Providers ----------------
+class TranslationFailed(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Ngắt provider khi lỗi dồn dập, cho thử lại 1 request sau cooldown giây"""
+
+    def __init__(self, consecutive_failures=3, error_rate=0.5, window=20, cooldown=30.0):
+        self.consecutive_failures = consecutive_failures
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self._outcomes = deque(maxlen=window)
+        self._failures_in_row = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                return "half-open"
+            return "open"
+
+    def _can_try(self):
+        if self._opened_at is None:
+            return True
+        return time.monotonic() - self._opened_at >= self.cooldown and not self._probing
+
+    def can_try(self):
+        """Có gửi request được không (chỉ kiểm tra, không giữ lượt thăm dò)"""
+        with self._lock:
+            return self._can_try()
+
+    def allow(self):
+        """Giữ quyền gửi 1 request; mạch half-open chỉ cho 1 request thăm dò"""
+        with self._lock:
+            if not self._can_try():
+                return False
+            if self._opened_at is not None:
+                self._probing = True
+            return True
+
+    def retry_in(self):
+        """Số giây tới khi hết cooldown (0 nếu mạch đóng hoặc đã half-open)"""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self._opened_at + self.cooldown - time.monotonic())
+
+    def release(self):
+        """Bỏ lượt thăm dò đã giữ mà không gửi request (vd job bị dừng)"""
+        with self._lock:
+            self._probing = False
+
+    def record(self, success):
+        with self._lock:
+            self._outcomes.append(success)
+            self._probing = False
+            if success:
+                self._failures_in_row = 0
+                self._opened_at = None
+                return
+            self._failures_in_row += 1
+            failures = self._outcomes.count(False)
+            if (self._failures_in_row >= self.consecutive_failures
+                    or (len(self._outcomes) >= 10
+                        and failures / len(self._outcomes) >= self.error_rate)):
+                self._opened_at = time.monotonic()
+
+
+class Provider:
+    """1 dịch vụ dịch: giới hạn số request đồng thời, rate limiter và circuit breaker riêng"""
+
+    def __init__(self, name, factory, max_concurrency=4, max_chars=BATCH_MAX_CHARS, weight=1):
+        self.name = name
+        self.factory = factory  # (source, target) -> object có .translate(text)
+        self.max_concurrency = max_concurrency
+        self.max_chars = max_chars
+        self.weight = weight
+        self.breaker = CircuitBreaker()
+        self.limiter = get_limiter(name)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.routed = 0
+        self.failures = 0
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def available(self, length):
+        """Có thể nhận request này không (không thay đổi trạng thái circuit breaker)"""
+        return length <= self.max_chars and self.breaker.can_try()
+
+    def translate(self, text, dest_lang, source="auto", stop_event=None):
+        with self._slots:
+            with self._lock:
+                self._in_flight += 1
+                self.routed += 1
+            started = None
+            try:
+                waited = time.monotonic()
+                self.limiter.acquire(stop_event)
+                METRICS.incr("sleep_seconds_total", time.monotonic() - waited, reason="rate_limit")
+                _check_stopped(stop_event)
+                METRICS.incr("provider_bytes_sent_total", len(text.encode("utf-8")),
+                             provider=self.name)
+                started = time.monotonic()
+                translated = self.factory(source, dest_lang).translate(text)
+                if not translated:
+                    raise TranslationFailed(f"{self.name}: kết quả rỗng")
+                latency = time.monotonic() - started
+                self.limiter.on_success(latency)
+                self.breaker.record(True)
+                self._record(latency, "ok", len(text))
+                return translated
+            except TranslationCancelled:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                self.breaker.record(False)
+                if started is not None:
+                    self._record(time.monotonic() - started, "error", len(text), e)
+                raise
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+    def _record(self, latency, outcome, chars, error=None):
+        METRICS.observe("provider_request_seconds", latency, provider=self.name)
+        METRICS.incr("provider_requests_total", provider=self.name, outcome=outcome)
+        if METRICS.tracing:
+            METRICS.event("request", provider=self.name, seconds=round(latency, 4),
+                          chars=chars, outcome=outcome, error=str(error) if error else None)
+
+    def snapshot(self):
+        stats = self.limiter.snapshot()
+        stats.update(routed=self.routed, failures=self.failures,
+                     in_flight=self._in_flight, state=self.breaker.state)
+        return stats
+
+
+def _google_factory(source, target):
+    from deep_translator import GoogleTranslator
+    return GoogleTranslator(source=source, target=target)
+
+def _mymemory_factory(source, target):
+    from deep_translator import MyMemoryTranslator
+    return MyMemoryTranslator(source=source, target=target)
+
+PROVIDERS = {}
+DEFAULT_PROVIDER = "google"
+_routers = {}
+
+def register_provider(provider):
+    PROVIDERS[provider.name] = provider
+    _routers.clear()
+    return provider
+
+def _provider_gauges():
+    gauges = []
+    for p in PROVIDERS.values():
+        gauges.append(("provider_rate", {"provider": p.name}, p.limiter.rate))
+        gauges.append(("provider_in_flight", {"provider": p.name}, p.in_flight))
+        gauges.append(("provider_circuit_open", {"provider": p.name},
+                       int(p.breaker.state != "closed")))
+    return gauges
+
+METRICS.add_collector("providers", _provider_gauges)
+register_provider(Provider("google", _google_factory, max_concurrency=8))
+register_provider(Provider("mymemory", _mymemory_factory, max_concurrency=2, max_chars=480))
+
+
+class ProviderRouter:
+    """Chọn provider cho từng request.
+
+    Các provider được yêu cầu (nối bằng "+") chia tải theo weight và số request
+    đang chạy; các provider còn lại đứng sau làm dự phòng. Provider bị ngắt
+    mạch được bỏ qua ngay, không chờ hết số lần thử; mọi provider đều bị ngắt
+    thì chờ cooldown sớm nhất (mỗi lần chờ trọn 1 cooldown tính là 1 lần thử).
+    """
+
+    def __init__(self, names):
+        self.primary = [PROVIDERS[n] for n in names]
+        self.fallback = [p for n, p in PROVIDERS.items() if n not in names]
+        self.cache_name = names[0]  # tên dùng làm khóa cache
+
+    @property
+    def providers(self):
+        return self.primary + self.fallback
+
+    def _candidates(self, length, exclude=()):
+        """Các provider nhận được request, nhóm ưu tiên trước, ít tải trước"""
+        for group in (self.primary, self.fallback):
+            candidates = [p for p in group
+                          if p.name not in exclude and p.available(length)]
+            if candidates:
+                return sorted(candidates, key=lambda p: p.in_flight / p.weight)
+        return []
+
+    def pick(self, length, exclude=()):
+        """Chọn provider và giữ lượt gửi (lượt thăm dò nếu mạch đang half-open)"""
+        for provider in self._candidates(length, exclude):
+            if provider.breaker.allow():
+                return provider
+        return None
+
+    def _wait_for_circuit(self, length, exclude, stop_event):
+        """Chờ tới khi có provider hết cooldown hoặc xong lượt thăm dò.
+
+        Trả về False nếu không còn provider nào nhận được request, True sau khi
+        đã chờ; blocked=True nếu phải chờ hết 1 cooldown.
+        """
+        waiting = [p for p in self.providers
+                   if p.name not in exclude and length <= p.max_chars]
+        if not waiting:
+            return False, False
+        delay = min(p.breaker.retry_in() for p in waiting)
+        # delay 0: mạch half-open đang có request thăm dò, chờ kết quả của nó
+        seconds = delay if delay > 0 else 0.2
+        METRICS.incr("sleep_seconds_total", seconds, reason="circuit")
+        _sleep(seconds, stop_event)
+        return True, delay > 0
+
+    def translate(self, text, dest_lang, retries=3, stop_event=None):
+        attempts = {}
+        exhausted = set()
+        blocked = 0
+        while True:
+            _check_stopped(stop_event)
+            provider = self.pick(len(text), exclude=exhausted)
+            if provider is None:
+                if blocked >= retries:
+                    raise TranslationFailed(text[:50])
+                waited, cooldown = self._wait_for_circuit(len(text), exhausted, stop_event)
+                if not waited:
+                    raise TranslationFailed(text[:50])
+                blocked += cooldown
+                continue
+            if provider not in self.primary:
+                METRICS.incr("fallbacks_total", provider=provider.name)
+                METRICS.event("fallback", provider=provider.name, chars=len(text))
+            try:
+                return provider.translate(text, dest_lang, stop_event=stop_event)
+            except TranslationCancelled:
+                raise
+            except Exception as e:
+                retry_after = provider.limiter.on_error(e)
+                attempts[provider.name] = attempts.get(provider.name, 0) + 1
+                if attempts[provider.name] >= retries:
+                    exhausted.add(provider.name)
+                # chỉ chờ backoff nếu vẫn phải thử lại chính provider này
+                candidates = self._candidates(len(text), exclude=exhausted)
+                if candidates and candidates[0] is provider:
+                    METRICS.incr("retries_total", provider=provider.name)
+                    delay = provider.limiter.backoff(attempts[provider.name] - 1, retry_after)
+                    METRICS.incr("sleep_seconds_total", delay, reason="backoff")
+                    _sleep(delay, stop_event)
+
+    def snapshot(self):
+        providers = {p.name: p.snapshot() for p in self.providers if p.routed}
+        return {
+            "rate": sum(p["rate"] for p in providers.values()) if providers
+                    else self.primary[0].limiter.rate,
+            "throttled": sum(p["throttled"] for p in providers.values()),
+            "providers": providers,
+        }
+
+
+def get_router(provider=DEFAULT_PROVIDER):
+    """provider: tên, "a+b" (chia tải) hoặc list tên"""
+    names = tuple(provider.split("+") if isinstance(provider, str) else provider)
+    unknown = [n for n in names if n not in PROVIDERS]
+    if unknown:
+        raise ValueError(f"Provider không hỗ trợ: {', '.join(unknown)}")
+    router = _routers.get(names)
+    if router is None:
+        router = _routers[names] = ProviderRouter(list(names))
+    return router
+
+def safe_translate(text, dest_lang, retries=3, provider=DEFAULT_PROVIDER, stop_event=None):
+    """Dịch qua provider đã chọn, lỗi thì chuyển provider dự phòng, hỏng hết thì trả về None.
+
+    None (không phải bản gốc) để bản gốc không bị lưu vào cache/journal như 1
+    bản dịch: file đầu ra giữ nguyên dòng gốc và không được tính là xong, lần
+    chạy sau (resume/incremental) dịch lại. Bị dừng giữa chừng thì ném
+    TranslationCancelled.
+    """
     try:
-        return MyMemoryTranslator(source="auto", target=dest_lang).translate(text)
-    except Exception:
-        return text  # giữ nguyên nếu thất bại
+        return get_router(provider).translate(text, dest_lang, retries, stop_event)
+    except TranslationFailed:
+        METRICS.incr("translation_failed_total")
+        return None
 
-def translate_chunk(texts, dest_lang, cache, stop_event, pause_event, retries=3):
-    results = []
+def split_batches(texts, max_chars=BATCH_MAX_CHARS):
+    """Chia danh sách text thành các nhóm không vượt quá max_chars"""
+    batches, current, current_len = [], [], 0
     for text in texts:
-        if stop_event and stop_event():
-            break
-        if pause_event and pause_event.is_set():
+        extra = len(text) + (len(BATCH_SEPARATOR) if current else 0)
+        if current and current_len + extra > max_chars:
+            batches.append(current)
+            current, current_len = [], 0
+            extra = len(text)
+        current.append(text)
+        current_len += extra
+    if current:
+        batches.append(current)
+    return batches
+
+def translate_batch(texts, dest_lang, retries=3, provider=DEFAULT_PROVIDER, stop_event=None):
+    """Dịch nhiều dòng trong 1 request, lỗi hoặc lệch số dòng thì dịch lại từng dòng.
+
+    Dòng dịch không được trả về None (xem safe_translate).
+    """
+    if len(texts) == 1:
+        return [safe_translate(texts[0], dest_lang, retries, provider, stop_event)]
+    try:
+        translated = get_router(provider).translate(
+            BATCH_SEPARATOR.join(texts), dest_lang, retries, stop_event)
+        parts = _BATCH_SPLIT_RE.split(translated.strip())
+        if len(parts) == len(texts):
+            return parts
+    except TranslationFailed:
+        pass
+    METRICS.incr("batch_split_fallbacks_total")
+    return [safe_translate(text, dest_lang, retries, provider, stop_event) for text in texts]
+
+def _wait_if_paused(pause_event):
+    if pause_event and pause_event.is_set():
+        started = time.monotonic()
+        if isinstance(pause_event, JobControl):
+            pause_event.wait_resumed()  # chặn tới khi resume/stop, không polling
+        else:
             while pause_event.is_set():
                 time.sleep(0.2)
+        METRICS.incr("sleep_seconds_total", time.monotonic() - started, reason="pause")
 
-        # cache lookup
-        if cache.get(dest_lang) and text in cache[dest_lang]:
-            results.append(cache[dest_lang][text])
-            continue
+def _result_unless_stopped(future, stop_event, poll=0.2):
+    """Chờ kết quả của worker khác, bỏ chờ (trả về None) khi job bị dừng"""
+    while True:
+        try:
+            return future.result(timeout=poll)
+        except FuturesTimeout:
+            if stop_event and stop_event():
+                return None
 
-        translated = safe_translate(text, dest_lang, retries)
-        cache.setdefault(dest_lang, {})[text] = translated
-        results.append(translated)
-    return results
+def translate_chunk(texts, dest_lang, cache, stop_event, pause_event, retries=3,
+                    batch=True, max_chars=BATCH_MAX_CHARS, provider=DEFAULT_PROVIDER):
+    """Dịch 1 chunk, trả về list bản dịch theo thứ tự texts.
 
-def read_subtitle_file(path, encoding="utf-8"):
-    with open(path, "r", encoding=encoding, errors="ignore") as f:
-        lines = f.readlines()
-    ext = os.path.splitext(path)[1].lower()
-    return lines, ("vtt" if ext == ".vtt" else "srt")
+    None ở vị trí text dịch không được; bị dừng thì list có thể ngắn hơn texts.
+    Dùng chunk_translations để lấy {text: bản dịch}.
+    """
+    with METRICS.timer("chunk_seconds"):
+        return _translate_chunk(texts, dest_lang, cache, stop_event, pause_event, retries,
+                                batch, max_chars, provider)
 
-def write_subtitle_file(output_path, original_lines, results_map, encoding="utf-8"):
-    with open(output_path, "w", encoding=encoding, errors="ignore") as f:
-        for idx, line in enumerate(original_lines):
-            if idx in results_map:
-                f.write(results_map[idx] + "\n")
-            else:
-                f.write(line)
+def _translate_chunk(texts, dest_lang, cache, stop_event, pause_event, retries,
+                     batch, max_chars, provider):
+    cache_name = get_router(provider).cache_name
+    if not batch:
+        results = []
+        for text in texts:
+            if stop_event and stop_event():
+                break
+            _wait_if_paused(pause_event)
 
-def translate_srt_file(path, cache, dest_lang="vi", output_mode="bilingual",
-                       chunk_size=10, max_workers=3, min_sleep=0.25,
-                       max_sleep=0.6, stop_event=None, pause_event=None,
-                       progress_callback=None, encoding="utf-8",
-                       save_choice=1, output_folder=None, retries=4):
-    """Dịch 1 file SRT/VTT"""
-    lines, ftype = read_subtitle_file(path, encoding=encoding)
-
-    # lấy text để dịch
-    text_lines = []
-    for i, line in enumerate(lines):
-        s = line.strip()
-        if not s or s.isdigit() or "-->" in s:
-            continue
-        if ftype == "vtt" and i == 0 and s.upper().startswith("WEBVTT"):
-            continue
-        text_lines.append((i, line.rstrip("\n")))
+            # cache lookup (single-flight: chỉ 1 worker dịch mỗi text)
+            try:
+                translated = cache.get_or_translate(
+                    dest_lang, text,
+                    lambda t: safe_translate(t, dest_lang, retries, provider, stop_event),
+                    provider=cache_name)
+            except TranslationCancelled:
+                break
+            if translated is None and stop_event and stop_event():
+                break
+            results.append(translated)  # None: dịch không được
+        return results
 
-    if not text_lines:
-        return None
+    # batch mode: chỉ gửi các dòng chưa có trong cache (không trùng lặp),
+    # các dòng worker khác đang dịch thì chờ kết quả của worker đó
+    resolved, owned, waiting = cache.reserve(dest_lang, texts, provider=cache_name)
+    try:
+        for group in split_batches(owned, max_chars):
+            if stop_event and stop_event():
+                break
+            _wait_if_paused(pause_event)
+            try:
+                translated_group = translate_batch(group, dest_lang, retries, provider, stop_event)
+            except TranslationCancelled:
+                break
+            for text, translated in zip(group, translated_group):
+                if translated is None:
+                    continue  # không lưu bản gốc vào cache, release() bỏ giữ
+                cache.set(dest_lang, text, translated, provider=cache_name)
+                resolved[text] = translated
+    finally:
+        cache.release(dest_lang, owned, provider=cache_name)
 
-    indices = [idx for idx, _ in text_lines]
-    texts = [txt for _, txt in text_lines]
-    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
-    index_chunks = [indices[i:i + chunk_size] for i in range(0, len(indices), chunk_size)]
+    orphaned = []
+    for text, future in waiting.items():
+        translated = _result_unless_stopped(future, stop_event)
+        if translated is not None:
+            resolved[text] = translated
+        elif not (stop_event and stop_event()):
+            orphaned.append(text)  # worker giữ text bỏ dở (vd job khác bị dừng): tự dịch
+    if orphaned:
+        resolved.update(chunk_translations(orphaned, _translate_chunk(
+            orphaned, dest_lang, cache, stop_event, pause_event, retries, batch, max_chars,
+            provider)))
+
+    return [resolved.get(text) for text in texts]
 
+def chunk_translations(texts, results):
+    """{text: bản dịch} từ kết quả translate_chunk, bỏ các text không dịch được"""
+    return {text: translated for text, translated in zip(texts, results)
+            if translated is not None}
+
+def _subtitle_type(path):
+    return "vtt" if os.path.splitext(path)[1].lower() == ".vtt" else "srt"
+
+def read_cues(path, encoding="auto"):
+    """Đọc file thành danh sách cue, encoding="auto" thì tự nhận diện"""
+    ftype = _subtitle_type(path)
+    with open_subtitle(path, encoding) as f:
+        return list(iter_cues(f, ftype)), ftype
+
+def write_subtitle_file(output_path, cues, results_map, encoding="utf-8"):
+    with open(output_path, "w", encoding=encoding, errors="ignore") as f:
+        write_cues(f, cues, results_map)
+
+def translate_texts(texts, dest_lang, cache, chunk_size=10, max_workers=3,
+                    rate=None, stop_event=None, pause_event=None,
+                    progress_callback=None, retries=4, batch=True,
+                    provider=DEFAULT_PROVIDER, on_translated=None):
+    """Dịch danh sách text qua thread pool, trả về {text: bản dịch}.
+
+    Tốc độ gửi request do rate limiter của provider điều chỉnh (rate là tốc độ
+    ban đầu, req/s); progress_callback nhận thêm snapshot của router (tốc độ,
+    số lần bị giới hạn, thống kê định tuyến theo provider). on_translated nhận
+    {text: bản dịch} của mỗi chunk vừa xong (dùng cho journal).
+    """
+    router = get_router(provider)
+    if rate:
+        get_limiter(router.primary[0].name, rate)
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
     total_chunks = len(chunks)
-    results_map = {}
+    translations = {}
 
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+    ex = ThreadPoolExecutor(max_workers=max_workers)
+    try:
         future_to_idx = {
-            ex.submit(translate_chunk, chunk, dest_lang, cache, stop_event, pause_event, retries): ci
+            ex.submit(translate_chunk, chunk, dest_lang, cache, stop_event, pause_event,
+                      retries, batch, BATCH_MAX_CHARS, provider): ci
             for ci, chunk in enumerate(chunks)
         }
         done_cnt = 0
-        for future in as_completed(future_to_idx):
+        for future in _iter_completed(future_to_idx, stop_event):
             if stop_event and stop_event():
                 break
             ci = future_to_idx[future]
             try:
-                translated_list = future.result()
+                translated = chunk_translations(chunks[ci], future.result())
+                if on_translated:
+                    on_translated(translated)
             except Exception:
-                translated_list = chunks[ci]  # fallback giữ nguyên
-
-            for local_i, trans_text in enumerate(translated_list):
-                line_idx = index_chunks[ci][local_i]
-                orig_text = texts[ci * chunk_size + local_i]
-                if output_mode == "bilingual":
-                    if orig_text.strip().lower() == trans_text.strip().lower():
-                        results_map[line_idx] = trans_text
-                    else:
-                        results_map[line_idx] = bilingual_format(orig_text, trans_text)
-                else:
-                    results_map[line_idx] = trans_text
+                translated = {}  # chunk lỗi: giữ nguyên bản gốc, không tính là đã dịch
+
+            translations.update(translated)
 
             done_cnt += 1
             if progress_callback:
-                progress_callback(done_cnt, total_chunks)
-            time.sleep(random.uniform(min_sleep, max_sleep))
+                progress_callback(done_cnt, total_chunks, router.snapshot())
+    finally:
+        _shutdown(ex, stop_event)
+    return translations
+
+def translate_texts_multi(texts, dest_langs, cache, chunk_size=10, max_workers=3,
+                          rate=None, stop_event=None, pause_event=None,
+                          progress_callback=None, retries=4, batch=True,
+                          provider=DEFAULT_PROVIDER, on_translated=None):
+    """Dịch texts sang nhiều ngôn ngữ qua 1 pool chung, trả về {lang: {text: bản dịch}}.
+
+    Cache của mọi ngôn ngữ được tra 1 lượt trước, chỉ phần còn thiếu được chia
+    chunk; chunk của các ngôn ngữ được xếp xen kẽ để mọi ngôn ngữ cùng tiến.
+    on_translated(lang, {text: bản dịch}) được gọi khi mỗi chunk xong.
+    """
+    router = get_router(provider)
+    if rate:
+        get_limiter(router.primary[0].name, rate)
+    texts = list(dict.fromkeys(texts))
+    results = {}
+    per_lang = []
+    for lang in dest_langs:
+        found = results[lang] = {}
+        missing = []
+        for text in texts:
+            translated = cache.get(lang, text, provider=router.cache_name)
+            if translated is None:
+                missing.append(text)
+            else:
+                found[text] = translated
+        per_lang.append([(lang, missing[i:i + chunk_size])
+                         for i in range(0, len(missing), chunk_size)])
+    jobs = [job for group in itertools.zip_longest(*per_lang) for job in group if job]
+
+    ex = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        future_to_job = {
+            ex.submit(translate_chunk, chunk, lang, cache, stop_event, pause_event,
+                      retries, batch, BATCH_MAX_CHARS, provider): (lang, chunk)
+            for lang, chunk in jobs
+        }
+        done_cnt = 0
+        for future in _iter_completed(future_to_job, stop_event):
+            if stop_event and stop_event():
+                break
+            lang, chunk = future_to_job[future]
+            try:
+                translated = chunk_translations(chunk, future.result())
+                if on_translated:
+                    on_translated(lang, translated)
+            except Exception:
+                translated = {}  # chunk lỗi: giữ nguyên bản gốc, không tính là đã dịch
+            results[lang].update(translated)
 
+            done_cnt += 1
+            if progress_callback:
+                progress_callback(done_cnt, len(jobs), router.snapshot())
+    finally:
+        _shutdown(ex, stop_event)
+    return results
+
+def _cue_indices(cues):
+    # mỗi cue (gồm nhiều dòng) là 1 đơn vị dịch
+    return [i for i, cue in enumerate(cues) if cue.is_cue and cue.lines]
+
+def _build_results(cues, indices, translations, output_mode):
+    results_map = {}
+    for cue_idx in indices:
+        orig_text = cues[cue_idx].text
+        trans_text = translations.get(orig_text)
+        if trans_text is None:
+            continue
+        if output_mode == "bilingual":
+            if orig_text.strip().lower() == trans_text.strip().lower():
+                results_map[cue_idx] = trans_text
+            else:
+                results_map[cue_idx] = bilingual_format(orig_text, trans_text)
+        else:
+            results_map[cue_idx] = trans_text
+    return results_map
+
+def _output_path(path, ftype, output_mode, save_choice, output_folder, dest_lang=None):
+    """dest_lang: thêm mã ngôn ngữ vào tên file (khi dịch ra nhiều ngôn ngữ)"""
     base_name = os.path.splitext(os.path.basename(path))[0]
     ext = ".vtt" if ftype == "vtt" else ".srt"
-    out_name = f"{base_name}_{output_mode}{ext}"
+    suffix = f"{output_mode}_{dest_lang}" if dest_lang else output_mode
+    out_name = f"{base_name}_{suffix}{ext}"
 
     if save_choice == 2 and output_folder:
         os.makedirs(output_folder, exist_ok=True)
-        output_path = os.path.join(output_folder, out_name)
-    else:
-        output_path = os.path.join(os.path.dirname(path), out_name)
+        return os.path.join(output_folder, out_name)
+    return os.path.join(os.path.dirname(path), out_name)
+
+def open_fingerprint(path, output_path, dest_lang, output_mode, provider, out_encoding):
+    """Fingerprint lần dịch trước của 1 file đầu ra (cho incremental)"""
+    return Fingerprint.for_output(path, output_path, dest_lang=dest_lang,
+                                  output_mode=output_mode, provider=provider,
+                                  encoding=out_encoding)
+
+def translate_srt_file(path, cache, dest_lang="vi", output_mode="bilingual",
+                       chunk_size=10, max_workers=3, rate=None,
+                       stop_event=None, pause_event=None,
+                       progress_callback=None, encoding="auto",
+                       save_choice=1, output_folder=None, retries=4,
+                       batch=True, provider=DEFAULT_PROVIDER, journal=None,
+                       streaming=False, output_encoding=None, incremental=False):
+    """Dịch 1 file SRT/VTT.
+
+    encoding="auto": nhận diện từ BOM và vài KB đầu file; file đầu ra ghi theo
+    output_encoding (mặc định utf-8 khi auto, ngược lại giữ như đầu vào).
+
+    journal (JobJournal): ghi lại bản dịch ngay khi xong, bỏ qua file đã hoàn
+    thành và các cue đã dịch ở lần chạy trước.
+    streaming=True: đọc/ghi từng đoạn cue, bộ nhớ không tăng theo kích thước file.
+    incremental=True: so với fingerprint của lần dịch trước, file nguồn không đổi
+    thì giữ nguyên file đầu ra, cue có text không đổi dùng lại bản dịch cũ, chỉ
+    cue mới/đã sửa được gửi đi dịch (không áp dụng cho streaming).
+    """
+    if streaming:
+        import scheduler
+        return scheduler.translate_srt_file_streaming(
+            path, cache, dest_lang=dest_lang, output_mode=output_mode,
+            chunk_size=chunk_size, max_workers=max_workers, rate=rate,
+            stop_event=stop_event, pause_event=pause_event,
+            progress_callback=progress_callback, encoding=encoding,
+            save_choice=save_choice, output_folder=output_folder, retries=retries,
+            batch=batch, provider=provider, journal=journal,
+            output_encoding=output_encoding)
 
-    write_subtitle_file(output_path, lines, results_map, encoding=encoding)
+    ftype = _subtitle_type(path)
+    output_path = _output_path(path, ftype, output_mode, save_choice, output_folder)
+    if journal and journal.is_done(path, output_path):
+        return output_path
+    out_encoding = output_encoding_for(encoding, output_encoding)
+    fingerprint = source_hash = None
+    if incremental:
+        fingerprint = open_fingerprint(path, output_path, dest_lang, output_mode, provider,
+                                       out_encoding)
+        source_hash = file_hash(path)
+        if fingerprint.unchanged(source_hash, output_path):
+            return output_path
+
+    cues, ftype = read_cues(path, encoding=encoding)
+    indices = _cue_indices(cues)
+    if not indices:
+        return None
+
+    all_texts = list(dict.fromkeys(cues[i].text for i in indices))
+    known = fingerprint.lookup(all_texts) if fingerprint else {}
+    if journal:
+        known.update((t, journal.translations[t]) for t in all_texts
+                     if t in journal.translations)
+    texts = [t for t in all_texts if t not in known]
+    translations = {}
+    if texts:
+        translations = translate_texts(
+            texts, dest_lang, cache, chunk_size=chunk_size, max_workers=max_workers,
+            rate=rate, stop_event=stop_event,
+            pause_event=pause_event, progress_callback=progress_callback,
+            retries=retries, batch=batch, provider=provider,
+            on_translated=journal.record if journal else None)
+    translations.update(known)
+    results_map = _build_results(cues, indices, translations, output_mode)
+
+    write_subtitle_file(output_path, cues, results_map, encoding=out_encoding)
+    complete = len(results_map) == len(indices) and not (stop_event and stop_event())
+    if journal and complete:
+        journal.mark_done(path, output_path)
+    if fingerprint:
+        fingerprint.save(source_hash if complete else None, output_path, all_texts, translations)
 
     try:
         cache_manager.save_cache(cache)
@@ -138,10 +758,371 @@ def translate_srt_file(path, cache, dest_lang="vi", output_mode="bilingual",
 
     return output_path
 
-def translate_srt_files(files, **kwargs):
+
+def _vtt_time(ts):
+    return ts.replace(",", ".")
+
+def write_multitrack_vtt(output_path, cues, indices, translations, output_mode,
+                         encoding="utf-8"):
+    """Ghi 1 file VTT chứa mọi ngôn ngữ, mỗi ngôn ngữ 1 dòng bọc trong <lang xx>.
+
+    translations: {lang: {text: bản dịch}}; bilingual giữ thêm dòng gốc ở trên.
+    """
+    wanted = set(indices)
+    with open(output_path, "w", encoding=encoding, errors="ignore") as f:
+        f.write("WEBVTT\n\n")
+        for idx, cue in enumerate(cues):
+            if not cue.is_cue:
+                if cue.lines and cue.lines[0].strip().startswith("WEBVTT"):
+                    continue  # header của file VTT gốc
+                f.write(format_cue(cue))
+                continue
+            lines = list(cue.lines)
+            if idx in wanted:
+                lines = lines if output_mode == "bilingual" else []
+                for lang, mapping in translations.items():
+                    translated = mapping.get(cue.text)
+                    if translated is None:
+                        continue
+                    lines.extend(f"<lang {lang}>{l}</lang>"
+                                 for l in translated.split("\n") if l.strip())
+                lines = lines or list(cue.lines)
+            vtt_cue = Cue(cue.index, _vtt_time(cue.start), _vtt_time(cue.end), cue.settings, lines)
+            f.write(format_cue(vtt_cue))
+
+def translate_srt_file_multi(path, cache, dest_langs, output_mode="bilingual",
+                             chunk_size=10, max_workers=3, rate=None,
+                             stop_event=None, pause_event=None, progress_callback=None,
+                             encoding="auto", save_choice=1, output_folder=None,
+                             retries=4, batch=True, provider=DEFAULT_PROVIDER,
+                             journals=None, multitrack=False, output_encoding=None,
+                             incremental=False):
+    """Dịch 1 file sang nhiều ngôn ngữ, chỉ đọc/parse file 1 lần. Trả về danh sách file đầu ra.
+
+    Mỗi ngôn ngữ 1 file (tên có thêm mã ngôn ngữ), hoặc multitrack=True: 1 file
+    VTT chứa mọi ngôn ngữ. journals: {lang: JobJournal} để resume.
+    incremental: như translate_srt_file, mỗi ngôn ngữ 1 fingerprint riêng.
+    """
+    journals = journals or {}
+    ftype = _subtitle_type(path)
+    if multitrack:
+        out = _output_path(path, "vtt", output_mode, save_choice, output_folder, dest_lang="multi")
+        outputs = {lang: out for lang in dest_langs}
+    else:
+        outputs = {lang: _output_path(path, ftype, output_mode, save_choice, output_folder,
+                                      dest_lang=lang) for lang in dest_langs}
+    pending = [lang for lang in dest_langs
+               if not (lang in journals and journals[lang].is_done(path, outputs[lang]))]
+    out_encoding = output_encoding_for(encoding, output_encoding)
+    fingerprints = {}
+    source_hash = None
+    if incremental and pending:
+        source_hash = file_hash(path)
+        fingerprints = {lang: open_fingerprint(path, outputs[lang], lang, output_mode, provider,
+                                               out_encoding) for lang in pending}
+        unchanged = {lang for lang in pending
+                     if fingerprints[lang].unchanged(source_hash, outputs[lang])}
+        if multitrack:
+            # file VTT chung: chỉ bỏ qua khi mọi ngôn ngữ đều không đổi
+            pending = [] if len(unchanged) == len(pending) else pending
+        else:
+            pending = [lang for lang in pending if lang not in unchanged]
+    if not pending:
+        return list(dict.fromkeys(outputs.values()))
+
+    cues, ftype = read_cues(path, encoding=encoding)
+    indices = _cue_indices(cues)
+    if not indices:
+        return []
+
+    texts = list(dict.fromkeys(cues[i].text for i in indices))
+    known = {}
+    remaining = []
+    for lang in pending:
+        journal = journals.get(lang)
+        known[lang] = fingerprints[lang].lookup(texts) if lang in fingerprints else {}
+        if journal:
+            known[lang].update((t, journal.translations[t]) for t in texts
+                               if t in journal.translations)
+        remaining.extend(t for t in texts if t not in known[lang])
+    remaining = list(dict.fromkeys(remaining))
+
+    def record(lang, translated):
+        if lang in journals:
+            journals[lang].record(translated)
+
+    translations = {lang: {} for lang in pending}
+    if remaining:
+        translations = translate_texts_multi(
+            remaining, pending, cache, chunk_size=chunk_size, max_workers=max_workers,
+            rate=rate, stop_event=stop_event, pause_event=pause_event,
+            progress_callback=progress_callback, retries=retries, batch=batch,
+            provider=provider, on_translated=record)
+    stopped = stop_event and stop_event()
+
+    complete = {}
+    for lang in pending:
+        translations[lang].update(known[lang])
+        results_map = _build_results(cues, indices, translations[lang], output_mode)
+        complete[lang] = len(results_map) == len(indices) and not stopped
+        if not multitrack:
+            write_subtitle_file(outputs[lang], cues, results_map, encoding=out_encoding)
+    if multitrack:
+        # ngôn ngữ đã xong ở lần trước: lấy lại bản dịch từ journal
+        for lang in dest_langs:
+            if lang not in translations and lang in journals:
+                translations[lang] = journals[lang].translations
+        write_multitrack_vtt(outputs[dest_langs[0]], cues, indices,
+                             {lang: translations.get(lang, {}) for lang in dest_langs},
+                             output_mode, encoding=out_encoding)
+    for lang in pending:
+        if complete[lang] and lang in journals:
+            journals[lang].mark_done(path, outputs[lang])
+        if lang in fingerprints:
+            fingerprints[lang].save(source_hash if complete[lang] else None, outputs[lang],
+                                    texts, translations[lang])
+
+    try:
+        cache_manager.save_cache(cache)
+    except Exception as e:
+        print(f"[WARN] Failed to save cache: {e}")
+    return list(dict.fromkeys(outputs.values()))
+
+
+class TranslationPlan:
+    """Kết quả quét trước toàn bộ file của 1 job"""
+
+    def __init__(self, dest_lang):
+        self.dest_lang = dest_lang
+        self.files = []  # (path, cues, ftype, indices)
+        self.total = 0  # tổng số cue cần dịch
+        self.unique = []  # các text khác nhau
+        self.cached = {}  # text -> bản dịch có sẵn trong cache
+        self.residue = []  # text phải gửi đi dịch
+
+    @property
+    def unique_ratio(self):
+        return len(self.unique) / self.total if self.total else 0.0
+
+    def summary(self):
+        return (f"[{self.dest_lang}] {len(self.files)} file, {self.total} cue, "
+                f"{len(self.unique)} unique ({self.unique_ratio * 100:.1f}%), "
+                f"{len(self.cached)} có trong cache, {len(self.residue)} cần dịch")
+
+
+def plan_translation(files, cache, dest_lang="vi", encoding="auto", provider=DEFAULT_PROVIDER):
+    """Quét mọi file, gom các text duy nhất và đối chiếu với cache trước khi dịch"""
+    plan = TranslationPlan(dest_lang)
+    seen = {}
+    for path in files:
+        cues, ftype = read_cues(path, encoding=encoding)
+        indices = _cue_indices(cues)
+        if not indices:
+            continue
+        plan.files.append((path, cues, ftype, indices))
+        plan.total += len(indices)
+        for i in indices:
+            seen.setdefault(cues[i].text, None)
+
+    plan.unique = list(seen)
+    cache_name = get_router(provider).cache_name
+    for text in plan.unique:
+        translated = cache.get(dest_lang, text, provider=cache_name)
+        if translated is not None:
+            plan.cached[text] = translated
+        else:
+            plan.residue.append(text)
+    return plan
+
+def _translate_planned(files, cache, dest_lang="vi", output_mode="bilingual",
+                       encoding="auto", save_choice=1, output_folder=None,
+                       plan_callback=None, provider=DEFAULT_PROVIDER, journal=None,
+                       stop_event=None, output_encoding=None, incremental=False,
+                       file_callback=None, chunk_size=10, max_workers=3, rate=None,
+                       pause_event=None, progress_callback=None, retries=4, batch=True):
+    # incremental không áp dụng: plan đã gom text của mọi file và tra cache 1 lượt
     outputs = []
-    for f in files:
-        outp = translate_srt_file(f, **kwargs)
-        if outp:
-            outputs.append(outp)
+    if journal:
+        # file đã xong ở lần chạy trước thì bỏ qua
+        pending = []
+        for path in files:
+            out = _output_path(path, _subtitle_type(path), output_mode, save_choice, output_folder)
+            if journal.is_done(path, out):
+                outputs.append(out)
+            else:
+                pending.append(path)
+        files = pending
+
+    plan = plan_translation(files, cache, dest_lang=dest_lang, encoding=encoding,
+                            provider=provider)
+    if journal:
+        for text in [t for t in plan.residue if t in journal.translations]:
+            plan.cached[text] = journal.translations[text]
+        plan.residue = [t for t in plan.residue if t not in plan.cached]
+    if plan_callback:
+        plan_callback(plan)
+
+    translations = dict(plan.cached)
+    if plan.residue:
+        translations.update(translate_texts(
+            plan.residue, dest_lang, cache, provider=provider, stop_event=stop_event,
+            on_translated=journal.record if journal else None, chunk_size=chunk_size,
+            max_workers=max_workers, rate=rate, pause_event=pause_event,
+            progress_callback=progress_callback, retries=retries, batch=batch))
+
+    stopped = stop_event and stop_event()
+    for path, cues, ftype, indices in plan.files:
+        results_map = _build_results(cues, indices, translations, output_mode)
+        output_path = _output_path(path, ftype, output_mode, save_choice, output_folder)
+        try:
+            write_subtitle_file(output_path, cues, results_map,
+                                encoding=output_encoding_for(encoding, output_encoding))
+        except Exception as e:
+            if file_callback is None:
+                raise
+            file_callback(path, None, e)
+            continue
+        if journal and len(results_map) == len(indices) and not stopped:
+            journal.mark_done(path, output_path)
+        outputs.append(output_path)
+        if file_callback:
+            file_callback(path, output_path, None)
+
+    cache_manager.save_cache(cache)
+    return outputs
+
+def open_job_journal(files, dest_lang="vi", output_mode="bilingual",
+                     provider=DEFAULT_PROVIDER, resume=False):
+    """Mở journal của job; resume=False thì bắt đầu lại từ đầu"""
+    journal = JobJournal.for_job(files, dest_lang=dest_lang, output_mode=output_mode,
+                                 provider=provider)
+    if not resume:
+        journal.reset()
+    return journal
+
+def _translate_multi(files, dest_langs, resume=False, journal=None, pipeline=False,
+                     multitrack=False, **kwargs):
+    kwargs.pop("dest_lang", None)
+    own_journal = journal is None
+    if own_journal:
+        journal = {lang: open_job_journal(files, lang, kwargs.get("output_mode", "bilingual"),
+                                          kwargs.get("provider", DEFAULT_PROVIDER), resume)
+                   for lang in dest_langs}
+    if pipeline and not multitrack:
+        import scheduler
+        outputs = scheduler.translate_files_pipelined(files, dest_langs=dest_langs,
+                                                      journal=journal, **kwargs)
+    else:
+        file_callback = kwargs.pop("file_callback", None)
+        stop_event = kwargs.get("stop_event")
+        outputs = []
+        for f in files:
+            if stop_event and stop_event():
+                break
+            try:
+                result = translate_srt_file_multi(f, dest_langs=dest_langs, journals=journal,
+                                                  multitrack=multitrack, **kwargs)
+            except Exception as e:
+                if file_callback is None:
+                    raise
+                file_callback(f, None, e)
+                continue
+            outputs.extend(result)
+            if file_callback:
+                for out in result or [None]:
+                    file_callback(f, out, None)
+    if own_journal:
+        stop_event = kwargs.get("stop_event")
+        finished = not (stop_event and stop_event()) and all(
+            any(out in j.done.values() for j in journal.values()) for out in outputs)
+        for j in journal.values():
+            j.close(remove=finished)
+    return outputs
+
+def translate_srt_files(files, plan=False, plan_callback=None, engine="threads",
+                        resume=False, journal=None, pipeline=False, dest_langs=None,
+                        multitrack=False, **kwargs):
+    """Dịch nhiều file; plan=True quét trước toàn bộ file, mỗi text chỉ dịch 1 lần.
+
+    dest_langs (list): dịch sang nhiều ngôn ngữ trong 1 lượt, mỗi file chỉ parse
+    1 lần, mọi ngôn ngữ dùng chung pool; mỗi ngôn ngữ 1 file đầu ra hoặc
+    multitrack=True: 1 file VTT chứa mọi ngôn ngữ. journal khi đó là {lang: JobJournal}.
+    Streaming chỉ dùng được khi dịch sang 1 ngôn ngữ.
+
+    pipeline=True dùng scheduler: 1 pool chung nhận chunk từ nhiều file cùng lúc,
+    file nào xong được ghi ngay. file_callback(path, output_path, error) được gọi
+    khi mỗi file xong; có file_callback thì lỗi của 1 file được báo qua đó thay
+    vì dừng cả job. plan=True không dùng chung được với dest_langs, engine
+    async, pipeline hay streaming (ném ValueError).
+
+    incremental=True (trong kwargs): chỉ dịch các cue mới/đã sửa so với lần dịch
+    trước, xem translate_srt_file (bỏ qua khi plan=True hoặc streaming).
+
+    engine="async" dùng async_engine (1 HTTP session keep-alive, nhiều request song song).
+    resume=True tiếp tục job bị dừng/crash từ journal: bỏ qua file đã xong, không
+    dịch lại các cue đã có trong journal. Journal tự xóa khi mọi file hoàn thành.
+    """
+    if dest_langs is not None:
+        dest_langs = list(dict.fromkeys(dest_langs))
+        if len(dest_langs) == 1 and not multitrack:
+            kwargs["dest_lang"] = dest_langs[0]
+            if isinstance(journal, dict):
+                journal = journal.get(dest_langs[0])
+            dest_langs = None
+    if plan:
+        # plan gom text của mọi file rồi dịch 1 lượt qua thread pool, không ghép được
+        # với các chế độ dưới đây; báo lỗi thay vì lặng lẽ bỏ qua plan
+        if dest_langs:
+            raise ValueError("Chế độ plan chưa hỗ trợ dịch nhiều ngôn ngữ cùng lúc")
+        if engine == "async" or pipeline or kwargs.get("streaming"):
+            raise ValueError("Chế độ plan không dùng chung được với engine async, "
+                             "pipeline hay streaming")
+        kwargs.pop("streaming", None)
+    if dest_langs and kwargs.get("streaming"):
+        raise ValueError("Streaming chưa hỗ trợ dịch nhiều ngôn ngữ cùng lúc")
+    if engine == "async":
+        if dest_langs:
+            raise ValueError("Engine async chưa hỗ trợ dịch nhiều ngôn ngữ cùng lúc")
+        if resume or journal is not None:
+            raise ValueError("Engine async chưa hỗ trợ resume (journal)")
+        import async_engine
+        return async_engine.translate_srt_files(files, **kwargs)
+    if dest_langs:
+        return _translate_multi(files, dest_langs, resume=resume, journal=journal,
+                                pipeline=pipeline, multitrack=multitrack, **kwargs)
+
+    own_journal = journal is None
+    if own_journal:
+        journal = open_job_journal(files, kwargs.get("dest_lang", "vi"),
+                                   kwargs.get("output_mode", "bilingual"),
+                                   kwargs.get("provider", DEFAULT_PROVIDER), resume)
+    if pipeline:
+        import scheduler
+        outputs = scheduler.translate_files_pipelined(files, journal=journal, **kwargs)
+    elif plan:
+        outputs = _translate_planned(files, plan_callback=plan_callback, journal=journal,
+                                     **kwargs)
+    else:
+        file_callback = kwargs.pop("file_callback", None)
+        stop_event = kwargs.get("stop_event")
+        outputs = []
+        for f in files:
+            if stop_event and stop_event():
+                break
+            try:
+                outp = translate_srt_file(f, journal=journal, **kwargs)
+            except Exception as e:
+                if file_callback is None:
+                    raise
+                file_callback(f, None, e)
+                continue
+            if outp:
+                outputs.append(outp)
+            if file_callback:
+                file_callback(f, outp, None)
+    if own_journal:
+        stop_event = kwargs.get("stop_event")
+        finished = not (stop_event and stop_event()) and \
+            all(out in journal.done.values() for out in outputs)
+        journal.close(remove=finished)
     return outputs